@@ -22,9 +22,7 @@ from keystone.api import limits
 from keystone.api import os_ep_filter
 from keystone.api import os_federation
 from keystone.api import os_inherit
-from keystone.api import os_oauth1
 from keystone.api import os_revoke
-from keystone.api import os_simple_cert
 from keystone.api import policy
 from keystone.api import projects
 from keystone.api import regions
@@ -51,9 +49,7 @@ __all__ = (
     'os_ep_filter',
     'os_federation',
     'os_inherit',
-    'os_oauth1',
     'os_revoke',
-    'os_simple_cert',
     'policy',
     'projects',
     'regions',
@@ -81,9 +77,7 @@ __apis__ = (
     os_ep_filter,
     os_federation,
     os_inherit,
-    os_oauth1,
     os_revoke,
-    os_simple_cert,
     policy,
     projects,
     regions,
@@ -97,3 +91,12 @@ __apis__ = (
     trusts,
     users,
 )
+
+# NOTE: These APIs are rarely used and are not imported with this package, so
+# that they can be loaded on their first request when [wsgi] lazy_load is
+# set. Each module name is listed with the URL prefixes its resources are
+# served under.
+__lazy_apis__ = (
+    ('os_oauth1', ('/v3/OS-OAUTH1',)),
+    ('os_simple_cert', ('/v3/OS-SIMPLE-CERT',)),
+)
@@ -70,7 +70,7 @@ class ResourceBase(ks_flask.ResourceBase):
 
         # Load the credential from the backend
         credential_id = utils.hash_access_key(credentials['access'])
-        cred = PROVIDERS.credential_api.get_credential(credential_id)
+        cred = PROVIDERS.credential_api.get_ec2_credential(credential_id)
         if not cred or cred['type'] != CRED_TYPE_EC2:
             raise ks_exceptions.Unauthorized(_('EC2 access key not found.'))
 
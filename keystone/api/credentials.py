@@ -97,7 +97,8 @@ class CredentialResource(ks_flask.ResourceBase):
         ENFORCER.enforce_call(action='identity:list_credentials',
                               filters=filters, target_attr=target)
         hints = self.build_driver_hints(filters)
-        refs = PROVIDERS.credential_api.list_credentials(hints)
+        refs = PROVIDERS.credential_api.list_credentials(hints,
+                                                         decrypt=False)
         # If the request was filtered, make sure to return only the
         # credentials specific to that user. This makes it so that users with
         # roles on projects can't see credentials that aren't theirs.
@@ -108,6 +109,8 @@ class CredentialResource(ks_flask.ResourceBase):
                 if ref['user_id'] == target['credential']['user_id']:
                     filtered_refs.append(ref)
             refs = filtered_refs
+        # Only decrypt the credentials that are returned.
+        refs = PROVIDERS.credential_api.decrypt_credentials(refs)
         refs = [self._blob_to_json(r) for r in refs]
         return self.wrap_collection(refs, hints=hints)
 
@@ -13,8 +13,10 @@
 # This file handles all flask-restful resources for /v3/s3tokens
 
 import base64
+import collections
 import hashlib
 import hmac
+import threading
 
 import flask
 from oslo_serialization import jsonutils
@@ -30,6 +32,57 @@ from keystone.i18n import _
 from keystone.server import flask as ks_flask
 
 
+# The number of derived SigV4 signing keys to keep in memory.
+SIGNING_KEY_CACHE_SIZE = 1024
+
+
+class _SigningKeyCache(object):
+    """Hold the SigV4 signing keys derived from secret keys.
+
+    Deriving a signing key takes four HMAC operations, and a key is valid for
+    all the requests signed with the same secret for a date, region and
+    service. The most recently used keys are kept, so a client signing many
+    requests a day only has its key derived once. Keys are looked up by a
+    digest of the secret so that the secrets themselves are not kept.
+
+    """
+
+    def __init__(self, size=SIGNING_KEY_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._size = size
+        self._keys = collections.OrderedDict()
+
+    def get_key(self, secret_key, date, region, service):
+        secret_digest = hashlib.sha256(secret_key.encode('utf-8')).digest()
+        cache_key = (secret_digest, date, region, service)
+        with self._lock:
+            signing_key = self._keys.pop(cache_key, None)
+            if signing_key is not None:
+                self._keys[cache_key] = signing_key
+                return signing_key
+
+        def _sign(key, msg):
+            return hmac.new(key, msg, hashlib.sha256).digest()
+
+        signing_key = _sign(('AWS4' + secret_key).encode('utf-8'), date)
+        signing_key = _sign(signing_key, region)
+        signing_key = _sign(signing_key, service)
+        signing_key = _sign(signing_key, b'aws4_request')
+
+        with self._lock:
+            self._keys[cache_key] = signing_key
+            while len(self._keys) > self._size:
+                self._keys.popitem(last=False)
+        return signing_key
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+_SIGNING_KEY_CACHE = _SigningKeyCache()
+
+
 def _calculate_signature_v1(string_to_sign, secret_key):
     """Calculate a v1 signature.
 
@@ -63,14 +116,8 @@ def _calculate_signature_v4(string_to_sign, secret_key):
     if len(scope) != 4 or scope[2] != b's3' or scope[3] != b'aws4_request':
         raise exception.Unauthorized(message=_('Invalid EC2 signature.'))
 
-    def _sign(key, msg):
-        return hmac.new(key, msg, hashlib.sha256).digest()
-
-    signed = _sign(('AWS4' + secret_key).encode('utf-8'), scope[0])
-    signed = _sign(signed, scope[1])
-    signed = _sign(signed, scope[2])
-    signed = _sign(signed, b'aws4_request')
-
+    signed = _SIGNING_KEY_CACHE.get_key(secret_key, scope[0], scope[1],
+                                        scope[2])
     signature = hmac.new(signed, string_to_sign, hashlib.sha256)
     return signature.hexdigest()
 
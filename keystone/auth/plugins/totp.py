@@ -23,6 +23,7 @@ same secret key will be equal.
 """
 
 import base64
+import threading
 
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
@@ -34,21 +35,26 @@ import six
 from keystone.auth import plugins
 from keystone.auth.plugins import base
 from keystone.common import provider_api
+import keystone.conf
 from keystone import exception
 from keystone.i18n import _
 
 
 METHOD_NAME = 'totp'
 
+CONF = keystone.conf.CONF
 LOG = log.getLogger(__name__)
 PROVIDERS = provider_api.ProviderAPIs
 
 
-def _generate_totp_passcode(secret):
-    """Generate TOTP passcode.
+# The length of a TOTP window, in seconds.
+TIME_STEP = 30
+
+
+def _get_totp(secret):
+    """Return the TOTP generator for a secret.
 
     :param bytes secret: A base32 encoded secret for the TOTP authentication
-    :returns: totp passcode as bytes
     """
     if isinstance(secret, six.text_type):
         # NOTE(dstanek): since this may be coming from the JSON stored in the
@@ -65,11 +71,49 @@ def _generate_totp_passcode(secret):
     # which is marked as insecure. In this instance however, keystone uses
     # HMAC-SHA1 when generating the TOTP, which is currently not insecure but
     # will still trigger when scanned by bandit.
-    totp = crypto_totp.TOTP(
-        decoded, 6, hashes.SHA1(), 30, backend=default_backend())  # nosec
+    return crypto_totp.TOTP(
+        decoded, 6, hashes.SHA1(), TIME_STEP,  # nosec
+        backend=default_backend())
+
+
+def _generate_totp_passcode(secret):
+    """Generate TOTP passcode.
+
+    :param bytes secret: A base32 encoded secret for the TOTP authentication
+    :returns: totp passcode as bytes
+    """
+    totp = _get_totp(secret)
     return totp.generate(timeutils.utcnow_ts(microsecond=True)).decode('utf-8')
 
 
+class _UsedPasscodes(object):
+    """Remember the TOTP windows in which a credential was used.
+
+    A window is forgotten once none of its passcodes can be accepted anymore.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._used = {}
+
+    def use(self, credential_id, window, expires_at):
+        """Record the use of a window, return False if it was already used."""
+        now = timeutils.utcnow_ts(microsecond=True)
+        key = (credential_id, window)
+        with self._lock:
+            if self._used.get(key, 0) > now:
+                return False
+            for used_key, used_expires_at in list(self._used.items()):
+                if used_expires_at <= now:
+                    del self._used[used_key]
+            self._used[key] = expires_at
+            return True
+
+
+_USED_PASSCODES = _UsedPasscodes()
+
+
 class TOTP(base.AuthMethodHandler):
 
     def authenticate(self, auth_payload):
@@ -78,25 +122,41 @@ class TOTP(base.AuthMethodHandler):
         user_info = plugins.TOTPUserInfo.create(auth_payload, METHOD_NAME)
         auth_passcode = auth_payload.get('user').get('passcode')
 
-        credentials = PROVIDERS.credential_api.list_credentials_for_user(
-            user_info.user_id, type='totp')
+        secrets = PROVIDERS.credential_api.list_totp_secrets_for_user(
+            user_info.user_id)
+
+        now = timeutils.utcnow_ts(microsecond=True)
+        windows = [int(now // TIME_STEP) - i
+                   for i in range(CONF.totp.included_previous_windows + 1)]
 
-        valid_passcode = False
-        for credential in credentials:
+        matched = None
+        for credential_id, secret in secrets:
             try:
-                generated_passcode = _generate_totp_passcode(
-                    credential['blob'])
-                if auth_passcode == generated_passcode:
-                    valid_passcode = True
+                totp = _get_totp(secret)
+                for window in windows:
+                    generated_passcode = totp.generate(
+                        window * TIME_STEP).decode('utf-8')
+                    if auth_passcode == generated_passcode:
+                        matched = (credential_id, window)
+                        break
+                if matched:
                     break
             except (ValueError, KeyError):
                 LOG.debug('No TOTP match; credential id: %s, user_id: %s',
-                          credential['id'], user_info.user_id)
+                          credential_id, user_info.user_id)
             except (TypeError):
                 LOG.debug('Base32 decode failed for TOTP credential %s',
-                          credential['id'])
+                          credential_id)
+
+        if matched and CONF.totp.prevent_passcode_reuse:
+            credential_id, window = matched
+            expires_at = (window + len(windows)) * TIME_STEP
+            if not _USED_PASSCODES.use(credential_id, window, expires_at):
+                LOG.debug('TOTP passcode was already used; credential id: '
+                          '%s, user_id: %s', credential_id, user_info.user_id)
+                matched = None
 
-        if not valid_passcode:
+        if not matched:
             # authentication failed because of invalid username or passcode
             msg = _('Invalid username or TOTP passcode')
             raise exception.Unauthorized(msg)
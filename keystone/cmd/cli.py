@@ -18,6 +18,7 @@ from __future__ import print_function
 import datetime
 import os
 import sys
+import timeit
 import uuid
 
 import migrate
@@ -26,6 +27,7 @@ from oslo_db.sqlalchemy import migration
 from oslo_log import log
 from oslo_serialization import jsonutils
 import pbr.version
+import six
 
 from keystone.cmd import bootstrap
 from keystone.cmd import doctor
@@ -1175,6 +1177,114 @@ class MappingEngineTester(BaseApp):
         if isinstance(self.rules, list):
             self.rules = {'rules': self.rules}
 
+    def _normalize_json_assertion(self, attributes, pathname, line_num):
+        if not isinstance(attributes, dict):
+            msg = _("batch file %(pathname)s at line %(line_num)d expected "
+                    "a JSON object but found '%(line)s'")
+            raise SystemExit(msg % {'pathname': pathname,
+                                    'line_num': line_num,
+                                    'line': jsonutils.dumps(attributes)})
+        assertion_dict = {}
+        prefix = CONF.command.prefix
+        for k, v in attributes.items():
+            if prefix and not k.startswith(prefix):
+                continue
+            # Lists are passed to the mapping engine the same way they are
+            # found in the environment, as ';' separated values.
+            if isinstance(v, list):
+                v = ';'.join(six.text_type(item) for item in v)
+            assertion_dict[k] = six.text_type(v)
+        return assertion_dict
+
+    def iter_batch_assertions(self, path):
+        """Yield a name and an assertion for every assertion in a batch.
+
+        ``path`` is either a directory, in which case every regular file in
+        it is read in the same format as ``--input``, or a JSON Lines file
+        holding one JSON object of assertion attributes per line.
+        Assertions are read one at a time, so batches of any size can be
+        processed.
+
+        """
+        if os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                pathname = os.path.join(path, filename)
+                if not os.path.isfile(pathname):
+                    continue
+                self.read_assertion(pathname)
+                self.normalize_assertion()
+                yield filename, self.assertion
+            return
+
+        try:
+            batch_file = open(path)
+        except IOError as e:
+            raise SystemExit(_("Error while opening file "
+                               "%(path)s: %(err)s") % {'path': path, 'err': e})
+        with batch_file:
+            for line_num, line in enumerate(batch_file, 1):
+                line = line.strip()
+                if line == '':
+                    continue
+                try:
+                    attributes = jsonutils.loads(line)
+                except ValueError as e:
+                    raise SystemExit(_('Error while parsing batch file '
+                                       '%(path)s at line %(line_num)d: '
+                                       '%(err)s') % {'path': path,
+                                                     'line_num': line_num,
+                                                     'err': e})
+                yield ('%s:%d' % (os.path.basename(path), line_num),
+                       self._normalize_json_assertion(attributes, path,
+                                                      line_num))
+
+    def run_batch(self, rule_processor):
+        """Map every assertion of the batch and report the timings.
+
+        One JSON object is printed per assertion, with the mapped properties
+        or the error raised by the mapping engine and the time it took,
+        followed by a summary of throughput and latency percentiles. Only the
+        mapping itself is timed, reading the batch is not.
+
+        """
+        latencies = []
+        failures = 0
+        started = timeit.default_timer()
+        for name, assertion in self.iter_batch_assertions(CONF.command.batch):
+            result = {'assertion': name}
+            begin = timeit.default_timer()
+            try:
+                result['mapped'] = rule_processor.process(assertion)
+            except exception.Error as e:
+                result['error'] = six.text_type(e)
+                failures += 1
+            elapsed = timeit.default_timer() - begin
+            latencies.append(elapsed)
+            result['time_ms'] = round(elapsed * 1000, 3)
+            if not CONF.command.summary_only:
+                print(jsonutils.dumps(result))
+        wall_time = timeit.default_timer() - started
+
+        if not latencies:
+            print(_('No assertions found in %s') % CONF.command.batch)
+            return
+
+        mapping_time = sum(latencies)
+        latencies.sort()
+        print(_('Assertions: %(count)d (%(failures)d failed)') % {
+            'count': len(latencies), 'failures': failures})
+        print(_('Total time: %(wall).3f s, %(mapping).3f s mapping') % {
+            'wall': wall_time, 'mapping': mapping_time})
+        print(_('Throughput: %.1f assertions/s') % (
+            len(latencies) / mapping_time if mapping_time else 0.0))
+        print(_('Latency (ms): min %(min).3f, p50 %(p50).3f, p95 %(p95).3f, '
+                'p99 %(p99).3f, max %(max).3f') % {
+            'min': latencies[0] * 1000,
+            'p50': utils.percentile(latencies, 50) * 1000,
+            'p95': utils.percentile(latencies, 95) * 1000,
+            'p99': utils.percentile(latencies, 99) * 1000,
+            'max': latencies[-1] * 1000})
+
     @classmethod
     def main(cls):
         if CONF.command.engine_debug:
@@ -1188,6 +1298,15 @@ class MappingEngineTester(BaseApp):
         tester.normalize_rules()
         mapping_engine.validate_mapping_structure(tester.rules)
 
+        if CONF.command.batch:
+            if not CONF.command.engine_debug:
+                # Failures are part of the per-assertion results already.
+                mapping_engine.LOG.logger.setLevel('ERROR')
+            rp = mapping_engine.RuleProcessor(tester.mapping_id,
+                                              tester.rules['rules'])
+            tester.run_batch(rp)
+            return
+
         tester.read_assertion(CONF.command.input)
         tester.normalize_assertion()
 
@@ -1213,7 +1332,8 @@ class MappingEngineTester(BaseApp):
                                   "Content must be a proper JSON structure, "
                                   "with a top-level key 'rules' and "
                                   "corresponding value being a list."))
-        parser.add_argument('--input', default=None, required=True,
+        inputs = parser.add_mutually_exclusive_group(required=True)
+        inputs.add_argument('--input', default=None,
                             help=("Path to the file with input attributes. "
                                   "The content consists of ':' separated "
                                   "parameter names and their values. "
@@ -1223,6 +1343,16 @@ class MappingEngineTester(BaseApp):
                                   "EMAIL: me@example.com\n"
                                   "LOGIN: me\n"
                                   "GROUPS: group1;group2;group3"))
+        inputs.add_argument('--batch', default=None,
+                            help=("Evaluate many assertions and report "
+                                  "per-assertion results, throughput and "
+                                  "latency percentiles. Path to either a "
+                                  "directory of files in the --input format, "
+                                  "or a JSON Lines file with one JSON object "
+                                  "of input attributes per line, for "
+                                  "example:\n "
+                                  '{"LOGIN": "me", '
+                                  '"GROUPS": ["group1", "group2"]}'))
         parser.add_argument('--prefix', default=None,
                             help=("A prefix used for each environment "
                                   "variable in the assertion. For example, "
@@ -1232,6 +1362,10 @@ class MappingEngineTester(BaseApp):
                             default=False, action="store_true",
                             help=("Enable debug messages from the mapping "
                                   "engine."))
+        parser.add_argument('--summary-only',
+                            default=False, action="store_true",
+                            help=("With --batch, only print the summary, "
+                                  "not the result of every assertion."))
 
 
 class MappingPopulate(BaseApp):
@@ -17,11 +17,14 @@
 import os
 
 import dogpile.cache
+from dogpile.cache import api
+from dogpile.cache import proxy
 from dogpile.cache import region
 from dogpile.cache import util
 from oslo_cache import core as cache
 
 from keystone.common.cache import _context_cache
+from keystone.common import metrics
 import keystone.conf
 
 
@@ -77,6 +80,40 @@ class DistributedInvalidationStrategy(region.RegionInvalidationStrategy):
         return False
 
 
+CACHE_HITS = metrics.counter(
+    'keystone_cache_hits_total',
+    'Number of cache lookups that found a value, by region.', ('region',))
+CACHE_MISSES = metrics.counter(
+    'keystone_cache_misses_total',
+    'Number of cache lookups that did not find a value, by region.',
+    ('region',))
+
+
+class _MetricsProxy(proxy.ProxyBackend):
+    """Count the hits and misses of the lookups in a region."""
+
+    def __init__(self, region_name):
+        super(_MetricsProxy, self).__init__()
+        self.region_name = region_name
+
+    def _count(self, values):
+        misses = sum(1 for value in values if value is api.NO_VALUE)
+        if misses:
+            CACHE_MISSES.inc(misses, region=self.region_name)
+        if len(values) > misses:
+            CACHE_HITS.inc(len(values) - misses, region=self.region_name)
+
+    def get(self, key):
+        value = self.proxied.get(key)
+        self._count([value])
+        return value
+
+    def get_multi(self, keys):
+        values = self.proxied.get_multi(keys)
+        self._count(values)
+        return values
+
+
 def key_mangler_factory(invalidation_manager, orig_key_mangler):
     def key_mangler(key):
         # NOTE(dstanek): Since *all* keys go through the key mangler we
@@ -126,6 +163,9 @@ def configure_cache(region=None):
     # to oslo_cache lib somehow.
     if not configured:
         region.wrap(_context_cache._ResponseCacheProxy)
+        # NOTE: Wrapped last so that values found in the request local
+        # cache count as hits.
+        region.wrap(_MetricsProxy(region.name))
 
         region_manager = RegionInvalidationManager(
             CACHE_INVALIDATION_REGION, region.name)
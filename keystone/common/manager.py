@@ -21,12 +21,19 @@ from oslo_log import log
 import six
 import stevedore
 
+from keystone.common import metrics
 from keystone.common import provider_api
 from keystone.i18n import _
 
 
 LOG = log.getLogger(__name__)
 
+MANAGER_CALL_SECONDS = metrics.histogram(
+    'keystone_manager_call_duration_seconds',
+    'Time spent in the public methods of managers and in the driver methods '
+    'called through them, by provider API and method.',
+    ('manager', 'method'))
+
 if hasattr(inspect, 'getfullargspec'):
     getargspec = inspect.getfullargspec
 else:
@@ -69,6 +76,14 @@ def response_truncated(f):
     return wrapper
 
 
+def _time_driver_call(f, manager, name):
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        with MANAGER_CALL_SECONDS.time(manager=manager, method=name):
+            return f(*args, **kwargs)
+    return wrapper
+
+
 def load_driver(namespace, driver_name, *args):
     try:
         driver_manager = stevedore.DriverManager(namespace,
@@ -82,11 +97,12 @@ def load_driver(namespace, driver_name, *args):
 
 
 class _TraceMeta(type):
-    """A metaclass that, in trace mode, will log entry and exit of methods.
+    """A metaclass that times methods and, in trace mode, logs them.
 
     This metaclass automatically wraps all methods on the class when
-    instantiated with a decorator that will log entry/exit from a method
-    when keystone is run in Trace log level.
+    instantiated with a decorator that records their duration in
+    ``MANAGER_CALL_SECONDS`` and will log entry/exit from a method when
+    keystone is run in Trace log level.
     """
 
     @staticmethod
@@ -118,9 +134,16 @@ class _TraceMeta(type):
                 __exc = e
                 raise
             finally:
+                __run_time = time.time() - __t
+                __manager = None
+                if __arg_idx and args:
+                    __manager = getattr(args[0], '_provides_api', None)
+                MANAGER_CALL_SECONDS.observe(
+                    __run_time, manager=__manager or __classname,
+                    method=__f.__name__)
                 if __do_trace:
                     __subst = {
-                        'run_time': (time.time() - __t),
+                        'run_time': __run_time,
                         'passed_args': ', '.join([
                             ', '.join([repr(a)
                                        for a in args[__arg_idx:]]),
@@ -199,6 +222,8 @@ class Manager(object):
 
         f = getattr(self.driver, name)
         if callable(f):
+            if isinstance(f, types.MethodType):
+                f = _time_driver_call(f, self._provides_api, name)
             # NOTE(dstanek): only if this is callable (class or function)
             # cache this
             setattr(self, name, f)
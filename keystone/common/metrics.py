@@ -0,0 +1,284 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""In-process metrics collected by keystone.
+
+Metrics are registered once, at import time, in the process wide registry
+and updated by the code paths they describe. They follow the Prometheus data
+model: every metric has a name, a help string and a fixed set of label names,
+and is one of a counter, a gauge or a histogram. :func:`render` formats them
+in the Prometheus text exposition format.
+
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+
+import six
+
+
+# Content type of the text returned by render().
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Default histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric(object):
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError('Metric %(name)s expects the labels %(expected)s'
+                             ', got %(actual)s' %
+                             {'name': self.name,
+                              'expected': sorted(self.labelnames),
+                              'actual': sorted(labels)})
+        return tuple(six.text_type(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key):
+        return dict(zip(self.labelnames, key))
+
+    def samples(self):
+        """Return a list of ``(name, labels, value)`` tuples."""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, self._labels(key), value)
+                for key, value in items]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """A value that only goes up, such as a number of cache hits."""
+
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """A value that can go up and down, such as a number of connections.
+
+    Instead of being set, the value of a gauge can be computed when it is
+    collected by a callback returning an iterable of ``(labels, value)``
+    pairs.
+
+    """
+
+    metric_type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super(Gauge, self).__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        key = self._key(labels)
+        for sample_labels, value in self._collect():
+            if self._key(sample_labels) == key:
+                return value
+        return 0
+
+    def _collect(self):
+        if self.callback is not None:
+            return list(self.callback())
+        with self._lock:
+            return [(self._labels(key), value)
+                    for key, value in self._values.items()]
+
+    def samples(self):
+        return sorted(((self.name, labels, value)
+                       for labels, value in self._collect()),
+                      key=lambda s: self._key(s[1]))
+
+
+class Histogram(_Metric):
+    """A distribution of observed values, such as request durations."""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = {
+                    'buckets': [0] * len(self.buckets), 'sum': 0.0,
+                    'count': 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                data['buckets'][index] += 1
+            data['sum'] += value
+            data['count'] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block, in seconds."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start, **labels)
+
+    def count(self, **labels):
+        data = self._values.get(self._key(labels))
+        return data['count'] if data else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, dict(data, buckets=list(data['buckets'])))
+                           for key, data in self._values.items())
+        samples = []
+        for key, data in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, data['buckets']):
+                cumulative += count
+                samples.append((self.name + '_bucket',
+                                dict(labels, le=repr(float(bound))),
+                                cumulative))
+            samples.append((self.name + '_bucket', dict(labels, le='+Inf'),
+                            data['count']))
+            samples.append((self.name + '_sum', labels, data['sum']))
+            samples.append((self.name + '_count', labels, data['count']))
+        return samples
+
+
+class Registry(object):
+    """The set of metrics collected by a process."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Register a metric, or return the one already registered.
+
+        Registering the same name twice returns the existing metric so that
+        modules defining metrics can safely be imported more than once. It is
+        an error to register a name with a different type or labels.
+
+        """
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if (type(existing) is not type(metric) or
+                existing.labelnames != metric.labelnames):
+            raise ValueError('Metric %s is already registered with a '
+                             'different type or labels' % metric.name)
+        return existing
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def collect(self):
+        """Return the registered metrics sorted by name."""
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=(), callback=None):
+    return REGISTRY.register(Gauge(name, documentation, labelnames,
+                                   callback=callback))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames,
+                                       buckets=buckets))
+
+
+def _escape(value, quote=True):
+    value = value.replace('\\', '\\\\').replace('\n', '\\n')
+    if quote:
+        value = value.replace('"', '\\"')
+    return value
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, six.integer_types):
+        return str(value)
+    value = float(value)
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    return repr(value)
+
+
+def render(registry=None):
+    """Return the metrics of a registry in the Prometheus text format.
+
+    :param registry: the registry to render, the process wide one by default
+    :returns: the text to serve with the :data:`CONTENT_TYPE` content type
+    :rtype: str
+
+    """
+    registry = registry or REGISTRY
+    lines = []
+    for metric in registry.collect():
+        lines.append('# HELP %s %s' % (
+            metric.name, _escape(metric.documentation, quote=False)))
+        lines.append('# TYPE %s %s' % (metric.name, metric.metric_type))
+        for name, labels, value in metric.samples():
+            if labels:
+                name += '{%s}' % ','.join(
+                    '%s="%s"' % (label, _escape(six.text_type(labels[label])))
+                    for label in sorted(labels))
+            lines.append('%s %s' % (name, _format_value(value)))
+    return '\n'.join(lines) + '\n'
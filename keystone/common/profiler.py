@@ -10,6 +10,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import threading
+import time
+
 from oslo_log import log
 import osprofiler.initializer
 
@@ -44,3 +48,65 @@ def setup(name, host='0.0.0.0'):  # nosec
                  "set in /etc/keystone/keystone.conf:\n"
                  "[profiler]\n"
                  "enabled=false")
+
+
+class StartupProfile(object):
+    """Time spent in each step of loading the application.
+
+    Steps are recorded as ``(kind, name, seconds)``, where kind is ``api``
+    for registering the blueprints of an API module, ``import`` for
+    importing an API module loaded by name and ``manager`` for building a
+    manager and its driver.
+    """
+
+    def __init__(self):
+        self._steps = []
+        self._reported = False
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self, kind, name):
+        """Record the duration of the block as a step."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            with self._lock:
+                self._steps.append((kind, name, elapsed))
+            if self._reported and CONF.wsgi.startup_profile:
+                LOG.info('Loaded %(kind)s %(name)s on first use in '
+                         '%(ms).1f ms',
+                         {'kind': kind, 'name': name, 'ms': elapsed * 1000})
+
+    def steps(self):
+        with self._lock:
+            return list(self._steps)
+
+    def report(self):
+        """Return a table of the steps, slowest first."""
+        steps = sorted(self.steps(), key=lambda step: -step[2])
+        lines = ['%-8s %-50s %10s' % ('kind', 'name', 'ms')]
+        for kind, name, elapsed in steps:
+            lines.append('%-8s %-50s %10.1f' % (kind, name, elapsed * 1000))
+        lines.append('%-8s %-50s %10.1f' % (
+            'total', '', sum(step[2] for step in steps) * 1000))
+        return '\n'.join(lines)
+
+    def log_report(self):
+        """Log the steps recorded so far, if enabled by configuration.
+
+        Steps recorded afterwards, when an API or a manager is loaded on
+        first use, are logged one by one.
+        """
+        if CONF.wsgi.startup_profile:
+            LOG.info('Application startup profile:\n%s', self.report())
+        self._reported = True
+
+    def clear(self):
+        with self._lock:
+            del self._steps[:]
+        self._reported = False
+
+
+STARTUP_PROFILE = StartupProfile()
@@ -10,6 +10,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import threading
+
 
 class ProviderAPIRegistry(object):
     __shared_object_state = {}
@@ -34,10 +36,13 @@ class ProviderAPIRegistry(object):
     def __getattr__(self, item):
         """Do attr lookup."""
         try:
-            return self.__registry[item]
+            obj = self.__registry[item]
         except KeyError:
             raise AttributeError(
                 "'ProviderAPIs' has no attribute %s" % item)
+        if isinstance(obj, _DeferredProviderAPI):
+            obj = obj.load()
+        return obj
 
     def __setattr__(self, key, value):
         """Do not allow setting values on the registry object."""
@@ -49,6 +54,13 @@ class ProviderAPIRegistry(object):
         if name == 'driver':
             raise ValueError('A provider may not be named "driver".')
 
+        # NOTE: A provider registered as deferred registers itself when it
+        # is built on first lookup, which may be after the registry is
+        # locked.
+        if isinstance(self.__registry.get(name), _DeferredProviderAPI):
+            self.__registry[name] = obj
+            return
+
         if self.locked:
             raise RuntimeError(
                 'Programming Error: The provider api registry has been '
@@ -62,6 +74,16 @@ class ProviderAPIRegistry(object):
                                             'prov': self.__registry[name]})
         self.__registry[name] = obj
 
+    def _register_deferred_provider_api(self, name, loader):
+        """Register a provider api that is built on its first lookup.
+
+        :param name: The api name, e.g. "oauth_api"
+        :type name: str
+        :param loader: callable building the provider api, which registers
+                       itself under `name` like any manager does
+        """
+        self._register_provider_api(name, _DeferredProviderAPI(name, loader))
+
     def _clear_registry_instances(self):
         """ONLY USED FOR TESTING."""
         self.__registry.clear()
@@ -97,6 +119,26 @@ class ProviderAPIRegistry(object):
         return DeferredProviderLookup(api, method)
 
 
+class _DeferredProviderAPI(object):
+    """Placeholder for a provider api that has not been built yet."""
+
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._obj = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._obj is None:
+            with self._lock:
+                if self._obj is None:
+                    self._obj = self._loader()
+        return self._obj
+
+    def __repr__(self):
+        return '<deferred provider api %s>' % self.name
+
+
 class DuplicateProviderError(Exception):
     """Attempting to register a duplicate API provider."""
 
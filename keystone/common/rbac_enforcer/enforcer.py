@@ -11,15 +11,20 @@
 # under the License.
 
 import functools
+import threading
 
 import flask
 from oslo_log import log
+from oslo_policy import _checks
 from oslo_policy import policy as common_policy
 from oslo_utils import strutils
+from oslo_utils import timeutils
 
 from keystone.common import authorization
 from keystone.common import context
+from keystone.common import metrics
 from keystone.common import policies
+from keystone.common.rbac_enforcer import evaluator
 from keystone.common import provider_api
 from keystone.common import utils
 import keystone.conf
@@ -37,6 +42,135 @@ _POSSIBLE_TARGET_ACTIONS = frozenset([
     rule in policies.list_rules() if not rule.deprecated_for_removal
 ])
 _ENFORCEMENT_CHECK_ATTR = 'keystone:RBAC:enforcement_called'
+_DECISION_CACHE_ATTR = 'keystone:RBAC:policy_decisions'
+
+# The maximum number of decisions kept by the process wide decision cache.
+DECISION_CACHE_SIZE = 10000
+
+DECISION_CACHE_HITS = metrics.counter(
+    'keystone_policy_decision_cache_hits_total',
+    'Policy decisions reused instead of being evaluated.', ('cache',))
+DECISION_CACHE_MISSES = metrics.counter(
+    'keystone_policy_decision_cache_misses_total',
+    'Policy decisions evaluated by the policy engine.')
+
+
+def _freeze(value):
+    """Return a hashable representation of credentials or target data."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _credentials_fingerprint(ctxt):
+    # NOTE: The token is left out, the other values are derived from it and
+    # it stays the same for the whole request. Rules reading the token from
+    # the credentials are never cached across requests.
+    policy_values = ctxt.to_policy_values()
+    return _freeze({k: v for k, v in policy_values.items() if k != 'token'})
+
+
+def _is_target_independent(rule, rules, seen=None):
+    """Whether a rule only depends on the credentials it is checked with.
+
+    Rules made of role checks and comparisons of credentials with literal
+    values qualify. Rules substituting target values, reading the token from
+    the credentials or using other kinds of checks, which could call out to
+    external services, don't.
+
+    """
+    if isinstance(rule, evaluator.CompiledCheck):
+        rule = rule.source
+    if isinstance(rule, (_checks.TrueCheck, _checks.FalseCheck)):
+        return True
+    if isinstance(rule, (_checks.AndCheck, _checks.OrCheck)):
+        return all(_is_target_independent(r, rules, seen)
+                   for r in rule.rules)
+    if isinstance(rule, _checks.NotCheck):
+        return _is_target_independent(rule.rule, rules, seen)
+    if isinstance(rule, _checks.RuleCheck):
+        seen = seen or set()
+        if rule.match in seen:
+            return False
+        seen.add(rule.match)
+        if rule.match not in rules:
+            return True
+        return _is_target_independent(rules[rule.match], rules, seen)
+    if isinstance(rule, _checks.RoleCheck):
+        return '%(' not in rule.match
+    if type(rule) is _checks.GenericCheck:
+        return ('%(' not in rule.match and
+                rule.kind.split('.')[0] != 'token')
+    return False
+
+
+class _DecisionCache(object):
+    """Policy decisions shared by the requests served by a process.
+
+    Only decisions of rules that don't depend on the target are kept, for
+    ``[policy] decision_cache_time`` seconds. The cache is emptied when the
+    policy rules are reloaded.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._decisions = {}
+        self._rules = None
+        self._independent_rules = {}
+
+    def _check_rules(self, rules):
+        if rules is not self._rules:
+            self._decisions.clear()
+            self._independent_rules.clear()
+            self._rules = rules
+
+    def is_cacheable(self, action, rules):
+        with self._lock:
+            self._check_rules(rules)
+            cacheable = self._independent_rules.get(action)
+            if cacheable is None:
+                cacheable = action in rules and _is_target_independent(
+                    rules[action], rules)
+                self._independent_rules[action] = cacheable
+            return cacheable
+
+    def get(self, key, rules):
+        now = timeutils.utcnow_ts(microsecond=True)
+        with self._lock:
+            self._check_rules(rules)
+            entry = self._decisions.get(key)
+        if entry is None or entry[0] <= now:
+            return None
+        return entry[1]
+
+    def set(self, key, allowed, rules, cache_time):
+        now = timeutils.utcnow_ts(microsecond=True)
+        with self._lock:
+            self._check_rules(rules)
+            if len(self._decisions) >= DECISION_CACHE_SIZE:
+                for cached_key, (expires_at, dummy) in list(
+                        self._decisions.items()):
+                    if expires_at <= now:
+                        del self._decisions[cached_key]
+                if len(self._decisions) >= DECISION_CACHE_SIZE:
+                    self._decisions.clear()
+            self._decisions[key] = (now + cache_time, allowed)
+
+    def clear(self):
+        with self._lock:
+            self._decisions.clear()
+            self._independent_rules.clear()
+            self._rules = None
+
+
+_DECISION_CACHE = _DecisionCache()
 
 
 class RBACEnforcer(object):
@@ -77,6 +211,12 @@ class RBACEnforcer(object):
             extra.update(exc=exception.ForbiddenAction, action=action,
                          do_raise=do_raise)
 
+        # NOTE: Rules reloaded by oslo.policy, after the policy file changed,
+        # are compiled again before they are used.
+        rule = self._enforcer.rules.get(action)
+        if rule is not None and not isinstance(rule, evaluator.CompiledCheck):
+            evaluator.compile_rules(self._enforcer)
+
         try:
             return self._enforcer.enforce(
                 rule=action, target=target, creds=credentials, **extra)
@@ -86,6 +226,53 @@ class RBACEnforcer(object):
     def _reset(self):
         # NOTE(morgan): Used for TEST purposes only.
         self.__ENFORCER = None
+        _DECISION_CACHE.clear()
+
+    def _enforce_cached(self, ctxt, action, target):
+        """Enforce a policy, reusing earlier decisions when possible.
+
+        Decisions are keyed by a fingerprint of the credentials, the action
+        and the target. They are kept for the rest of the request and, for
+        rules that don't depend on the target, in the process wide cache.
+
+        :raises keystone.exception.ForbiddenAction: If the action is denied.
+        """
+        fingerprint = _credentials_fingerprint(ctxt)
+        request_key = (fingerprint, action, _freeze(target))
+        decisions = getattr(flask.g, _DECISION_CACHE_ATTR, None)
+        if decisions is None:
+            decisions = {}
+            setattr(flask.g, _DECISION_CACHE_ATTR, decisions)
+
+        allowed = decisions.get(request_key)
+        if allowed is not None:
+            DECISION_CACHE_HITS.inc(cache='request')
+        else:
+            cache_time = CONF.policy.decision_cache_time
+            process_key = None
+            if cache_time:
+                self._enforcer.load_rules()
+                rules = self._enforcer.rules
+                if _DECISION_CACHE.is_cacheable(action, rules):
+                    process_key = (fingerprint, action)
+                    allowed = _DECISION_CACHE.get(process_key, rules)
+            if allowed is not None:
+                DECISION_CACHE_HITS.inc(cache='process')
+            else:
+                DECISION_CACHE_MISSES.inc()
+                try:
+                    self._enforce(credentials=ctxt, action=action,
+                                  target=target)
+                    allowed = True
+                except exception.ForbiddenAction:
+                    allowed = False
+                if process_key is not None:
+                    _DECISION_CACHE.set(process_key, allowed, rules,
+                                        cache_time)
+            decisions[request_key] = allowed
+
+        if not allowed:
+            raise exception.ForbiddenAction(action=action)
 
     @property
     def _enforcer(self):
@@ -93,6 +280,8 @@ class RBACEnforcer(object):
         if self.__ENFORCER is None:
             self.__ENFORCER = common_policy.Enforcer(CONF)
             self.register_rules(self.__ENFORCER)
+            self.__ENFORCER.load_rules()
+            evaluator.compile_rules(self.__ENFORCER)
         return self.__ENFORCER
 
     @staticmethod
@@ -388,8 +577,7 @@ class RBACEnforcer(object):
         ctxt = cls._get_oslo_req_context()
         # Instantiate the enforcer object if needed.
         enforcer_obj = enforcer or cls()
-        enforcer_obj._enforce(
-            credentials=ctxt, action=action, target=flattened)
+        enforcer_obj._enforce_cached(ctxt, action, flattened)
         LOG.debug('RBAC: Authorization granted')
 
     @classmethod
@@ -0,0 +1,258 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compile oslo.policy rules into Python callables.
+
+oslo.policy parses every policy into a tree of check objects and walks it on
+each enforcement, formatting the target into the string of every check it
+meets. The check types keystone policies are written with are compiled here,
+once, into closures: role checks become set membership tests and references
+to the target such as ``%(target.project.id)s`` become direct lookups.
+
+Checks of other types, such as ``http:`` or checks registered by other
+libraries, are left to oslo.policy to evaluate.
+
+"""
+
+import ast
+import re
+
+from oslo_policy import _checks
+import six
+
+
+# A check string which is a single reference to the target, the only kind of
+# formatting compiled into a lookup.
+_TARGET_REFERENCE = re.compile(r'^%\(([^)]+)\)s$')
+
+
+class CompiledCheck(_checks.BaseCheck):
+    """A policy check evaluated by a compiled callable.
+
+    It replaces the check it was compiled from in the rules of the enforcer,
+    and renders as that check.
+
+    """
+
+    def __init__(self, source, func):
+        self.source = source
+        self._func = func
+
+    def __str__(self):
+        return str(self.source)
+
+    def __call__(self, target, creds, enforcer, current_rule=None):
+        return self._func(target, creds, enforcer, current_rule, {})
+
+
+def _true(target, creds, enforcer, current_rule, state):
+    return True
+
+
+def _false(target, creds, enforcer, current_rule, state):
+    return False
+
+
+def _roles(creds, state):
+    # The lower-cased roles of the credentials, computed once per enforcement
+    # however many role checks the rule has.
+    roles = state.get('roles')
+    if roles is None:
+        roles = frozenset(role.lower() for role in creds.get('roles') or ())
+        state['roles'] = roles
+    return roles
+
+
+def _compile_match(match):
+    """Return a callable formatting a check string with the target.
+
+    It raises KeyError if the target doesn't have the referenced value, like
+    formatting the string does. None is returned for strings that are not a
+    literal or a single reference to the target.
+
+    """
+    if '%' not in match:
+        return lambda target: match
+    reference = _TARGET_REFERENCE.match(match)
+    if reference is None:
+        return None
+    key = reference.group(1)
+    return lambda target: '%s' % (target[key],)
+
+
+def _compile_roles(names):
+    wanted = frozenset(name.lower() for name in names)
+
+    def check(target, creds, enforcer, current_rule, state):
+        return not wanted.isdisjoint(_roles(creds, state))
+    return check
+
+
+def _compile_role(rule):
+    if '%' not in rule.match:
+        return _compile_roles([rule.match])
+    value = _compile_match(rule.match)
+    if value is None:
+        return None
+
+    def check(target, creds, enforcer, current_rule, state):
+        try:
+            match = value(target)
+        except KeyError:
+            return False
+        return match.lower() in _roles(creds, state)
+    return check
+
+
+def _compile_generic(rule):
+    value = _compile_match(rule.match)
+    if value is None:
+        return None
+
+    try:
+        literal = ast.literal_eval(rule.kind)
+    except ValueError:
+        pass
+    except SyntaxError:
+        return None
+    else:
+        expected = six.text_type(literal)
+
+        def check(target, creds, enforcer, current_rule, state):
+            try:
+                return value(target) == expected
+            except KeyError:
+                return False
+        return check
+
+    path = rule.kind.split('.')
+    key = path[0]
+    find_in_dict = rule._find_in_dict
+
+    def check(target, creds, enforcer, current_rule, state):
+        try:
+            match = value(target)
+        except KeyError:
+            return False
+        if len(path) > 1:
+            return find_in_dict(creds, path, match)
+        try:
+            actual = creds[key]
+        except KeyError:
+            return False
+        if isinstance(actual, list):
+            return find_in_dict(creds, path, match)
+        return match == six.text_type(actual)
+    return check
+
+
+def _compile_rule_reference(rule):
+    name = rule.match
+
+    def check(target, creds, enforcer, current_rule, state):
+        try:
+            referenced = enforcer.rules[name]
+        except KeyError:
+            return False
+        if isinstance(referenced, CompiledCheck):
+            return referenced._func(target, creds, enforcer, current_rule,
+                                    state)
+        return _checks._check(rule=referenced, target=target, creds=creds,
+                              enforcer=enforcer, current_rule=current_rule)
+    return check
+
+
+def _compile_and(rule):
+    funcs = [_compile(r) for r in rule.rules]
+
+    def check(target, creds, enforcer, current_rule, state):
+        for func in funcs:
+            if not func(target, creds, enforcer, current_rule, state):
+                return False
+        return True
+    return check
+
+
+def _compile_or(rule):
+    # Literal role checks are merged into a single set intersection.
+    roles = [r.match for r in rule.rules
+             if type(r) is _checks.RoleCheck and '%' not in r.match]
+    if len(roles) > 1:
+        funcs = [_compile_roles(roles)] + [
+            _compile(r) for r in rule.rules
+            if not (type(r) is _checks.RoleCheck and '%' not in r.match)]
+    else:
+        funcs = [_compile(r) for r in rule.rules]
+
+    def check(target, creds, enforcer, current_rule, state):
+        for func in funcs:
+            if func(target, creds, enforcer, current_rule, state):
+                return True
+        return False
+    return check
+
+
+def _compile_not(rule):
+    func = _compile(rule.rule)
+
+    def check(target, creds, enforcer, current_rule, state):
+        return not func(target, creds, enforcer, current_rule, state)
+    return check
+
+
+def _fallback(rule):
+    def check(target, creds, enforcer, current_rule, state):
+        return _checks._check(rule=rule, target=target, creds=creds,
+                              enforcer=enforcer, current_rule=current_rule)
+    return check
+
+
+# NOTE: Check types are matched exactly, subclasses may behave differently
+# and are evaluated by oslo.policy.
+_COMPILERS = {
+    _checks.TrueCheck: lambda rule: _true,
+    _checks.FalseCheck: lambda rule: _false,
+    _checks.AndCheck: _compile_and,
+    _checks.OrCheck: _compile_or,
+    _checks.NotCheck: _compile_not,
+    _checks.RuleCheck: _compile_rule_reference,
+    _checks.RoleCheck: _compile_role,
+    _checks.GenericCheck: _compile_generic,
+}
+
+
+def _compile(rule):
+    if isinstance(rule, CompiledCheck):
+        return rule._func
+    compiler = _COMPILERS.get(type(rule))
+    func = compiler(rule) if compiler is not None else None
+    return func if func is not None else _fallback(rule)
+
+
+def compile_check(rule):
+    """Return a check evaluating the same as an oslo.policy check."""
+    if isinstance(rule, CompiledCheck):
+        return rule
+    return CompiledCheck(rule, _compile(rule))
+
+
+def compile_rules(enforcer):
+    """Replace the loaded rules of an enforcer by compiled checks.
+
+    Rules already compiled are left as they are, so this is cheap to call
+    again after oslo.policy has reloaded some of the rules.
+
+    """
+    rules = enforcer.rules
+    for name, rule in list(rules.items()):
+        if not isinstance(rule, CompiledCheck):
+            rules[name] = compile_check(rule)
@@ -10,6 +10,13 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import collections
+try:
+    from collections import abc as collections_abc
+except ImportError:  # Python 2
+    import collections as collections_abc
+
+from keystone.common import metrics
 from keystone.common import provider_api
 import keystone.conf
 
@@ -17,129 +24,211 @@ import keystone.conf
 CONF = keystone.conf.CONF
 PROVIDERS = provider_api.ProviderAPIs
 
+LAZY_REFERENCES = metrics.counter(
+    'keystone_token_reference_lazy_total',
+    'Lazy token references built, one per authenticated request.')
+MATERIALIZED_ATTRIBUTES = metrics.counter(
+    'keystone_token_reference_materialized_total',
+    'Attributes of lazy token references computed because they were read.',
+    ('attribute',))
 
-def render_token_response_from_model(token, include_catalog=True):
-    token_reference = {
-        'token': {
-            'methods': token.methods,
-            'user': {
-                'domain': {
-                    'id': token.user_domain['id'],
-                    'name': token.user_domain['name']
-                },
-                'id': token.user_id,
-                'name': token.user['name'],
-                'password_expires_at': token.user[
-                    'password_expires_at'
-                ]
-            },
-            'audit_ids': token.audit_ids,
-            'expires_at': token.expires_at,
-            'issued_at': token.issued_at,
-        }
-    }
-    if token.system_scoped:
-        token_reference['token']['roles'] = token.roles
-        token_reference['token']['system'] = {'all': True}
-    elif token.domain_scoped:
-        token_reference['token']['domain'] = {
-            'id': token.domain['id'],
-            'name': token.domain['name']
-        }
-        token_reference['token']['roles'] = token.roles
-    elif token.trust_scoped:
-        token_reference['token']['OS-TRUST:trust'] = {
-            'id': token.trust_id,
-            'trustor_user': {'id': token.trustor['id']},
-            'trustee_user': {'id': token.trustee['id']},
-            'impersonation': token.trust['impersonation']
-        }
-        token_reference['token']['project'] = {
+
+def _render_user(token):
+    if token.trust_scoped and token.trust.get('impersonation'):
+        trustor_domain = PROVIDERS.resource_api.get_domain(
+            token.trustor['domain_id']
+        )
+        user = {
             'domain': {
-                'id': token.project_domain['id'],
-                'name': token.project_domain['name']
+                'id': trustor_domain['id'],
+                'name': trustor_domain['name']
             },
-            'id': token.trust_project['id'],
-            'name': token.trust_project['name']
+            'id': token.trustor['id'],
+            'name': token.trustor['name'],
+            'password_expires_at': token.trustor['password_expires_at']
         }
-        if token.trust.get('impersonation'):
-            trustor_domain = PROVIDERS.resource_api.get_domain(
-                token.trustor['domain_id']
-            )
-            token_reference['token']['user'] = {
-                'domain': {
-                    'id': trustor_domain['id'],
-                    'name': trustor_domain['name']
-                },
-                'id': token.trustor['id'],
-                'name': token.trustor['name'],
-                'password_expires_at': token.trustor[
-                    'password_expires_at'
-                ]
-            }
-        token_reference['token']['roles'] = token.roles
-    elif token.project_scoped:
-        token_reference['token']['project'] = {
+    else:
+        user = {
             'domain': {
-                'id': token.project_domain['id'],
-                'name': token.project_domain['name']
+                'id': token.user_domain['id'],
+                'name': token.user_domain['name']
             },
-            'id': token.project['id'],
-            'name': token.project['name']
+            'id': token.user_id,
+            'name': token.user['name'],
+            'password_expires_at': token.user['password_expires_at']
         }
-        token_reference['token']['is_domain'] = token.project.get(
-            'is_domain', False
-        )
-        token_reference['token']['roles'] = token.roles
-        ap_name = CONF.resource.admin_project_name
-        ap_domain_name = CONF.resource.admin_project_domain_name
-        if ap_name and ap_domain_name:
-            is_ap = (
-                token.project['name'] == ap_name and
-                ap_domain_name == token.project_domain['name']
-            )
-            token_reference['token']['is_admin_project'] = is_ap
-    if include_catalog and not token.unscoped:
-        user_id = token.user_id
-        if token.trust_id:
-            user_id = token.trust['trustor_user_id']
-        catalog = PROVIDERS.catalog_api.get_v3_catalog(
-            user_id, token.project_id
-        )
-        token_reference['token']['catalog'] = catalog
-    sps = PROVIDERS.federation_api.get_enabled_service_providers()
-    if sps:
-        token_reference['token']['service_providers'] = sps
     if token.is_federated:
         PROVIDERS.federation_api.get_idp(token.identity_provider_id)
-        federated_dict = dict(
+        user['OS-FEDERATION'] = dict(
             groups=token.federated_groups,
             identity_provider={'id': token.identity_provider_id},
             protocol={'id': token.protocol_id},
-
         )
-        token_reference['token']['user']['OS-FEDERATION'] = (
-            federated_dict
-        )
-        token_reference['token']['user']['domain'] = {
-            'id': 'Federated', 'name': 'Federated'
-        }
-        del token_reference['token']['user']['password_expires_at']
-    if token.access_token_id:
-        token_reference['token']['OS-OAUTH1'] = {
-            'access_token_id': token.access_token_id,
-            'consumer_id': token.access_token['consumer_id']
-        }
-    if token.application_credential_id:
-        key = 'application_credential'
-        token_reference['token'][key] = {}
-        token_reference['token'][key]['id'] = (
-            token.application_credential['id']
-        )
-        token_reference['token'][key]['name'] = (
-            token.application_credential['name']
-        )
-        restricted = not token.application_credential['unrestricted']
-        token_reference['token'][key]['restricted'] = restricted
+        user['domain'] = {'id': 'Federated', 'name': 'Federated'}
+        del user['password_expires_at']
+    return user
+
+
+def _render_trust(token):
+    return {
+        'id': token.trust_id,
+        'trustor_user': {'id': token.trustor['id']},
+        'trustee_user': {'id': token.trustee['id']},
+        'impersonation': token.trust['impersonation']
+    }
+
+
+def _render_project(token):
+    project = token.trust_project if token.trust_scoped else token.project
+    return {
+        'domain': {
+            'id': token.project_domain['id'],
+            'name': token.project_domain['name']
+        },
+        'id': project['id'],
+        'name': project['name']
+    }
+
+
+def _render_is_admin_project(token):
+    return (
+        token.project['name'] == CONF.resource.admin_project_name and
+        CONF.resource.admin_project_domain_name ==
+        token.project_domain['name']
+    )
+
+
+def _render_catalog(token):
+    user_id = token.user_id
+    if token.trust_id:
+        user_id = token.trust['trustor_user_id']
+    return PROVIDERS.catalog_api.get_v3_catalog(user_id, token.project_id)
+
+
+def _render_access_token(token):
+    return {
+        'access_token_id': token.access_token_id,
+        'consumer_id': token.access_token['consumer_id']
+    }
+
+
+def _render_application_credential(token):
+    return {
+        'id': token.application_credential['id'],
+        'name': token.application_credential['name'],
+        'restricted': not token.application_credential['unrestricted']
+    }
+
+
+class TokenView(collections_abc.Mapping):
+    """The body of a token response, computed as its attributes are read.
+
+    Building the whole response means fetching the roles, the user, the
+    project and its domain, and the service catalog. Most API requests only
+    need a few of them, so the view only computes an attribute the first
+    time it is read and keeps it for the rest of the request. The names of
+    the attributes that were computed are listed in ``materialized``.
+
+    """
+
+    def __init__(self, token, include_catalog=True):
+        self.token = token
+        self.include_catalog = include_catalog
+        self.materialized = []
+        self._values = {}
+        self._renderers = self._get_renderers()
+        self._service_providers = None
+
+    def _get_renderers(self):
+        token = self.token
+        renderers = [
+            ('methods', lambda: token.methods),
+            ('user', lambda: _render_user(token)),
+            ('audit_ids', lambda: token.audit_ids),
+            ('expires_at', lambda: token.expires_at),
+            ('issued_at', lambda: token.issued_at),
+        ]
+        if token.system_scoped:
+            renderers.append(('roles', lambda: token.roles))
+            renderers.append(('system', lambda: {'all': True}))
+        elif token.domain_scoped:
+            renderers.append(('domain', lambda: {
+                'id': token.domain['id'], 'name': token.domain['name']}))
+            renderers.append(('roles', lambda: token.roles))
+        elif token.trust_scoped:
+            renderers.append(('OS-TRUST:trust', lambda: _render_trust(token)))
+            renderers.append(('project', lambda: _render_project(token)))
+            renderers.append(('roles', lambda: token.roles))
+        elif token.project_scoped:
+            renderers.append(('project', lambda: _render_project(token)))
+            renderers.append(('is_domain',
+                              lambda: token.project.get('is_domain', False)))
+            renderers.append(('roles', lambda: token.roles))
+            if (CONF.resource.admin_project_name and
+                    CONF.resource.admin_project_domain_name):
+                renderers.append(('is_admin_project',
+                                  lambda: _render_is_admin_project(token)))
+        if self.include_catalog and not token.unscoped:
+            renderers.append(('catalog', lambda: _render_catalog(token)))
+        renderers.append(('service_providers',
+                          self._get_service_providers))
+        if token.access_token_id:
+            renderers.append(('OS-OAUTH1',
+                              lambda: _render_access_token(token)))
+        if token.application_credential_id:
+            renderers.append(('application_credential',
+                              lambda: _render_application_credential(token)))
+        return collections.OrderedDict(renderers)
+
+    def _get_service_providers(self):
+        if self._service_providers is None:
+            self._service_providers = (
+                PROVIDERS.federation_api.get_enabled_service_providers()
+            )
+        return self._service_providers
+
+    def _has(self, key):
+        if key not in self._renderers:
+            return False
+        # The service providers are only part of the response if any are
+        # enabled.
+        return key != 'service_providers' or bool(
+            self._get_service_providers())
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            if not self._has(key):
+                raise KeyError(key)
+            self._values[key] = self._renderers[key]()
+            self.materialized.append(key)
+            MATERIALIZED_ATTRIBUTES.inc(attribute=key)
+        return self._values[key]
+
+    def __contains__(self, key):
+        return key in self._values or self._has(key)
+
+    def __iter__(self):
+        return (key for key in self._renderers if self._has(key))
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def to_dict(self):
+        """Compute all the attributes and return them as a dict."""
+        return {key: self._values[key] if key in self._values
+                else self._renderers[key]() for key in self}
+
+
+def render_token_response_from_model(token, include_catalog=True,
+                                     lazy=False):
+    """Render the response body of a token.
+
+    :param lazy: if True, the body of the token is a :class:`TokenView`
+                 that only computes the attributes that are read
 
-    return token_reference
+    """
+    token_view = TokenView(token, include_catalog=include_catalog)
+    if lazy:
+        LAZY_REFERENCES.inc()
+        return {'token': token_view}
+    return {'token': token_view.to_dict()}
@@ -311,6 +311,43 @@ def _wrap_session(sess):
     return sess
 
 
+_QUERY_COUNT = None
+
+
+def _get_query_count():
+    global _QUERY_COUNT
+    if _QUERY_COUNT is None:
+        # NOTE: Delay the `threading.local` import for the same reason as in
+        # _get_context().
+        import threading
+        _QUERY_COUNT = threading.local()
+    return _QUERY_COUNT
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    query_count = _get_query_count()
+    query_count.value = getattr(query_count, 'value', 0) + 1
+
+
+# Count the statements executed by every engine, so that API requests can
+# report how many they executed.
+sql.event.listen(sql.engine.Engine, 'before_cursor_execute', _count_query)
+
+
+def reset_query_count():
+    """Start counting the SQL statements executed by this thread again."""
+    _get_query_count().value = 0
+
+
+def get_query_count():
+    """Return the number of SQL statements executed by this thread.
+
+    The count is reset by :func:`reset_query_count`, at the start of each API
+    request.
+    """
+    return getattr(_get_query_count(), 'value', 0)
+
+
 def truncated(f):
     return driver_hints.truncated(f)
 
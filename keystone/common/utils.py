@@ -90,6 +90,19 @@ def flatten_dict(d, parent_key=''):
     return dict(items)
 
 
+def percentile(samples, percent):
+    """Return the ``percent`` percentile of an already sorted list.
+
+    The nearest sample is returned, without interpolation, and 0.0 if there
+    are no samples.
+
+    """
+    if not samples:
+        return 0.0
+    index = int(round((len(samples) - 1) * percent / 100.0))
+    return samples[index]
+
+
 class SmarterEncoder(jsonutils.json.JSONEncoder):
     """Help for JSON encoding dict-like objects."""
 
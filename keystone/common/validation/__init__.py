@@ -26,7 +26,7 @@ def lazy_validate(request_body_schema, resource_to_validate):
                        signature
 
     """
-    schema_validator = validators.SchemaValidator(request_body_schema)
+    schema_validator = validators.get_validator(request_body_schema)
     schema_validator.validate(resource_to_validate)
 
 
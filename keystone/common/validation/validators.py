@@ -25,6 +25,24 @@ from keystone.i18n import _
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
+# NOTE: The format checker does not keep any state between calls, so one
+# instance is shared by every validator instead of building one per request.
+_FORMAT_CHECKER = jsonschema.FormatChecker()
+
+# Compiled validators keyed by the id of their schema. The schema is kept
+# alongside the validator so that its id cannot be reused by another object.
+_VALIDATORS = {}
+
+# Compiled password_regex patterns keyed by the configured pattern.
+_PASSWORD_PATTERNS = {}
+
+
+def _compile_password_regex(pattern):
+    compiled = _PASSWORD_PATTERNS.get(pattern)
+    if compiled is None:
+        compiled = _PASSWORD_PATTERNS[pattern] = re.compile(pattern)
+    return compiled
+
 
 # TODO(rderose): extend schema validation and add this check there
 def validate_password(password):
@@ -34,7 +52,7 @@ def validate_password(password):
             detail = _("Password must be a string type")
             raise exception.PasswordValidationError(detail=detail)
         try:
-            if not re.match(pattern, password):
+            if not _compile_password_regex(pattern).match(password):
                 pattern_desc = (
                     CONF.security_compliance.password_regex_description)
                 raise exception.PasswordRequirementsValidationError(
@@ -48,24 +66,54 @@ def validate_password(password):
             raise exception.PasswordValidationError(detail=detail)
 
 
+def get_validator(schema):
+    """Return the SchemaValidator of a schema, building it on first use.
+
+    The schema is checked against the JSON Schema meta-schema when its
+    validator is built. Validators are kept for the life of the process, so
+    this is meant for the module level schemas of the ``schema.py`` modules,
+    not for schemas built per request.
+
+    :param dict schema: the schema to validate request bodies against
+    :returns: a SchemaValidator instance
+
+    """
+    cached = _VALIDATORS.get(id(schema))
+    if cached is None or cached[0] is not schema:
+        validator = SchemaValidator(schema)
+        validator.validator.check_schema(schema)
+        cached = _VALIDATORS[id(schema)] = (schema, validator)
+    return cached[1]
+
+
 class SchemaValidator(object):
     """Resource reference validator class."""
 
     validator_org = jsonschema.Draft4Validator
 
+    # Extended validator classes keyed by the class they extend.
+    _validator_classes = {}
+
     def __init__(self, schema):
-        # NOTE(lbragstad): If at some point in the future we want to extend
-        # our validators to include something specific we need to check for,
-        # we can do it here. Nova's V3 API validators extend the validator to
-        # include `self._validate_minimum` and `self._validate_maximum`. This
-        # would be handy if we needed to check for something the jsonschema
-        # didn't by default. See the Nova V3 validator for details on how this
-        # is done.
-        validators = {}
-        validator_cls = jsonschema.validators.extend(self.validator_org,
-                                                     validators)
-        fc = jsonschema.FormatChecker()
-        self.validator = validator_cls(schema, format_checker=fc)
+        self.validator = self._get_validator_class()(
+            schema, format_checker=_FORMAT_CHECKER)
+
+    @classmethod
+    def _get_validator_class(cls):
+        validator_cls = cls._validator_classes.get(cls.validator_org)
+        if validator_cls is None:
+            # NOTE(lbragstad): If at some point in the future we want to
+            # extend our validators to include something specific we need to
+            # check for, we can do it here. Nova's V3 API validators extend
+            # the validator to include `self._validate_minimum` and
+            # `self._validate_maximum`. This would be handy if we needed to
+            # check for something the jsonschema didn't by default. See the
+            # Nova V3 validator for details on how this is done.
+            validators = {}
+            validator_cls = jsonschema.validators.extend(cls.validator_org,
+                                                         validators)
+            cls._validator_classes[cls.validator_org] = validator_cls
+        return validator_cls
 
     def validate(self, *args, **kwargs):
         try:
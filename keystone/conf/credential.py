@@ -46,12 +46,28 @@ share this repository with the repository used to manage keys for Fernet
 tokens.
 """))
 
+access_key_cache_time = cfg.IntOpt(
+    'access_key_cache_time',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Time in seconds to keep the decrypted EC2 credentials used to authenticate
+`/v3/ec2tokens` and `/v3/s3tokens` requests in memory, so that requests signed
+with the same access key don't read and decrypt the credential again. The
+credentials are never written to the cache backend. They are forgotten as soon
+as they are updated or deleted through the same keystone process; other
+processes keep accepting a deleted or rotated secret until this time elapses,
+so only enable it if that delay is acceptable. Set to 0 (the default) to
+disable the cache.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     driver,
     provider,
-    key_repository
+    key_repository,
+    access_key_cache_time,
 ]
 
 
@@ -155,6 +155,61 @@ notification_opt_out=identity.user.create
 notification_opt_out=identity.authenticate.success
 """))
 
+notification_async = cfg.BoolOpt(
+    'notification_async',
+    default=False,
+    help=utils.fmt("""
+If set to true, notifications are queued in memory by the API request emitting
+them and sent to the message bus by a background thread of the keystone
+process, so that a slow message bus does not slow down API requests.
+Notifications still queued when the process exits are sent before it exits,
+waiting at most `notification_flush_timeout` seconds. In-process callbacks are
+always run synchronously. Under uWSGI the background thread only runs when the
+`enable-threads` (or `threads`) option of uWSGI is set, otherwise
+notifications are sent synchronously and a warning is logged.
+"""))
+
+notification_queue_size = cfg.IntOpt(
+    'notification_queue_size',
+    default=1000,
+    min=1,
+    help=utils.fmt("""
+Maximum number of notifications waiting to be sent when `notification_async`
+is enabled. What happens when the queue is full is set by
+`notification_overflow_policy`.
+"""))
+
+notification_batch_size = cfg.IntOpt(
+    'notification_batch_size',
+    default=100,
+    min=1,
+    help=utils.fmt("""
+Maximum number of queued notifications the background thread takes from the
+queue at once, when `notification_async` is enabled. Each notification is
+still a message of its own on the message bus.
+"""))
+
+notification_overflow_policy = cfg.StrOpt(
+    'notification_overflow_policy',
+    default='drop_newest',
+    choices=['drop_newest', 'drop_oldest', 'block'],
+    help=utils.fmt("""
+What to do with a notification emitted while the queue of
+`notification_async` is full: `drop_newest` drops the new notification,
+`drop_oldest` drops the oldest queued notification to make room for it, and
+`block` makes the API request wait until there is room in the queue. Dropped
+notifications are logged and counted.
+"""))
+
+notification_flush_timeout = cfg.IntOpt(
+    'notification_flush_timeout',
+    default=10,
+    min=0,
+    help=utils.fmt("""
+Number of seconds to wait, when the process exits, for the notifications
+queued by `notification_async` to be sent.
+"""))
+
 
 GROUP_NAME = 'DEFAULT'
 ALL_OPTS = [
@@ -170,6 +225,11 @@ ALL_OPTS = [
     default_publisher_id,
     notification_format,
     notification_opt_out,
+    notification_async,
+    notification_queue_size,
+    notification_batch_size,
+    notification_overflow_policy,
+    notification_flush_timeout,
 ]
 
 
@@ -63,6 +63,21 @@ domain_specific_drivers_enabled` is set to true. There is typically no reason
 to change this value.
 """))
 
+domain_driver_cache_size = cfg.IntOpt(
+    'domain_driver_cache_size',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Maximum number of domain-specific identity drivers kept loaded by each
+keystone process. If set to 0, the default, the configuration and driver of
+every domain with a domain-specific configuration are loaded when the
+identity API is first used. Otherwise, the configuration and driver of a
+domain are only loaded when the domain is first used, and the least recently
+used drivers are unloaded when there are more of them than this value. The
+domain using the SQL driver, if any, is never unloaded. This option has no
+effect unless `[identity] domain_specific_drivers_enabled` is set to true.
+"""))
+
 driver = cfg.StrOpt(
     'driver',
     default='sql',
@@ -172,6 +187,7 @@ ALL_OPTS = [
     domain_specific_drivers_enabled,
     domain_configurations_from_database,
     domain_config_dir,
+    domain_driver_cache_size,
     driver,
     caching,
     cache_time,
@@ -342,6 +342,40 @@ If enabled, group queries will use Active Directory specific filters for
 nested groups.
 """))
 
+user_member_of_attribute = cfg.StrOpt(
+    'user_member_of_attribute',
+    help=utils.fmt("""
+The LDAP attribute listing the DNs of the groups a user is a direct member of,
+such as `memberOf`. When set, the groups of a user are resolved from this
+attribute with searches on the group ID attribute instead of a search on the
+group member attribute across the whole group tree. Only set it if the
+directory maintains this attribute. This option has no effect when `[ldap]
+group_members_are_ids` or `[ldap] group_ad_nesting` are enabled.
+"""))
+
+membership_batch_size = cfg.IntOpt(
+    'membership_batch_size',
+    default=50,
+    min=1,
+    help=utils.fmt("""
+The maximum number of entities resolved by a single LDAP search when listing
+the users of a group, or the groups of a user through `[ldap]
+user_member_of_attribute`. The IDs are combined into one OR filter per batch.
+"""))
+
+membership_batch_concurrency = cfg.IntOpt(
+    'membership_batch_concurrency',
+    default=4,
+    min=1,
+    help=utils.fmt("""
+The maximum number of membership batch searches issued concurrently, each over
+its own pooled connection. The searches of all the requests served by a
+process share this many threads. It is capped by `[ldap] pool_size` minus one,
+so that a connection is left for other requests. This option has no effect
+unless `[ldap] use_pool` is also enabled and `[ldap] pool_size` is at least 2,
+otherwise the batches are searched one after another.
+"""))
+
 tls_cacertfile = cfg.StrOpt(
     'tls_cacertfile',
     help=utils.fmt("""
@@ -445,6 +479,20 @@ connection pool. This option has no effect unless `[ldap] use_pool` is also
 enabled.
 """))
 
+pool_prewarm_size = cfg.IntOpt(
+    'pool_prewarm_size',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+The number of connections to open and bind to the LDAP server on the first
+request served by each keystone process, so that the following requests do not
+pay the connection and bind latency. Only the pools of the LDAP identity
+drivers loaded at startup are pre-warmed; drivers loaded later, such as domain
+specific ones, open connections on demand. It is capped by `[ldap] pool_size`.
+A value of zero opens connections on demand only. This option has no effect
+unless `[ldap] use_pool` is also enabled.
+"""))
+
 use_auth_pool = cfg.BoolOpt(
     'use_auth_pool',
     default=True,
@@ -474,6 +522,65 @@ use_auth_pool` is also enabled.
 """))
 
 
+entity_cache_enabled = cfg.BoolOpt(
+    'entity_cache_enabled',
+    default=False,
+    help=utils.fmt("""
+Enable the LDAP entity cache. User and group entries fetched by ID are kept in
+memory together with the value of `[ldap] entity_cache_timestamp_attribute`.
+Once an entry is older than `[ldap] entity_cache_time` it is revalidated by
+reading only that attribute from the directory, and the full entry is fetched
+again only if it changed. This is independent from the `[identity] caching`
+memoization, which has no knowledge of directory changes.
+"""))
+
+entity_cache_time = cfg.IntOpt(
+    'entity_cache_time',
+    default=60,
+    min=0,
+    help=utils.fmt("""
+The number of seconds a cached LDAP entry is served without revalidation. A
+value of zero revalidates the entry on every read. This option has no effect
+unless `[ldap] entity_cache_enabled` is also enabled.
+"""))
+
+entity_cache_size = cfg.IntOpt(
+    'entity_cache_size',
+    default=10000,
+    min=1,
+    help=utils.fmt("""
+The maximum number of entries held by each LDAP entity cache (one for users
+and one for groups). The least recently used entries are evicted first. This
+option has no effect unless `[ldap] entity_cache_enabled` is also enabled.
+"""))
+
+entity_cache_sync_interval = cfg.IntOpt(
+    'entity_cache_sync_interval',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+The number of seconds between delta synchronizations of the LDAP entity cache.
+A delta synchronization issues a single search for entries whose timestamp
+attribute is newer than the most recent one already cached, and refreshes the
+cached entries it returns. This bounds how long a modification can go
+unnoticed independently of `[ldap] entity_cache_time`; deleted entries are
+still only detected by revalidation. A value of zero disables delta
+synchronization. This option has no effect unless `[ldap]
+entity_cache_enabled` is also enabled.
+"""))
+
+entity_cache_timestamp_attribute = cfg.StrOpt(
+    'entity_cache_timestamp_attribute',
+    default='modifyTimestamp',
+    help=utils.fmt("""
+The operational attribute used to detect changes to cached LDAP entries. It
+must be readable by the bind user and support ordering matches. Use
+`modifyTimestamp` for most directories, or `entryCSN` with OpenLDAP when
+changes within the same second must be detected. This option has no effect
+unless `[ldap] entity_cache_enabled` is also enabled.
+"""))
+
+
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     url,
@@ -514,6 +621,9 @@ ALL_OPTS = [
     group_attribute_ignore,
     group_additional_attribute_mapping,
     group_ad_nesting,
+    user_member_of_attribute,
+    membership_batch_size,
+    membership_batch_concurrency,
     tls_cacertfile,
     tls_cacertdir,
     use_tls,
@@ -525,9 +635,15 @@ ALL_OPTS = [
     pool_retry_delay,
     pool_connection_timeout,
     pool_connection_lifetime,
+    pool_prewarm_size,
     use_auth_pool,
     auth_pool_size,
     auth_pool_connection_lifetime,
+    entity_cache_enabled,
+    entity_cache_time,
+    entity_cache_size,
+    entity_cache_sync_interval,
+    entity_cache_timestamp_attribute,
 ]
 
 
@@ -31,11 +31,25 @@ list_limit = cfg.IntOpt(
 Maximum number of entities that will be returned in a policy collection.
 """))
 
+decision_cache_time = cfg.IntOpt(
+    'decision_cache_time',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Time in seconds to keep policy decisions in memory for rules that don't depend
+on the target of the request, such as `role:admin`, so that requests made with
+the same credentials don't evaluate them again. Decisions are always reused
+within a single request, regardless of this option. Because the cache is held
+by each keystone process, changes to the policy file can take this long to
+apply to rules that were already evaluated. Set to 0 to disable it.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     driver,
     list_limit,
+    decision_cache_time,
 ]
 
 
@@ -35,6 +35,19 @@ itself, you may need to install the appropriate package, use this option to
 specify an absolute path, or adjust keystone's PATH environment variable.
 """))
 
+signing_backend = cfg.StrOpt(
+    'signing_backend',
+    default='xmlsec1',
+    choices=['auto', 'inprocess', 'xmlsec1'],
+    help=utils.fmt("""
+Method used to sign SAML assertions. `xmlsec1` runs the `[saml]
+xmlsec1_binary` executable for every assertion, which costs a process spawn and
+a temporary file per request. `inprocess` signs assertions within the keystone
+process using the `xmlsec` Python bindings, loading the key and certificate
+only once instead of once per assertion. `auto` uses `inprocess` if the
+`xmlsec` Python package is installed and falls back to `xmlsec1` otherwise.
+"""))
+
 certfile = cfg.StrOpt(
     'certfile',
     default=constants._CERTFILE,
@@ -166,6 +179,7 @@ GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     assertion_expiration_time,
     xmlsec1_binary,
+    signing_backend,
     certfile,
     keyfile,
     idp_entity_id,
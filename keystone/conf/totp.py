@@ -0,0 +1,69 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from oslo_config import cfg
+
+from keystone.conf import utils
+
+
+included_previous_windows = cfg.IntOpt(
+    'included_previous_windows',
+    default=0,
+    min=0,
+    max=10,
+    help=utils.fmt("""
+The number of previous windows to check when processing TOTP passcodes. A
+window is 30 seconds long, so a value of 1 also accepts the passcode of the
+previous 30 seconds, which helps users whose device clock is slightly behind
+or who submit their passcode at the end of a window.
+"""))
+
+secret_cache_time = cfg.IntOpt(
+    'secret_cache_time',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Time in seconds to keep the decrypted TOTP secrets of a user in memory after
+they are used to validate a passcode, so that repeated authentication attempts
+don't decrypt every TOTP credential of the user again. The secrets are never
+written to the cache backend. They are forgotten as soon as the credentials of
+the user are changed through the same keystone process; other processes keep
+accepting passcodes generated from a deleted or rotated secret until this time
+elapses, so only enable it if that delay is acceptable. Set to 0 (the default)
+to disable the cache.
+"""))
+
+prevent_passcode_reuse = cfg.BoolOpt(
+    'prevent_passcode_reuse',
+    default=False,
+    help=utils.fmt("""
+Reject a TOTP passcode that was already used to authenticate, for as long as
+it would otherwise be accepted. Used passcodes are remembered by each keystone
+process, so a passcode can still be replayed against another process serving
+the same deployment.
+"""))
+
+
+GROUP_NAME = __name__.split('.')[-1]
+ALL_OPTS = [
+    included_previous_windows,
+    secret_cache_time,
+    prevent_passcode_reuse,
+]
+
+
+def register_opts(conf):
+    conf.register_opts(ALL_OPTS, group=GROUP_NAME)
+
+
+def list_opts():
+    return {GROUP_NAME: ALL_OPTS}
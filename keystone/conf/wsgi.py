@@ -36,9 +36,51 @@ WARNING: NOT INTENDED FOR USE IN PRODUCTION. THIS MIDDLEWARE CAN AND WILL EMIT
 SENSITIVE/PRIVILEGED DATA.
 """))
 
+lazy_load = cfg.BoolOpt(
+    'lazy_load',
+    default=False,
+    help=utils.fmt("""
+If set to true, rarely used APIs (OS-OAUTH1 and OS-SIMPLE-CERT) are not
+imported when the application starts but when they receive their first
+request, and the managers and drivers of the OAuth1 and endpoint policy APIs
+are built when they are first used. This shortens the start of each worker,
+which matters when workers are started on demand, at the cost of a slower
+first request to these APIs. The JSON Home document loads every API before
+being rendered, so it is not affected. The OAuth1 modules are still imported
+at startup if `oauth1` is one of the `[auth] methods`.
+"""))
+
+startup_profile = cfg.BoolOpt(
+    'startup_profile',
+    default=False,
+    help=utils.fmt("""
+If set to true, the time spent importing and registering each API module and
+building each manager is logged at INFO level once the application is
+loaded, and when an API or manager is loaded later because of `[wsgi]
+lazy_load`. This can be used to find what dominates the start of a worker.
+"""))
+
+expose_metrics = cfg.BoolOpt(
+    'expose_metrics',
+    default=False,
+    help=utils.fmt("""
+If set to true, the metrics collected by the keystone process serving the
+request are returned at `/metrics`, next to `/healthcheck`, in the
+Prometheus text format. They include the number and duration of requests by
+route and status code, the duration of manager and driver calls, cache hits
+and misses by region and the number of SQL statements per request. Like
+`/healthcheck`, this endpoint is not authenticated, so access to it should be
+restricted by the web server if the metrics are not meant to be public. Each
+process keeps its own metrics, so every worker has to be scraped.
+"""))
+
+
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     debug_middlware,
+    lazy_load,
+    startup_profile,
+    expose_metrics,
 ]
 
 
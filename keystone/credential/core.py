@@ -14,7 +14,12 @@
 
 """Main entry point into the Credential service."""
 
+import copy
 import json
+import threading
+
+from oslo_utils import timeutils
+from six.moves import zip
 
 from keystone.common import driver_hints
 from keystone.common import manager
@@ -27,6 +32,44 @@ CONF = keystone.conf.CONF
 PROVIDERS = provider_api.ProviderAPIs
 
 
+class _SecretCache(object):
+    """Decrypted credential blobs, held in memory for a short time.
+
+    Nothing is written to the cache backend, so each keystone process keeps
+    its own copy. It is dropped when credentials are changed through the same
+    process and otherwise expires after the given time.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._secrets = {}
+
+    def get(self, key):
+        now = timeutils.utcnow_ts(microsecond=True)
+        with self._lock:
+            entry = self._secrets.get(key)
+        if entry is None or entry[0] <= now:
+            return None
+        return entry[1]
+
+    def set(self, key, secrets, cache_time):
+        now = timeutils.utcnow_ts(microsecond=True)
+        with self._lock:
+            for cached_key, (expires_at, dummy) in list(
+                    self._secrets.items()):
+                if expires_at <= now:
+                    del self._secrets[cached_key]
+            self._secrets[key] = (now + cache_time, secrets)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._secrets.clear()
+            else:
+                self._secrets.pop(key, None)
+
+
 class Manager(manager.Manager):
     """Default pivot point for the Credential backend.
 
@@ -40,23 +83,32 @@ class Manager(manager.Manager):
 
     def __init__(self):
         super(Manager, self).__init__(CONF.credential.driver)
+        self._totp_secrets = _SecretCache()
+        self._ec2_credentials = _SecretCache()
 
     def _decrypt_credential(self, credential):
         """Return a decrypted credential reference."""
-        if credential['type'] == 'ec2':
-            decrypted_blob = json.loads(
-                PROVIDERS.credential_provider_api.decrypt(
-                    credential['encrypted_blob'],
-                )
-            )
-        else:
-            decrypted_blob = PROVIDERS.credential_provider_api.decrypt(
-                credential['encrypted_blob']
-            )
-        credential['blob'] = decrypted_blob
-        credential.pop('key_hash', None)
-        credential.pop('encrypted_blob', None)
-        return credential
+        return self.decrypt_credentials([credential])[0]
+
+    def decrypt_credentials(self, credentials):
+        """Decrypt credential references listed with ``decrypt=False``.
+
+        The blobs are handed to the credential provider in a single call, so
+        that it can load its keys once for the whole list.
+
+        :returns: the same list, with every reference decrypted in place
+
+        """
+        decrypted_blobs = PROVIDERS.credential_provider_api.decrypt_many(
+            [credential['encrypted_blob'] for credential in credentials]
+        )
+        for credential, decrypted_blob in zip(credentials, decrypted_blobs):
+            if credential['type'] == 'ec2':
+                decrypted_blob = json.loads(decrypted_blob)
+            credential['blob'] = decrypted_blob
+            credential.pop('key_hash', None)
+            credential.pop('encrypted_blob', None)
+        return credentials
 
     def _encrypt_credential(self, credential):
         """Return an encrypted credential reference."""
@@ -82,30 +134,77 @@ class Manager(manager.Manager):
         return credential_copy
 
     @manager.response_truncated
-    def list_credentials(self, hints=None):
+    def list_credentials(self, hints=None, decrypt=True):
+        """List credentials.
+
+        :param decrypt: if False, the references keep their encrypted blob
+                        and can be decrypted later with decrypt_credentials,
+                        which avoids decrypting credentials that are filtered
+                        out by the caller
+
+        """
         credentials = self.driver.list_credentials(
             hints or driver_hints.Hints()
         )
-        for credential in credentials:
-            credential = self._decrypt_credential(credential)
+        if decrypt:
+            credentials = self.decrypt_credentials(credentials)
         return credentials
 
-    def list_credentials_for_user(self, user_id, type=None):
+    def list_credentials_for_user(self, user_id, type=None, decrypt=True):
         """List credentials for a specific user."""
         credentials = self.driver.list_credentials_for_user(user_id, type=type)
-        for credential in credentials:
-            credential = self._decrypt_credential(credential)
+        if decrypt:
+            credentials = self.decrypt_credentials(credentials)
         return credentials
 
+    def list_totp_secrets_for_user(self, user_id):
+        """List the decrypted secrets of the TOTP credentials of a user.
+
+        The secrets are kept in memory for ``[totp] secret_cache_time``
+        seconds so that repeated authentication attempts don't decrypt every
+        credential again.
+
+        :returns: a list of ``(credential_id, secret)`` tuples
+
+        """
+        secrets = self._totp_secrets.get(user_id)
+        if secrets is None:
+            secrets = [(credential['id'], credential['blob'])
+                       for credential in self.list_credentials_for_user(
+                           user_id, type='totp')]
+            if CONF.totp.secret_cache_time:
+                self._totp_secrets.set(user_id, secrets,
+                                       CONF.totp.secret_cache_time)
+        return secrets
+
     def get_credential(self, credential_id):
         """Return a credential reference."""
         credential = self.driver.get_credential(credential_id)
         return self._decrypt_credential(credential)
 
+    def get_ec2_credential(self, credential_id):
+        """Return a credential reference used to authenticate EC2 requests.
+
+        EC2 credentials are kept in memory for ``[credential]
+        access_key_cache_time`` seconds so that every request signed with
+        the same access key doesn't read and decrypt the credential again.
+
+        """
+        credential = self._ec2_credentials.get(credential_id)
+        if credential is None:
+            credential = self.get_credential(credential_id)
+            if (credential['type'] == 'ec2' and
+                    CONF.credential.access_key_cache_time):
+                self._ec2_credentials.set(
+                    credential_id, credential,
+                    CONF.credential.access_key_cache_time)
+        return copy.deepcopy(credential)
+
     def create_credential(self, credential_id, credential):
         """Create a credential."""
         credential_copy = self._encrypt_credential(credential)
         ref = self.driver.create_credential(credential_id, credential_copy)
+        self._totp_secrets.invalidate(ref['user_id'])
         ref.pop('key_hash', None)
         ref.pop('encrypted_blob', None)
         ref['blob'] = credential['blob']
@@ -133,6 +232,10 @@ class Manager(manager.Manager):
             existing_credential = self.get_credential(credential_id)
             existing_blob = existing_credential['blob']
         ref = self.driver.update_credential(credential_id, credential_copy)
+        # The credential may have been moved to another user, so don't trust
+        # the cached secrets of any user.
+        self._totp_secrets.invalidate()
+        self._ec2_credentials.invalidate(credential_id)
         ref.pop('key_hash', None)
         ref.pop('encrypted_blob', None)
         # If the update request contains a `blob` attribute - we should return
@@ -143,3 +246,21 @@ class Manager(manager.Manager):
         else:
             ref['blob'] = existing_blob
         return ref
+
+    def delete_credential(self, credential_id):
+        """Delete a credential."""
+        self.driver.delete_credential(credential_id)
+        self._totp_secrets.invalidate()
+        self._ec2_credentials.invalidate(credential_id)
+
+    def delete_credentials_for_project(self, project_id):
+        """Delete all credentials for a project."""
+        self.driver.delete_credentials_for_project(project_id)
+        self._totp_secrets.invalidate()
+        self._ec2_credentials.invalidate()
+
+    def delete_credentials_for_user(self, user_id):
+        """Delete all credentials for a user."""
+        self.driver.delete_credentials_for_user(user_id)
+        self._totp_secrets.invalidate(user_id)
+        self._ec2_credentials.invalidate()
@@ -36,3 +36,15 @@ class Provider(object):
         :returns: credential str as plaintext
         :raises: keystone.exception.CredentialEncryptionError
         """
+
+    def decrypt_many(self, credentials):
+        """Decrypt a list of credentials.
+
+        Providers can override this to share work, such as loading keys,
+        between the credentials.
+
+        :param list credentials: credentials to decrypt
+        :returns: list of credential strs as plaintext, in the same order
+        :raises: keystone.exception.CredentialEncryptionError
+        """
+        return [self.decrypt(credential) for credential in credentials]
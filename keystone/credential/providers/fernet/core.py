@@ -11,6 +11,8 @@
 # under the License.
 
 import hashlib
+import os
+import threading
 
 from cryptography import fernet
 from oslo_log import log
@@ -41,16 +43,68 @@ LOG = log.getLogger(__name__)
 MAX_ACTIVE_KEYS = 3
 
 
-def get_multi_fernet_keys():
-    key_utils = fernet_utils.FernetUtils(
-        CONF.credential.key_repository, MAX_ACTIVE_KEYS,
-        'credential')
-    keys = key_utils.load_keys(use_null_key=True)
+class _KeyRing(object):
+    """The credential keys and the ``MultiFernet`` built from them.
+
+    The keys are read from ``[credential] key_repository`` the first time they
+    are needed and then only when the repository changes, which is detected
+    from the modification times and sizes of the directory and its files. This
+    avoids reading every key file and rebuilding the ``MultiFernet`` for each
+    credential that is encrypted or decrypted, while still picking up keys
+    that were rotated or distributed to this node.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._crypto = None
+        self._keys = None
+
+    @staticmethod
+    def _get_fingerprint(key_repository):
+        try:
+            stat = os.stat(key_repository)
+            filenames = sorted(os.listdir(key_repository))
+        except OSError:
+            return (key_repository, None)
+        files = []
+        for filename in filenames:
+            try:
+                file_stat = os.stat(os.path.join(key_repository, filename))
+            except OSError:  # nosec : the file was removed, skip it
+                continue
+            files.append((filename, file_stat.st_ino, file_stat.st_mtime,
+                          file_stat.st_size))
+        return (key_repository, stat.st_mode, stat.st_mtime, tuple(files))
+
+    def get(self):
+        """Return the ``MultiFernet`` and the list of keys it uses."""
+        key_repository = CONF.credential.key_repository
+        fingerprint = self._get_fingerprint(key_repository)
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                key_utils = fernet_utils.FernetUtils(
+                    key_repository, MAX_ACTIVE_KEYS, 'credential')
+                keys = key_utils.load_keys(use_null_key=True)
+                self._crypto = fernet.MultiFernet(
+                    [fernet.Fernet(key) for key in keys])
+                self._keys = keys
+                self._fingerprint = fingerprint
+            return self._crypto, list(self._keys)
+
+    def clear(self):
+        with self._lock:
+            self._fingerprint = None
+            self._crypto = None
+            self._keys = None
+
+
+_KEY_RING = _KeyRing()
 
-    fernet_keys = [fernet.Fernet(key) for key in keys]
-    crypto = fernet.MultiFernet(fernet_keys)
 
-    return crypto, keys
+def get_multi_fernet_keys():
+    return _KEY_RING.get()
 
 
 def primary_key_hash(keys):
@@ -96,12 +150,21 @@ class Provider(core.Provider):
         :param credential: an encrypted credential string
         :returns: a decrypted credential
         """
-        key_utils = fernet_utils.FernetUtils(
-            CONF.credential.key_repository, MAX_ACTIVE_KEYS)
-        keys = key_utils.load_keys(use_null_key=True)
-        fernet_keys = [fernet.Fernet(key) for key in keys]
-        crypto = fernet.MultiFernet(fernet_keys)
+        crypto, keys = get_multi_fernet_keys()
+        return self._decrypt(crypto, credential)
+
+    def decrypt_many(self, credentials):
+        """Attempt to decrypt a list of credentials.
+
+        :param credentials: a list of encrypted credential strings
+        :returns: a list of decrypted credentials, in the same order
+        """
+        crypto, keys = get_multi_fernet_keys()
+        return [self._decrypt(crypto, credential)
+                for credential in credentials]
 
+    @staticmethod
+    def _decrypt(crypto, credential):
         try:
             if isinstance(credential, six.text_type):
                 credential = credential.encode('utf-8')
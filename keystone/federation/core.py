@@ -31,6 +31,13 @@ LOG = log.getLogger(__name__)
 # This is a general cache region for service providers.
 MEMOIZE = cache.get_memoization_decorator(group='federation')
 
+# This is a cache region for identity providers, protocols and mappings, which
+# are resolved on every federated authentication. Any change to one of those
+# invalidates the whole region.
+IDENTITY_PROVIDER_REGION = cache.create_region(name='identity providers')
+MEMOIZE_IDENTITY_PROVIDER = cache.get_memoization_decorator(
+    group='federation', region=IDENTITY_PROVIDER_REGION)
+
 CONF = keystone.conf.CONF
 PROVIDERS = provider_api.ProviderAPIs
 
@@ -88,6 +95,7 @@ class Manager(manager.Manager):
 
     def delete_idp(self, idp_id):
         self.driver.delete_idp(idp_id)
+        IDENTITY_PROVIDER_REGION.invalidate()
         # NOTE(lbragstad): If an identity provider is removed from the system,
         # then we need to invalidate the token cache. Otherwise it will be
         # possible for federated tokens to be considered valid after a service
@@ -100,6 +108,42 @@ class Manager(manager.Manager):
         )
         notifications.invalidate_token_cache_notification(reason)
 
+    def update_idp(self, idp_id, idp):
+        idp_ref = self.driver.update_idp(idp_id, idp)
+        IDENTITY_PROVIDER_REGION.invalidate()
+        return idp_ref
+
+    @MEMOIZE_IDENTITY_PROVIDER
+    def get_idp(self, idp_id):
+        return self.driver.get_idp(idp_id)
+
+    @MEMOIZE_IDENTITY_PROVIDER
+    def get_idp_from_remote_id(self, remote_id):
+        return self.driver.get_idp_from_remote_id(remote_id)
+
+    @MEMOIZE_IDENTITY_PROVIDER
+    def get_mapping_from_idp_and_protocol(self, idp_id, protocol_id):
+        return self.driver.get_mapping_from_idp_and_protocol(idp_id,
+                                                             protocol_id)
+
+    @MEMOIZE_IDENTITY_PROVIDER
+    def get_idp_protocol_and_mapping(self, idp_id, protocol_id):
+        """Resolve everything needed to map an assertion in one call.
+
+        :param idp_id: ID of the identity provider
+        :param protocol_id: ID of the protocol of the identity provider
+        :raises keystone.exception.IdentityProviderNotFound: If the identity
+            provider doesn't exist.
+        :raises keystone.exception.FederatedProtocolNotFound: If the protocol
+            doesn't exist.
+        :returns: a tuple of the identity provider, protocol and mapping refs
+
+        """
+        idp = self.get_idp(idp_id)
+        protocol = self.driver.get_protocol(idp_id, protocol_id)
+        mapping = self.get_mapping_from_idp_and_protocol(idp_id, protocol_id)
+        return idp, protocol, mapping
+
     def _cleanup_idp_domain(self, domain_id):
         domain = {'enabled': False}
         PROVIDERS.resource_api.update_domain(domain_id, domain)
@@ -163,7 +207,8 @@ class Manager(manager.Manager):
         return sp_ref
 
     def evaluate(self, idp_id, protocol_id, assertion_data):
-        mapping = self.get_mapping_from_idp_and_protocol(idp_id, protocol_id)
+        _idp, _protocol, mapping = self.get_idp_protocol_and_mapping(
+            idp_id, protocol_id)
         rules = mapping['rules']
         rule_processor = utils.RuleProcessor(mapping['id'], rules)
         mapped_properties = rule_processor.process(assertion_data)
@@ -180,6 +225,7 @@ class Manager(manager.Manager):
             hints)
 
         self.driver.delete_protocol(idp_id, protocol_id)
+        IDENTITY_PROVIDER_REGION.invalidate()
 
         for shadow_user in shadow_users:
             PROVIDERS.identity_api.shadow_federated_user.invalidate(
@@ -190,7 +236,19 @@ class Manager(manager.Manager):
 
     def update_protocol(self, idp_id, protocol_id, protocol):
         self._validate_mapping_exists(protocol['mapping_id'])
-        return self.driver.update_protocol(idp_id, protocol_id, protocol)
+        protocol_ref = self.driver.update_protocol(idp_id, protocol_id,
+                                                   protocol)
+        IDENTITY_PROVIDER_REGION.invalidate()
+        return protocol_ref
+
+    def update_mapping(self, mapping_id, mapping):
+        mapping_ref = self.driver.update_mapping(mapping_id, mapping)
+        IDENTITY_PROVIDER_REGION.invalidate()
+        return mapping_ref
+
+    def delete_mapping(self, mapping_id):
+        self.driver.delete_mapping(mapping_id)
+        IDENTITY_PROVIDER_REGION.invalidate()
 
     def _validate_mapping_exists(self, mapping_id):
         try:
@@ -13,6 +13,7 @@
 import datetime
 import os
 import subprocess  # nosec : see comments in the code below
+import threading
 import uuid
 
 from oslo_log import log
@@ -30,6 +31,10 @@ from saml2 import sigver
 xmldsig = importutils.try_import("saml2.xmldsig")
 if not xmldsig:
     xmldsig = importutils.try_import("xmldsig")
+# NOTE: the xmlsec Python bindings are optional. They are only needed to sign
+# assertions in-process, otherwise the xmlsec1 binary is used.
+xmlsec = importutils.try_import("xmlsec")
+etree = importutils.try_import("lxml.etree")
 
 from keystone.common import utils
 import keystone.conf
@@ -417,9 +422,113 @@ def _verify_assertion_binary_is_installed():
         raise exception.SAMLSigningError(reason=tr_msg)
 
 
+def _get_signing_backend():
+    """Return the SAML signing backend that should be used.
+
+    Resolves ``[saml] signing_backend = auto`` to ``inprocess`` when the
+    ``xmlsec`` Python bindings are importable and to ``xmlsec1`` otherwise.
+
+    """
+    backend = CONF.saml.signing_backend
+    if backend == 'auto':
+        return 'inprocess' if xmlsec and etree else 'xmlsec1'
+    if backend == 'inprocess' and not (xmlsec and etree):
+        msg = ('Unable to sign SAML assertions in-process because the xmlsec '
+               'Python package is not installed. Install it or set '
+               '`keystone.conf [saml] signing_backend` to `xmlsec1`.')
+        tr_msg = _('Unable to sign SAML assertions in-process because the '
+                   'xmlsec Python package is not installed. Install it or '
+                   'set `keystone.conf [saml] signing_backend` to `xmlsec1`.')
+        LOG.error(msg)
+        raise exception.SAMLSigningError(reason=tr_msg)
+    return backend
+
+
 def _sign_assertion(assertion):
     """Sign a SAML assertion.
 
+    The assertion is signed either in-process or by the ``xmlsec1`` binary,
+    depending on ``[saml] signing_backend``.
+
+    :returns: XML <Assertion> object
+
+    """
+    if _get_signing_backend() == 'inprocess':
+        return _sign_assertion_in_process(assertion)
+    return _sign_assertion_with_xmlsec1(assertion)
+
+
+class _SigningKeyCache(object):
+    """Hold the SAML signing key and certificate loaded by ``xmlsec``.
+
+    The key and certificate are parsed once and reused for every assertion.
+    They are only loaded again if the configured paths or the modification
+    times of the files change, so rotating them on disk doesn't require a
+    restart.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._key = None
+
+    def get_key(self, keyfile, certfile):
+        fingerprint = (keyfile, os.stat(keyfile).st_mtime,
+                       certfile, os.stat(certfile).st_mtime)
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                key = xmlsec.Key.from_file(
+                    keyfile, xmlsec.constants.KeyDataFormatPem)
+                key.load_cert_from_file(
+                    certfile, xmlsec.constants.KeyDataFormatPem)
+                self._key = key
+                self._fingerprint = fingerprint
+            return self._key
+
+
+_SIGNING_KEY_CACHE = _SigningKeyCache()
+
+
+def _sign_assertion_in_process(assertion):
+    """Sign a SAML assertion using the ``xmlsec`` Python bindings.
+
+    This produces the same signature as the ``xmlsec1`` binary, filling in the
+    <Signature> template built by ``SAMLGenerator``, but without spawning a
+    process or writing the assertion to disk.
+
+    :returns: XML <Assertion> object
+
+    """
+    try:
+        key = _SIGNING_KEY_CACHE.get_key(CONF.saml.keyfile,
+                                         CONF.saml.certfile)
+        # NOTE(gyee): need to make the namespace prefixes explicit so
+        # they won't get reassigned when we wrap the assertion into
+        # SAML2 response
+        parser = etree.XMLParser(resolve_entities=False)
+        document = etree.fromstring(
+            assertion.to_string(nspair={'saml': saml2.NAMESPACE,
+                                        'xmldsig': xmldsig.NAMESPACE}),
+            parser=parser)
+        xmlsec.tree.add_ids(document, ['ID'])
+        signature_node = xmlsec.tree.find_node(
+            document, xmlsec.constants.NodeSignature)
+        context = xmlsec.SignatureContext()
+        context.key = key
+        context.sign(signature_node)
+        signed = etree.tostring(document)
+    except Exception as e:
+        LOG.error('Error when signing assertion, reason: %(reason)s',
+                  {'reason': e})
+        raise exception.SAMLSigningError(reason=e)
+
+    return saml2.create_class_from_xml_string(saml.Assertion, signed)
+
+
+def _sign_assertion_with_xmlsec1(assertion):
+    """Sign a SAML assertion with the ``xmlsec1`` binary.
+
     This method utilizes ``xmlsec1`` binary and signs SAML assertions in a
     separate process. ``xmlsec1`` cannot read input data from stdin so the
     prepared assertion needs to be serialized and stored in a temporary file.
@@ -341,16 +341,14 @@ def validate_mapped_group_ids(group_ids, mapping_id, identity_api):
         mapping was not found in the backend.
 
     """
+    found_ids = set(
+        group['id'] for group in identity_api.get_groups_by_ids(group_ids))
     for group_id in group_ids:
-        try:
-            identity_api.get_group(group_id)
-        except exception.GroupNotFound:
+        if group_id not in found_ids:
             raise exception.MappedGroupNotFound(
                 group_id=group_id, mapping_id=mapping_id)
 
 
-# TODO(marek-denis): Optimize this function, so the number of calls to the
-# backend are minimized.
 def transform_to_group_ids(group_names, mapping_id,
                            identity_api, resource_api):
     """Transform groups identified by name/domain to their ids.
@@ -406,13 +404,16 @@ def transform_to_group_ids(group_names, mapping_id,
         return domain_id
 
     for group in group_names:
-        try:
-            group_dict = identity_api.get_group_by_name(
-                group['name'], resolve_domain(group['domain']))
-            yield group_dict['id']
-        except exception.GroupNotFound:
+        # NOTE: name resolution is cached by the identity manager, including
+        # misses, so a mapping that yields many groups doesn't cost one
+        # backend query per group on every login.
+        group_id = identity_api.get_group_id_by_name(
+            group['name'], resolve_domain(group['domain']))
+        if group_id is None:
             LOG.debug('Group %s has no entry in the backend',
                       group['name'])
+            continue
+        yield group_id
 
 
 def get_assertion_params_from_env():
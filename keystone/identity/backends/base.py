@@ -425,6 +425,27 @@ class IdentityDriverBase(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def get_groups_by_ids(self, group_ids):
+        """Get the groups matching a list of IDs.
+
+        Drivers that can fetch several groups in one query should override
+        this; the default implementation calls :meth:`get_group` per ID.
+
+        :param list group_ids: group IDs.
+
+        :returns: list of groups, matching the group schema. IDs that do not
+            match a group are skipped.
+        :rtype: list of dict
+
+        """
+        groups = []
+        for group_id in group_ids:
+            try:
+                groups.append(self.get_group(group_id))
+            except exception.GroupNotFound:
+                continue
+        return groups
+
     @abc.abstractmethod
     def update_group(self, group_id, group):
         """Update an existing group.
@@ -14,10 +14,17 @@
 
 import abc
 import codecs
+import collections
+import contextlib
+import copy
 import functools
+import itertools
+import multiprocessing.pool
 import os.path
 import re
 import sys
+import threading
+import time
 import weakref
 
 import ldap.controls
@@ -26,10 +33,10 @@ import ldappool
 from oslo_log import log
 from oslo_utils import reflection
 import six
-from six.moves import zip
 from six import PY2
 
 from keystone.common import driver_hints
+from keystone.common import metrics
 from keystone import exception
 from keystone.i18n import _
 
@@ -267,23 +274,7 @@ def is_rdn_equal(rdn1, rdn2):
     limitations of that function apply here.
 
     """
-    if len(rdn1) != len(rdn2):
-        return False
-
-    for attr_type_1, val1, dummy in rdn1:
-        found = False
-        for attr_type_2, val2, dummy in rdn2:
-            if attr_type_1.lower() != attr_type_2.lower():
-                continue
-
-            found = True
-            if not is_ava_value_equal(attr_type_1, val1, val2):
-                return False
-            break
-        if not found:
-            return False
-
-    return True
+    return _normalize_rdn(rdn1) == _normalize_rdn(rdn2)
 
 
 def is_dn_equal(dn1, dn2):
@@ -299,18 +290,7 @@ def is_dn_equal(dn1, dn2):
     :param dn2: Either a string DN or a DN parsed by ldap.dn.str2dn.
 
     """
-    if not isinstance(dn1, list):
-        dn1 = ldap.dn.str2dn(dn1)
-    if not isinstance(dn2, list):
-        dn2 = ldap.dn.str2dn(dn2)
-
-    if len(dn1) != len(dn2):
-        return False
-
-    for rdn1, rdn2 in zip(dn1, dn2):
-        if not is_rdn_equal(rdn1, rdn2):
-            return False
-    return True
+    return normalize_dn(dn1) == normalize_dn(dn2)
 
 
 def dn_startswith(descendant_dn, dn):
@@ -320,16 +300,120 @@ def dn_startswith(descendant_dn, dn):
     :param dn: Either a string DN or a DN parsed by ldap.dn.str2dn.
 
     """
-    if not isinstance(descendant_dn, list):
-        descendant_dn = ldap.dn.str2dn(descendant_dn)
-    if not isinstance(dn, list):
-        dn = ldap.dn.str2dn(dn)
+    descendant_dn = normalize_dn(descendant_dn)
+    dn = normalize_dn(dn)
 
     if len(descendant_dn) <= len(dn):
         return False
 
     # Use the last len(dn) RDNs.
-    return is_dn_equal(descendant_dn[-len(dn):], dn)
+    return descendant_dn[-len(dn):] == dn
+
+
+# The number of parsed DNs kept by parse_dn. DNs seen by the backend are
+# mostly the same few thousand user and group entries, so this bounds the
+# memory used while keeping the working set of a busy server.
+DN_CACHE_SIZE = 10000
+
+# How long, in seconds, the DN found for an entry ID is trusted. Entries can
+# be moved or renamed on the server without keystone knowing.
+DN_CACHE_TTL = 300
+
+
+class _BoundedCache(object):
+    """A thread-safe mapping evicting the least recently used keys.
+
+    If ``ttl`` is set, keys are also forgotten that many seconds after they
+    were set.
+    """
+
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value, expires_at = self._data.pop(key)
+            except KeyError:
+                return None
+            if expires_at is not None and expires_at <= time.time():
+                return None
+            self._data[key] = (value, expires_at)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires_at)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            value, _expires_at = self._data.pop(key, (None, None))
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Shared by every LDAP backend of the process: the parsed and normalized form
+# of string DNs, and the DN of entries found by an ID search.
+_PARSED_DNS = _BoundedCache(DN_CACHE_SIZE)
+_DNS_BY_ID = _BoundedCache(DN_CACHE_SIZE, ttl=DN_CACHE_TTL)
+
+
+def clear_dn_caches():
+    """Forget every DN parsed or resolved by the LDAP backends."""
+    _PARSED_DNS.clear()
+    _DNS_BY_ID.clear()
+
+
+def _normalize_rdn(rdn):
+    return tuple(sorted((attr_type.lower(), prep_case_insensitive(value))
+                        for attr_type, value, dummy in rdn))
+
+
+def _parse_dn(dn):
+    entry = _PARSED_DNS.get(dn)
+    if entry is None:
+        parsed = ldap.dn.str2dn(dn)
+        entry = (tuple(tuple(tuple(ava) for ava in rdn) for rdn in parsed),
+                 tuple(_normalize_rdn(rdn) for rdn in parsed))
+        _PARSED_DNS.set(dn, entry)
+    return entry
+
+
+def parse_dn(dn):
+    """Parse a string DN like ldap.dn.str2dn, remembering the result.
+
+    The DN is returned as a tuple of RDNs, each a tuple of ``(attribute type,
+    value, flags)`` AVAs, so that it can be shared between callers.
+
+    """
+    return _parse_dn(dn)[0]
+
+
+def normalize_dn(dn):
+    """Return a form of the DN that compares equal for equal DNs.
+
+    The result is a tuple of RDNs where the AVAs of every RDN are sorted and
+    prepared for case-insensitive comparison, see is_rdn_equal.
+
+    :param dn: Either a string DN or a DN parsed by ldap.dn.str2dn.
+
+    """
+    if isinstance(dn, (list, tuple)):
+        return tuple(_normalize_rdn(rdn) for rdn in dn)
+    return _parse_dn(dn)[1]
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -484,6 +568,13 @@ class LDAPHandler(object):
     def modify_s(self, dn, modlist):
         raise exception.NotImplemented()  # pragma: no cover
 
+    def prewarm(self, count):
+        """Open and bind connections ahead of use, if the handler pools them.
+
+        :param count: the number of connections the pool should hold
+        """
+        pass
+
 
 class PythonLDAPHandler(LDAPHandler):
     """LDAPHandler implementation which calls the python-ldap API.
@@ -641,6 +732,220 @@ class MsgId(list):
     pass
 
 
+def _iter_pool_connections(active):
+    for pool_url, pool in PooledLDAPHandler.connection_pools.items():
+        in_use = pool.in_use
+        yield {'pool': pool_url}, in_use if active else max(
+            len(pool) - in_use, 0)
+
+
+POOL_CONNECTIONS_IN_USE = metrics.gauge(
+    'keystone_ldap_pool_connections_in_use',
+    'Number of pooled LDAP connections currently in use.',
+    ('pool',), callback=functools.partial(_iter_pool_connections, True))
+POOL_CONNECTIONS_IDLE = metrics.gauge(
+    'keystone_ldap_pool_connections_idle',
+    'Number of pooled LDAP connections open and available.',
+    ('pool',), callback=functools.partial(_iter_pool_connections, False))
+POOL_WAIT_SECONDS = metrics.histogram(
+    'keystone_ldap_pool_wait_seconds',
+    'Time spent acquiring a connection from the LDAP pool, including '
+    'opening and binding it when no idle one could be reused.', ('pool',))
+POOL_EXHAUSTED = metrics.counter(
+    'keystone_ldap_pool_exhausted_total',
+    'Number of times no LDAP pool connection could be acquired.', ('pool',))
+POOL_CONNECTION_FAILURES = metrics.counter(
+    'keystone_ldap_pool_connection_failures_total',
+    'Number of times a pooled LDAP connection could not be opened or bound.',
+    ('pool',))
+POOL_BIND_SECONDS = metrics.histogram(
+    'keystone_ldap_pool_bind_seconds',
+    'Time spent binding pooled LDAP connections.', ('pool',))
+POOL_BIND_FAILURES = metrics.counter(
+    'keystone_ldap_pool_bind_failures_total',
+    'Number of failed binds of pooled LDAP connections.', ('pool',))
+POOL_RECONNECTS = metrics.counter(
+    'keystone_ldap_pool_reconnects_total',
+    'Number of LDAP connections opened to replace dropped ones.', ('pool',))
+
+
+class _MeteredConnectorMixin(object):
+    """Record the binds of the connectors of a pool.
+
+    Mixed into the connector class handed to ldappool, which binds new and
+    reused connectors through simple_bind_s.
+
+    """
+
+    manager = None
+    _opened = False
+
+    def simple_bind_s(self, *args, **kwargs):
+        start = time.time()
+        try:
+            result = super(_MeteredConnectorMixin, self).simple_bind_s(
+                *args, **kwargs)
+        except Exception:
+            POOL_BIND_FAILURES.inc(pool=self.manager.name)
+            raise
+        finally:
+            POOL_BIND_SECONDS.observe(time.time() - start,
+                                      pool=self.manager.name)
+        # NOTE: a connector that fails its first bind is not added to the
+        # pool, so it is only counted once bound.
+        if not self._opened:
+            self._opened = True
+            self.manager.connector_opened()
+        return result
+
+
+class ConnectionManager(ldappool.ConnectionManager):
+    """ldappool connection manager which records pool metrics.
+
+    Only the public interface of ldappool is used: connections are counted
+    as they go through :meth:`connection`, the pool size is the length of
+    the manager, and binds and new connections are recorded by the connector
+    class given to ldappool.
+
+    Connections opened while fewer connections are pooled than were opened
+    before replace dropped connections (expired, failed or evicted ones) and
+    are counted as reconnects.
+
+    """
+
+    def __init__(self, uri, name=None, connector_cls=ldappool.StateConnector,
+                 **kwargs):
+        self.name = name or uri
+        self.in_use = 0
+        self._in_use_lock = threading.Lock()
+        self._opened = 0
+        self._replaced = 0
+        connector_cls = type(str('Metered%s' % connector_cls.__name__),
+                             (_MeteredConnectorMixin, connector_cls),
+                             {'manager': self})
+        super(ConnectionManager, self).__init__(
+            uri, connector_cls=connector_cls, **kwargs)
+
+    def _count_in_use(self, amount):
+        with self._in_use_lock:
+            self.in_use += amount
+
+    def connector_opened(self):
+        with self._in_use_lock:
+            reconnect = self._opened - len(self) > self._replaced
+            self._opened += 1
+            if reconnect:
+                self._replaced += 1
+        if reconnect:
+            POOL_RECONNECTS.inc(pool=self.name)
+
+    @contextlib.contextmanager
+    def connection(self, bind=None, passwd=None):
+        start = time.time()
+        acquired = False
+        try:
+            with super(ConnectionManager, self).connection(bind,
+                                                           passwd) as conn:
+                acquired = True
+                POOL_WAIT_SECONDS.observe(time.time() - start,
+                                          pool=self.name)
+                self._count_in_use(1)
+                try:
+                    yield conn
+                finally:
+                    self._count_in_use(-1)
+        except ldappool.MaxConnectionReachedError:
+            if not acquired:
+                POOL_WAIT_SECONDS.observe(time.time() - start,
+                                          pool=self.name)
+                POOL_EXHAUSTED.inc(pool=self.name)
+            raise
+        except (ldap.LDAPError, ldappool.BackendError):
+            if not acquired:
+                POOL_CONNECTION_FAILURES.inc(pool=self.name)
+            raise
+
+    def prewarm(self, count, bind=None, passwd=None):
+        """Open and bind connections until the pool holds ``count``.
+
+        Connections are held while the pool fills up, so that each one is
+        newly opened unless idle ones are available, and are then released
+        to the pool. Returns the number of connections the pool holds.
+
+        """
+        held = []
+        try:
+            while len(held) < min(count, self.size):
+                connection = super(ConnectionManager, self).connection(
+                    bind, passwd)
+                connection.__enter__()
+                held.append(connection)
+        except ldappool.MaxConnectionReachedError:
+            # Other connections are in use, the pool is as warm as it gets.
+            pass
+        finally:
+            for connection in reversed(held):
+                connection.__exit__(None, None, None)
+        return len(self)
+
+
+# LDAP objects whose connection pool is pre-warmed by the first request served
+# by the process, and the ID of the process that served it.
+_PREWARM_PENDING = []
+_PREWARM_LOCK = threading.Lock()
+_prewarmed_pid = None
+
+
+def prewarm_connection_pools():
+    """Pre-warm the connection pools of the LDAP drivers loaded so far.
+
+    This is done once per process, on the first request it serves, so that
+    connections are neither opened by a process which loads the application
+    before forking workers nor by commands which only load the backends.
+    Drivers loaded afterwards open their connections on demand.
+
+    """
+    global _prewarmed_pid
+    pid = os.getpid()
+    if _prewarmed_pid == pid:
+        return
+    with _PREWARM_LOCK:
+        if _prewarmed_pid == pid:
+            return
+        _prewarmed_pid = pid
+        pending = list(_PREWARM_PENDING)
+        del _PREWARM_PENDING[:]
+    for ldap_object in pending:
+        ldap_object.prewarm_connection_pool()
+
+
+# Thread pools searching membership batches concurrently, by LDAP URL, and the
+# ID of the process which created them.
+_BATCH_EXECUTORS = {}
+_BATCH_EXECUTORS_LOCK = threading.Lock()
+_batch_executors_pid = None
+
+
+def _get_batch_executor(url, workers):
+    """Return the thread pool searching batches over the pool of an URL.
+
+    It is created on first use and lives as long as the process. The thread
+    pools of a parent process are discarded after a fork, since their
+    threads are not running in the child.
+
+    """
+    global _batch_executors_pid
+    with _BATCH_EXECUTORS_LOCK:
+        if _batch_executors_pid != os.getpid():
+            _batch_executors_pid = os.getpid()
+            _BATCH_EXECUTORS.clear()
+        executor = _BATCH_EXECUTORS.get(url)
+        if executor is None:
+            executor = multiprocessing.pool.ThreadPool(workers)
+            _BATCH_EXECUTORS[url] = executor
+        return executor
+
+
 def use_conn_pool(func):
     """Use this only for connection pool specific ldap API.
 
@@ -730,8 +1035,9 @@ class PooledLDAPHandler(LDAPHandler):
         try:
             self.conn_pool = self.connection_pools[pool_url]
         except KeyError:
-            self.conn_pool = ldappool.ConnectionManager(
+            self.conn_pool = ConnectionManager(
                 url,
+                name=pool_url,
                 size=pool_size,
                 retry_max=pool_retry_max,
                 retry_delay=pool_retry_delay,
@@ -778,6 +1084,9 @@ class PooledLDAPHandler(LDAPHandler):
         # So this unbind is a no op.
         pass
 
+    def prewarm(self, count):
+        return self.conn_pool.prewarm(count, self.who, self.cred)
+
     @use_conn_pool
     def add_s(self, conn, dn, modlist):
         return conn.add_s(dn, modlist)
@@ -923,6 +1232,9 @@ class KeystoneLDAPHandler(LDAPHandler):
         LOG.debug('LDAP unbind')
         return self.conn.unbind_s()
 
+    def prewarm(self, count):
+        return self.conn.prewarm(count)
+
     def add_s(self, dn, modlist):
         ldap_attrs = [(kind, [py2ldap(x) for x in safe_iter(values)])
                       for kind, values in modlist]
@@ -977,8 +1289,46 @@ class KeystoneLDAPHandler(LDAPHandler):
                                     serverctrls, clientctrls,
                                     timeout, sizelimit)
 
+    def search_s_iter(self, base, scope,
+                      filterstr='(objectClass=*)', attrlist=None, attrsonly=0):
+        """Search and yield the type converted entries as they arrive.
+
+        This behaves like ``search_s()``, except that when paging is enabled
+        every page is converted and yielded as soon as it is received
+        instead of after the last page, and the following pages are only
+        requested while the caller keeps iterating. A caller that stops early
+        never transfers the remaining entries.
+
+        """
+        if not self.page_size:
+            # Without paging the whole result arrives in a single response,
+            # so there is nothing to stream.
+            for entry in self.search_s(base, scope, filterstr, attrlist,
+                                       attrsonly):
+                yield entry
+            return
+
+        if attrlist is not None:
+            attrlist = [attr for attr in attrlist if attr is not None]
+        LOG.debug('LDAP paged search: base=%s scope=%s filterstr=%s '
+                  'attrs=%s attrsonly=%s',
+                  base, scope, filterstr, attrlist, attrsonly)
+        pages = self._iter_paged_search_s(base, scope, filterstr, attrlist)
+        try:
+            for page in pages:
+                for entry in convert_ldap_result(page):
+                    yield entry
+        finally:
+            pages.close()
+
     def _paged_search_s(self, base, scope, filterstr, attrlist=None):
         res = []
+        for page in self._iter_paged_search_s(base, scope, filterstr,
+                                              attrlist):
+            res.extend(page)
+        return res
+
+    def _iter_paged_search_s(self, base, scope, filterstr, attrlist=None):
         use_old_paging_api = False
         # The API for the simple paged results control changed between
         # python-ldap 2.3 and 2.4.  We need to detect the capabilities
@@ -1002,40 +1352,60 @@ class KeystoneLDAPHandler(LDAPHandler):
                                      filterstr,
                                      attrlist,
                                      serverctrls=[lc])
-        # Endless loop request pages on ldap server until it has no data
-        while True:
-            # Request to the ldap server a page with 'page_size' entries
-            rtype, rdata, rmsgid, serverctrls = self.conn.result3(msgid)
-            # Receive the data
-            res.extend(rdata)
-            pctrls = [c for c in serverctrls
-                      if c.controlType == page_ctrl_oid]
-            if pctrls:
-                # LDAP server supports pagination
-                if use_old_paging_api:
-                    est, cookie = pctrls[0].controlValue
-                    lc.controlValue = (self.page_size, cookie)
+        cookie = None
+        try:
+            # Request pages on ldap server until it has no data, or until the
+            # caller stops asking for more
+            while True:
+                # Request to the ldap server a page with 'page_size' entries
+                rtype, rdata, rmsgid, serverctrls = self.conn.result3(msgid)
+                pctrls = [c for c in serverctrls
+                          if c.controlType == page_ctrl_oid]
+                if pctrls:
+                    # LDAP server supports pagination
+                    if use_old_paging_api:
+                        est, cookie = pctrls[0].controlValue
+                        lc.controlValue = (self.page_size, cookie)
+                    else:
+                        cookie = lc.cookie = pctrls[0].cookie
                 else:
-                    cookie = lc.cookie = pctrls[0].cookie
+                    LOG.warning('LDAP Server does not support paging. '
+                                'Disable paging in keystone.conf to '
+                                'avoid this message.')
+                    self._disable_paging()
+                    cookie = None
 
-                if cookie:
-                    # There is more data still on the server
-                    # so we request another page
+                # Hand over the data
+                yield rdata
+
+                if not cookie:
+                    # Exit condition no more data on server
+                    break
+                # There is more data still on the server
+                # so we request another page
+                msgid = self.conn.search_ext(base,
+                                             scope,
+                                             filterstr,
+                                             attrlist,
+                                             serverctrls=[lc])
+        finally:
+            if cookie:
+                # The search was not read to the end, so let the server
+                # release it by requesting a page of size zero (RFC 2696).
+                if use_old_paging_api:
+                    lc.controlValue = (0, cookie)
+                else:
+                    lc.size = 0
+                try:
                     msgid = self.conn.search_ext(base,
                                                  scope,
                                                  filterstr,
                                                  attrlist,
                                                  serverctrls=[lc])
-                else:
-                    # Exit condition no more data on server
-                    break
-            else:
-                LOG.warning('LDAP Server does not support paging. '
-                            'Disable paging in keystone.conf to '
-                            'avoid this message.')
-                self._disable_paging()
-                break
-        return res
+                    self.conn.result3(msgid)
+                except ldap.LDAPError as e:
+                    LOG.debug('Unable to abandon the LDAP paged search: %s',
+                              e)
 
     def result3(self, msgid=ldap.RES_ANY, all=1, timeout=None,
                 resp_ctrl_classes=None):
@@ -1108,6 +1478,128 @@ def filter_entity(entity_ref):
     return entity_ref
 
 
+class EntityCache(object):
+    """Bounded cache of LDAP entries keyed by object ID.
+
+    Each entry remembers the value of a change-tracking operational attribute
+    (``modifyTimestamp`` or ``entryCSN``) so that a stale entry can be
+    revalidated by reading that single attribute instead of the whole entry.
+    The cache also tracks the most recent timestamp it has seen, which is the
+    starting point of the next delta synchronization.
+
+    """
+
+    def __init__(self, max_size, cache_time, sync_interval,
+                 timestamp_attribute):
+        self.max_size = max_size
+        self.cache_time = cache_time
+        self.sync_interval = sync_interval
+        self.timestamp_attribute = timestamp_attribute
+        self._entries = collections.OrderedDict()
+        self._keys_by_dn = {}
+        self._high_water = None
+        self._last_sync = time.time()
+        self._lock = threading.Lock()
+
+    def get_timestamp(self, attrs):
+        """Return the timestamp value of converted LDAP attributes."""
+        attr = self.timestamp_attribute.lower()
+        for k, v in attrs.items():
+            if k.lower() == attr and v:
+                return v[0]
+        return None
+
+    def lookup(self, object_id):
+        """Return ``(res, fresh)`` for a cached entry, or ``(None, False)``.
+
+        ``res`` is a copy of the cached ``(dn, attrs)`` result; ``fresh`` is
+        False when the entry has outlived the cache time and must be
+        revalidated before use.
+
+        """
+        with self._lock:
+            entry = self._entries.get(object_id)
+            if entry is None:
+                return None, False
+            # Keep recently used entries at the end of the eviction order.
+            del self._entries[object_id]
+            self._entries[object_id] = entry
+            fresh = time.time() - entry['checked_at'] < self.cache_time
+            return copy.deepcopy(entry['res']), fresh
+
+    def get_cached_timestamp(self, object_id):
+        with self._lock:
+            entry = self._entries.get(object_id)
+            return entry and entry['timestamp']
+
+    def store(self, object_id, res):
+        """Cache a converted ``(dn, attrs)`` result for an object ID."""
+        timestamp = self.get_timestamp(res[1])
+        with self._lock:
+            self._remove(object_id)
+            self._entries[object_id] = {'res': copy.deepcopy(res),
+                                        'timestamp': timestamp,
+                                        'checked_at': time.time()}
+            self._keys_by_dn[res[0].lower()] = object_id
+            if timestamp is not None and (self._high_water is None or
+                                          timestamp > self._high_water):
+                self._high_water = timestamp
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def refresh(self, res):
+        """Replace a cached entry by DN; return False if it is not cached."""
+        with self._lock:
+            object_id = self._keys_by_dn.get(res[0].lower())
+        if object_id is None:
+            return False
+        self.store(object_id, res)
+        return True
+
+    def mark_checked(self, object_id):
+        """Record that a cached entry has just been revalidated."""
+        with self._lock:
+            entry = self._entries.get(object_id)
+            if entry is not None:
+                entry['checked_at'] = time.time()
+
+    def invalidate(self, object_id=None):
+        """Drop one entry, or the whole cache when no ID is given."""
+        with self._lock:
+            if object_id is None:
+                self._entries.clear()
+                self._keys_by_dn.clear()
+                self._high_water = None
+            else:
+                self._remove(object_id)
+
+    def begin_sync(self):
+        """Return the timestamp to synchronize from if a sync is due.
+
+        Returns None when delta synchronization is disabled, not yet due, or
+        there is nothing cached to refresh. Only one caller is handed a
+        timestamp per interval.
+
+        """
+        if not self.sync_interval:
+            return None
+        with self._lock:
+            now = time.time()
+            if now - self._last_sync < self.sync_interval:
+                return None
+            self._last_sync = now
+            return self._high_water
+
+    def _remove(self, object_id):
+        entry = self._entries.pop(object_id, None)
+        if entry is not None:
+            self._keys_by_dn.pop(entry['res'][0].lower(), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
 class BaseLdap(object):
     DEFAULT_OU = None
     DEFAULT_STRUCTURAL_CLASSES = None
@@ -1147,6 +1639,10 @@ class BaseLdap(object):
         self.pool_retry_delay = conf.ldap.pool_retry_delay
         self.pool_conn_timeout = conf.ldap.pool_connection_timeout
         self.pool_conn_lifetime = conf.ldap.pool_connection_lifetime
+        self.pool_prewarm_size = conf.ldap.pool_prewarm_size
+        self.membership_batch_size = conf.ldap.membership_batch_size
+        self.membership_batch_concurrency = (
+            conf.ldap.membership_batch_concurrency)
 
         # End user authentication pool specific config attributes
         self.use_auth_pool = self.use_pool and conf.ldap.use_auth_pool
@@ -1190,6 +1686,14 @@ class BaseLdap(object):
             attribute_ignore = '%s_attribute_ignore' % self.options_name
             self.attribute_ignore = getattr(conf.ldap, attribute_ignore)
 
+        self.entity_cache = None
+        if conf.ldap.entity_cache_enabled and self.options_name is not None:
+            self.entity_cache = EntityCache(
+                conf.ldap.entity_cache_size,
+                conf.ldap.entity_cache_time,
+                conf.ldap.entity_cache_sync_interval,
+                conf.ldap.entity_cache_timestamp_attribute)
+
     def _not_found(self, object_id):
         if self.NotFound is None:
             return exception.NotFound(target=object_id)
@@ -1269,15 +1773,64 @@ class BaseLdap(object):
             raise exception.LDAPServerConnectionError(
                 url=self.LDAP_URL)
 
+    def schedule_connection_pool_prewarm(self):
+        """Pre-warm the connection pool on the first request, if enabled.
+
+        See :func:`prewarm_connection_pools`.
+
+        """
+        if not (self.use_pool and self.pool_prewarm_size):
+            return
+        with _PREWARM_LOCK:
+            if _prewarmed_pid != os.getpid():
+                _PREWARM_PENDING.append(self)
+
+    def prewarm_connection_pool(self):
+        """Open and bind ``[ldap] pool_prewarm_size`` pooled connections.
+
+        Failures are logged rather than raised, the connections are then
+        opened on demand as usual.
+
+        """
+        if not (self.use_pool and self.pool_prewarm_size):
+            return
+        try:
+            conn = self.get_connection()
+            try:
+                size = conn.prewarm(self.pool_prewarm_size)
+            finally:
+                conn.unbind_s()
+        except (exception.Error, ldap.LDAPError, ldappool.BackendError,
+                ldappool.MaxConnectionReachedError) as e:
+            LOG.warning('Unable to pre-warm the LDAP connection pool for '
+                        '%(url)s: %(error)s', {'url': self.LDAP_URL,
+                                               'error': e})
+            return
+        LOG.debug('Pre-warmed the LDAP connection pool for %(url)s with '
+                  '%(size)s connections', {'url': self.LDAP_URL,
+                                           'size': size})
+
     def _id_to_dn_string(self, object_id):
         return u'%s=%s,%s' % (self.id_attr,
                               ldap.dn.escape_dn_chars(
                                   six.text_type(object_id)),
                               self.tree_dn)
 
+    def _dn_cache_key(self, object_id):
+        # NOTE: Domain specific drivers may use different servers with the
+        # same tree DN, the default one being enough for that.
+        return (self.LDAP_URL, self.tree_dn, self.id_attr, self.object_class,
+                six.text_type(object_id))
+
     def _id_to_dn(self, object_id):
         if self.LDAP_SCOPE == ldap.SCOPE_ONELEVEL:
             return self._id_to_dn_string(object_id)
+        # The DN of an entry is remembered whenever the entry is read, so the
+        # search below is only needed for entries this process hasn't seen.
+        key = self._dn_cache_key(object_id)
+        dn = _DNS_BY_ID.get(key)
+        if dn is not None:
+            return dn
         with self.get_connection() as conn:
             search_result = conn.search_s(
                 self.tree_dn, self.LDAP_SCOPE,
@@ -1289,13 +1842,14 @@ class BaseLdap(object):
                 attrlist=DN_ONLY)
         if search_result:
             dn, attrs = search_result[0]
+            _DNS_BY_ID.set(key, dn)
             return dn
         else:
             return self._id_to_dn_string(object_id)
 
     @staticmethod
     def _dn_to_id(dn):
-        return ldap.dn.str2dn(dn)[0][0][1]
+        return parse_dn(dn)[0][0][1]
 
     def _ldap_res_to_model(self, res):
         # LDAP attribute names may be returned in a different case than
@@ -1325,6 +1879,7 @@ class BaseLdap(object):
             id_val = self._dn_to_id(res[0])
         else:
             id_val = id_attrs[0]
+        _DNS_BY_ID.set(self._dn_cache_key(id_val), res[0])
         obj = self.model(id=id_val)
 
         for k in obj.known_keys:
@@ -1404,6 +1959,10 @@ class BaseLdap(object):
     # then it will ignore ldap users who don't have 'personName' attribute
     # value set on user.
     def _filter_ldap_result_by_attr(self, ldap_result, ldap_attr_name):
+        return list(self._iter_ldap_result_by_attr(ldap_result,
+                                                   ldap_attr_name))
+
+    def _iter_ldap_result_by_attr(self, ldap_result, ldap_attr_name):
         attr = self.attribute_mapping[ldap_attr_name]
 
         # To ensure that ldap attribute value is not empty in ldap config.
@@ -1419,7 +1978,6 @@ class BaseLdap(object):
         # ldap_result = [{'uid': ['fake_id1']}, , 'cN': ["name"]}]
         # doing lower case on both user_name_attribute and ldap users
         # attribute
-        result = []
         # consider attr = "cn" and
         # ldap_result = [(u'cn=fake1,o=ex_domain', {'uid': ['fake_id1']}),
         #                (u'cn=fake2,o=ex_domain', {'uid': ['fake_id2'],
@@ -1439,12 +1997,24 @@ class BaseLdap(object):
             # contains only whitespaces.
             if result_attr_vals:
                 if result_attr_vals[0] and result_attr_vals[0].strip():
-                    result.append(obj)
+                    yield obj
         # except {'uid': ['fake_id5'], 'cn': ["name"]}, all entries
         # will be ignored in ldap_result
-        return result
+
+    def _entity_attrs(self):
+        attrs = set([self.id_attr] +
+                    list(self.attribute_mapping.values()) +
+                    list(self.extra_attr_mapping.keys()))
+        if self.entity_cache is not None:
+            attrs.add(self.entity_cache.timestamp_attribute)
+        return list(attrs)
 
     def _ldap_get(self, object_id, ldap_filter=None):
+        if self.entity_cache is not None and ldap_filter is None:
+            return self._ldap_get_cached(object_id)
+        return self._ldap_get_by_id(object_id, ldap_filter)
+
+    def _ldap_get_by_id(self, object_id, ldap_filter=None):
         query = (u'(&(%(id_attr)s=%(id)s)'
                  u'%(filter)s'
                  u'(objectClass=%(object_class)s))'
@@ -1455,13 +2025,10 @@ class BaseLdap(object):
                     'object_class': self.object_class})
         with self.get_connection() as conn:
             try:
-                attrs = list(set(([self.id_attr] +
-                                  list(self.attribute_mapping.values()) +
-                                  list(self.extra_attr_mapping.keys()))))
                 res = conn.search_s(self.tree_dn,
                                     self.LDAP_SCOPE,
                                     query,
-                                    attrs)
+                                    self._entity_attrs())
             except ldap.NO_SUCH_OBJECT:
                 return None
 
@@ -1477,6 +2044,76 @@ class BaseLdap(object):
         except IndexError:
             return None
 
+    def _ldap_get_cached(self, object_id):
+        cache = self.entity_cache
+        self._sync_entity_cache()
+
+        res, fresh = cache.lookup(object_id)
+        if res is not None:
+            if fresh:
+                return res
+            # Revalidate by reading only the timestamp attribute of the
+            # cached DN; the entry is fetched again only if it changed,
+            # moved or cannot be compared.
+            cached_timestamp = cache.get_cached_timestamp(object_id)
+            if (cached_timestamp is not None and
+                    cached_timestamp == self._ldap_get_timestamp(res[0])):
+                cache.mark_checked(object_id)
+                return res
+
+        res = self._ldap_get_by_id(object_id)
+        if res is None:
+            cache.invalidate(object_id)
+        else:
+            cache.store(object_id, res)
+        return res
+
+    def _ldap_get_timestamp(self, dn):
+        attr = self.entity_cache.timestamp_attribute
+        with self.get_connection() as conn:
+            try:
+                res = conn.search_s(dn, ldap.SCOPE_BASE,
+                                    u'(objectClass=*)', [attr])
+            except ldap.NO_SUCH_OBJECT:
+                return None
+        if not res:
+            return None
+        return self.entity_cache.get_timestamp(res[0][1])
+
+    def _sync_entity_cache(self):
+        """Refresh cached entries modified since the last synchronization.
+
+        A single search with an ordering filter on the timestamp attribute
+        returns every entry changed since the most recent timestamp held in
+        the cache; only the entries already cached are refreshed.
+
+        """
+        cache = self.entity_cache
+        since = cache.begin_sync()
+        if since is None:
+            return
+        query = (u'(&%(filter)s'
+                 u'(objectClass=%(object_class)s)'
+                 u'(%(attr)s>=%(since)s))'
+                 % {'filter': self.ldap_filter or '',
+                    'object_class': self.object_class,
+                    'attr': cache.timestamp_attribute,
+                    'since': ldap.filter.escape_filter_chars(since)})
+        with self.get_connection() as conn:
+            try:
+                results = conn.search_s(self.tree_dn, self.LDAP_SCOPE,
+                                        query, self._entity_attrs())
+            except ldap.NO_SUCH_OBJECT:
+                return
+        refreshed = 0
+        for res in self._filter_ldap_result_by_attr(results, 'name'):
+            if cache.refresh(res):
+                refreshed += 1
+        LOG.debug('LDAP entity cache sync for %(tree_dn)s: %(changed)d '
+                  'changed entries since %(since)s, %(refreshed)d refreshed',
+                  {'tree_dn': self.tree_dn, 'changed': len(results),
+                   'since': since, 'refreshed': refreshed})
+
     def _ldap_get_limited(self, base, scope, filterstr, attrlist, sizelimit):
         with self.get_connection() as conn:
             try:
@@ -1493,38 +2130,86 @@ class BaseLdap(object):
 
     @driver_hints.truncated
     def _ldap_get_all(self, hints, ldap_filter=None):
+        return list(self._ldap_iter_all(hints, ldap_filter))
+
+    def _ldap_iter_truncated(self, hints, ldap_filter=None):
+        """Yield the entries of _ldap_get_all without building a list.
+
+        Like ``driver_hints.truncated``, one more entry than the limit is
+        searched for, and the limit of the hints is marked as truncated if it
+        is found. The hints are only updated once the caller has consumed
+        the entries.
+
+        """
+        if hints.limit is None or hints.filters:
+            for entry in self._ldap_iter_all(hints, ldap_filter):
+                yield entry
+            return
+
+        list_limit = hints.limit['limit']
+        hints.set_limit(list_limit + 1)
+        entries = self._ldap_iter_all(hints, ldap_filter)
+        truncated = False
+        try:
+            for count, entry in enumerate(entries):
+                if count == list_limit:
+                    truncated = True
+                    break
+                yield entry
+        finally:
+            entries.close()
+            hints.set_limit(list_limit, truncated=truncated)
+
+    def _ldap_iter_all(self, hints, ldap_filter=None):
+        """Yield the entries matching the filter as they are received.
+
+        With paging enabled the entries are converted page by page, and once
+        the limit of the hints is reached the search is stopped without
+        fetching the remaining pages.
+
+        """
         query = u'(&%s(objectClass=%s)(%s=*))' % (
             ldap_filter or self.ldap_filter or '',
             self.object_class,
             self.id_attr)
-        sizelimit = 0
         attrs = list(set(([self.id_attr] +
                           list(self.attribute_mapping.values()) +
                           list(self.extra_attr_mapping.keys()))))
-        if hints.limit:
-            sizelimit = hints.limit['limit']
+        sizelimit = hints.limit['limit'] if hints.limit else None
+        if sizelimit and not self.page_size:
             res = self._ldap_get_limited(self.tree_dn,
                                          self.LDAP_SCOPE,
                                          query,
                                          attrs,
                                          sizelimit)
-        else:
-            with self.get_connection() as conn:
-                try:
-                    res = conn.search_s(self.tree_dn,
-                                        self.LDAP_SCOPE,
-                                        query,
-                                        attrs)
-                except ldap.NO_SUCH_OBJECT:
-                    return []
-        # TODO(prashkre): add functional testing for missing name attribute
-        # on ldap entities.
-        # NOTE(prashkre): Filter ldap search result to keep keystone away from
-        # entities that don't have names. We can also do the same by appending
-        # a condition '(!(!(self.attribute_mapping.get('name')=*))' to ldap
-        # search query but the repsonse time of the query is pretty slow when
-        # compared to explicit filtering by 'name' through ldap result.
-        return self._filter_ldap_result_by_attr(res, 'name')
+            for entry in self._iter_ldap_result_by_attr(res, 'name'):
+                yield entry
+            return
+
+        with self.get_connection() as conn:
+            res = conn.search_s_iter(self.tree_dn,
+                                     self.LDAP_SCOPE,
+                                     query,
+                                     attrs)
+            # TODO(prashkre): add functional testing for missing name
+            # attribute on ldap entities.
+            # NOTE(prashkre): Filter ldap search result to keep keystone away
+            # from entities that don't have names. We can also do the same by
+            # appending a condition '(!(!(self.attribute_mapping.get('name')
+            # =*))' to ldap search query but the repsonse time of the query is
+            # pretty slow when compared to explicit filtering by 'name'
+            # through ldap result.
+            entries = self._iter_ldap_result_by_attr(res, 'name')
+            try:
+                for entry in itertools.islice(entries, sizelimit):
+                    yield entry
+            except ldap.NO_SUCH_OBJECT:
+                return
+            finally:
+                # Stop the search right away rather than when the generators
+                # are garbage collected, the connection is released next.
+                entries.close()
+                res.close()
 
     def _ldap_get_list(self, search_base, scope, query_params=None,
                        attrlist=None):
@@ -1558,10 +2243,90 @@ class BaseLdap(object):
         except IndexError:
             raise self._not_found(name)
 
-    def get_all(self, ldap_filter=None, hints=None):
+    def iter_all(self, ldap_filter=None, hints=None):
         hints = hints or driver_hints.Hints()
-        return [self._ldap_res_to_model(x)
-                for x in self._ldap_get_all(hints, ldap_filter)]
+        for x in self._ldap_iter_truncated(hints, ldap_filter):
+            yield self._ldap_res_to_model(x)
+
+    def get_all(self, ldap_filter=None, hints=None):
+        return list(self.iter_all(ldap_filter, hints))
+
+    @driver_hints.truncated
+    def get_all_by_ids(self, hints, object_ids, ldap_filter=None):
+        """Return the entities with the given IDs using batched searches.
+
+        The IDs are combined into OR filters of at most
+        ``[ldap] membership_batch_size`` terms, and the batches are searched
+        concurrently when the connection pool is enabled. IDs without a
+        matching entry are ignored.
+
+        The filters of the hints are included in the searches, and once the
+        limit of the hints is reached no further batches are searched.
+
+        """
+        ids = []
+        seen = set()
+        for object_id in object_ids:
+            object_id = six.text_type(object_id)
+            if object_id.lower() not in seen:
+                seen.add(object_id.lower())
+                ids.append(object_id)
+        size = self.membership_batch_size
+        batches = [ids[i:i + size] for i in range(0, len(ids), size)]
+        query = self.filter_query(hints, ldap_filter)
+
+        def search(batch):
+            id_filter = u'(|%s)' % ''.join(
+                u'(%s=%s)' % (self.id_attr,
+                              ldap.filter.escape_filter_chars(object_id))
+                for object_id in batch)
+            return self.get_all(u'(&%s%s%s)' % (self.ldap_filter or '',
+                                                query or '',
+                                                id_filter))
+
+        sizelimit = hints.limit['limit'] if hints.limit else None
+        if sizelimit is None:
+            return list(itertools.chain.from_iterable(
+                self._map_concurrently(search, batches)))
+
+        # Search as many batches at a time as there are workers, and skip the
+        # remaining batches once the limit is reached.
+        workers = self._batch_workers()
+        results = []
+        for i in range(0, len(batches), workers):
+            results.extend(itertools.chain.from_iterable(
+                self._map_concurrently(search, batches[i:i + workers])))
+            if len(results) >= sizelimit:
+                break
+        return results[:sizelimit]
+
+    def _batch_workers(self):
+        """Return the number of batches to search concurrently.
+
+        One connection of the pool is left for the other requests of the
+        process, so without a pool of at least two connections the batches
+        are searched one after another.
+
+        """
+        if not self.use_pool:
+            return 1
+        return max(1, min(self.membership_batch_concurrency,
+                          self.pool_size - 1))
+
+    def _map_concurrently(self, func, args_list):
+        """Call func for each argument, over several pooled connections.
+
+        Each call is expected to take its own connection from the pool. The
+        calls run on a thread pool of ``_batch_workers()`` threads shared by
+        all the requests using the same connection pool, so that all together
+        they never hold more connections than that.
+
+        """
+        workers = self._batch_workers()
+        if workers <= 1 or len(args_list) <= 1:
+            return [func(args) for args in args_list]
+        return _get_batch_executor(self.LDAP_URL, workers).map(func,
+                                                               args_list)
 
     def update(self, object_id, values, old_obj=None):
         if old_obj is None:
@@ -1613,6 +2378,8 @@ class BaseLdap(object):
                     conn.modify_s(self._id_to_dn(object_id), modlist)
                 except ldap.NO_SUCH_OBJECT:
                     raise self._not_found(object_id)
+            if self.entity_cache is not None:
+                self.entity_cache.invalidate(object_id)
 
         return self.get(object_id)
 
@@ -1846,20 +2613,22 @@ class EnabledEmuMixIn(BaseLdap):
                 ref['enabled'] = self._get_enabled(object_id, conn)
             return ref
 
-    def get_all(self, ldap_filter=None, hints=None):
+    def iter_all(self, ldap_filter=None, hints=None):
         hints = hints or driver_hints.Hints()
         if 'enabled' not in self.attribute_ignore and self.enabled_emulation:
-            # had to copy BaseLdap.get_all here to ldap_filter by DN
-            obj_list = [self._ldap_res_to_model(x)
-                        for x in self._ldap_get_all(hints, ldap_filter)
-                        if x[0] != self.enabled_emulation_dn]
+            # had to copy BaseLdap.iter_all here to ldap_filter by DN
             with self.get_connection() as conn:
-                for obj_ref in obj_list:
+                for x in self._ldap_iter_truncated(hints, ldap_filter):
+                    if x[0] == self.enabled_emulation_dn:
+                        continue
+                    obj_ref = self._ldap_res_to_model(x)
                     obj_ref['enabled'] = self._get_enabled(
                         obj_ref['id'], conn)
-            return obj_list
+                    yield obj_ref
         else:
-            return super(EnabledEmuMixIn, self).get_all(ldap_filter, hints)
+            for obj_ref in super(EnabledEmuMixIn, self).iter_all(ldap_filter,
+                                                                 hints):
+                yield obj_ref
 
     def update(self, object_id, values, old_obj=None):
         if 'enabled' not in self.attribute_ignore and self.enabled_emulation:
@@ -19,6 +19,7 @@ from oslo_log import log
 from oslo_log import versionutils
 import six
 
+from keystone.common import driver_hints
 import keystone.conf
 from keystone import exception
 from keystone.i18n import _
@@ -48,6 +49,8 @@ class Identity(base.IdentityDriverBase):
             self.conf = conf
         self.user = UserApi(self.conf)
         self.group = GroupApi(self.conf)
+        # Users and groups share the same connection pool.
+        self.user.schedule_connection_pool_prewarm()
 
     def is_domain_aware(self):
         return False
@@ -110,6 +113,11 @@ class Identity(base.IdentityDriverBase):
             user_dn = user_ref['id']
         else:
             user_dn = user_ref['dn']
+            if (self.user.member_of_attribute and
+                    not self.group.group_ad_nesting):
+                group_dns = self.user.list_member_of(user_dn)
+                return self.group.list_groups_by_dns_filtered(group_dns,
+                                                              hints)
         return self.group.list_user_groups_filtered(user_dn, hints)
 
     def list_groups(self, hints):
@@ -124,12 +132,18 @@ class Identity(base.IdentityDriverBase):
             yield user_id
 
     def list_users_in_group(self, group_id, hints):
-        users = []
         group_members = self.group.list_group_users(group_id)
-        for user_id in self._transform_group_member_ids(group_members):
-            try:
-                users.append(self.user.get_filtered(user_id))
-            except exception.UserNotFound:
+        user_ids = list(self._transform_group_member_ids(group_members))
+        users_by_id = {}
+        for user in self.user.get_filtered_by_ids(user_ids):
+            users_by_id[user['id'].lower()] = user
+        # Return the users in the order they are listed in the group.
+        users = []
+        for user_id in user_ids:
+            user = users_by_id.get(six.text_type(user_id).lower())
+            if user is not None:
+                users.append(user)
+            else:
                 msg = ('Group member `%(user_id)s` for group `%(group_id)s`'
                        ' not found in the directory. The user should be'
                        ' removed from the group. The user will be ignored.')
@@ -256,6 +270,7 @@ class UserApi(common_ldap.EnabledEmuMixIn, common_ldap.BaseLdap):
         self.enabled_default = conf.ldap.user_enabled_default
         self.enabled_invert = conf.ldap.user_enabled_invert
         self.enabled_emulation = conf.ldap.user_enabled_emulation
+        self.member_of_attribute = conf.ldap.user_member_of_attribute
 
     def _ldap_res_to_model(self, res):
         obj = super(UserApi, self)._ldap_res_to_model(res)
@@ -314,17 +329,34 @@ class UserApi(common_ldap.EnabledEmuMixIn, common_ldap.BaseLdap):
         user = self.get(user_id)
         return self.filter_attributes(user)
 
-    def get_all(self, ldap_filter=None, hints=None):
-        objs = super(UserApi, self).get_all(ldap_filter=ldap_filter,
-                                            hints=hints)
-        for obj in objs:
+    def get_filtered_by_ids(self, user_ids):
+        return [self.filter_attributes(user) for user in
+                self.get_all_by_ids(driver_hints.Hints(), user_ids)]
+
+    def list_member_of(self, user_dn):
+        """Return the DNs of the groups the user is a direct member of."""
+        try:
+            res = self._ldap_get_list(user_dn, ldap.SCOPE_BASE,
+                                      attrlist=[self.member_of_attribute])
+        except ldap.NO_SUCH_OBJECT:
+            return []
+        group_dns = []
+        for dn, attrs in res:
+            for k, v in attrs.items():
+                if k.lower() == self.member_of_attribute.lower():
+                    group_dns.extend(v)
+        return group_dns
+
+    def iter_all(self, ldap_filter=None, hints=None):
+        for obj in super(UserApi, self).iter_all(ldap_filter=ldap_filter,
+                                                 hints=hints):
             obj['options'] = {}  # options always empty
-        return objs
+            yield obj
 
     def get_all_filtered(self, hints):
         query = self.filter_query(hints, self.ldap_filter)
         return [self.filter_attributes(user)
-                for user in self.get_all(query, hints)]
+                for user in self.iter_all(query, hints)]
 
     def filter_attributes(self, user):
         return base.filter_user(common_ldap.filter_entity(user))
@@ -425,6 +457,13 @@ class GroupApi(common_ldap.BaseLdap):
                                  user_dn_esc)
         return self.get_all_filtered(hints, query)
 
+    def list_groups_by_dns_filtered(self, group_dns, hints):
+        """Return a filtered list of the groups with the given DNs."""
+        group_ids = [self._dn_to_id(group_dn) for group_dn in group_dns
+                     if common_ldap.dn_startswith(group_dn, self.tree_dn)]
+        return [common_ldap.filter_entity(group)
+                for group in self.get_all_by_ids(hints, group_ids)]
+
     def list_group_users(self, group_id):
         """Return a list of user dns which are members of a group."""
         group_ref = self.get(group_id)
@@ -468,4 +507,4 @@ class GroupApi(common_ldap.BaseLdap):
             query = (query or '') + self.ldap_filter
         query = self.filter_query(hints, query)
         return [common_ldap.filter_entity(group)
-                for group in self.get_all(query, hints)]
+                for group in self.iter_all(query, hints)]
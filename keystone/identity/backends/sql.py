@@ -366,6 +366,14 @@ class Identity(base.IdentityDriverBase):
         with sql.session_for_read() as session:
             return self._get_group(session, group_id).to_dict()
 
+    def get_groups_by_ids(self, group_ids):
+        if not group_ids:
+            return []
+        with sql.session_for_read() as session:
+            query = session.query(model.Group)
+            query = query.filter(model.Group.id.in_(group_ids))
+            return [ref.to_dict() for ref in query]
+
     def get_group_by_name(self, group_name, domain_id):
         with sql.session_for_read() as session:
             query = session.query(model.Group)
@@ -14,6 +14,7 @@
 
 """Main entry point into the Identity service."""
 
+import collections
 import copy
 import functools
 import itertools
@@ -52,6 +53,10 @@ ID_MAPPING_REGION = cache.create_region(name='id mapping')
 MEMOIZE_ID_MAPPING = cache.get_memoization_decorator(group='identity',
                                                      region=ID_MAPPING_REGION)
 
+GROUP_NAME_REGION = cache.create_region(name='group name resolution')
+MEMOIZE_GROUP_NAME = cache.get_memoization_decorator(group='identity',
+                                                     region=GROUP_NAME_REGION)
+
 DOMAIN_CONF_FHEAD = 'keystone.'
 DOMAIN_CONF_FTAIL = '.conf'
 
@@ -64,6 +69,14 @@ REGISTRATION_ATTEMPTS = 10
 SQL_DRIVER = 'SQL'
 
 
+def _config_file_uses_sql_driver(path):
+    """Whether a domain config file sets the in-tree SQL identity driver."""
+    sections = {}
+    cfg.ConfigParser(path, sections).parse()
+    drivers = sections.get('identity', {}).get('driver')
+    return bool(drivers) and drivers[-1].strip() == 'sql'
+
+
 class DomainConfigs(provider_api.ProviderAPIMixin, dict):
     """Discover, store and provide access to domain specific configs.
 
@@ -79,13 +92,71 @@ class DomainConfigs(provider_api.ProviderAPIMixin, dict):
     this class will hold a reference to a ConfigOpts and driver object that
     the identity manager and driver can use.
 
+    If `[identity] domain_driver_cache_size` is set, the configuration and
+    driver of a domain are only loaded when the domain is first used, and the
+    least recently used ones are dropped once there are more of them than
+    the option allows.
+
     """
 
     configured = False
     driver = None
-    _any_sql = False
+    _sql_domain_id = None
     lock = threading.Lock()
 
+    def __init__(self):
+        super(DomainConfigs, self).__init__()
+        # Domain IDs of the loaded configs, least recently used first. Only
+        # maintained when the number of loaded drivers is limited.
+        self._lru = collections.OrderedDict()
+        self._lru_lock = threading.Lock()
+        # Domain config files by domain name, when they are loaded on first
+        # use instead of at setup.
+        self._config_files = None
+
+    @property
+    def _lazy(self):
+        return CONF.identity.domain_driver_cache_size > 0
+
+    def _store_domain_config(self, domain_id, domain_config):
+        self[domain_id] = domain_config
+        if not self._lazy:
+            return
+        with self._lru_lock:
+            self._lru.pop(domain_id, None)
+            self._lru[domain_id] = True
+            excess = len(self._lru) - CONF.identity.domain_driver_cache_size
+            for evicted in list(self._lru):
+                if excess <= 0:
+                    break
+                # NOTE: The SQL driver is never dropped, it has to be called
+                # when a project is deleted to unset the default project of
+                # its users.
+                if evicted == domain_id or evicted == self._sql_domain_id:
+                    continue
+                del self._lru[evicted]
+                self.pop(evicted, None)
+                excess -= 1
+
+    def _touch_domain_config(self, domain_id):
+        if self._lazy:
+            with self._lru_lock:
+                if domain_id in self._lru:
+                    self._lru[domain_id] = self._lru.pop(domain_id)
+
+    def _forget_domain_config(self, domain_id):
+        with self._lru_lock:
+            self._lru.pop(domain_id, None)
+        if self._sql_domain_id == domain_id:
+            self._sql_domain_id = None
+        try:
+            del self[domain_id]
+        except KeyError:  # nosec
+            # Allow this error in case we are unlucky and in a
+            # multi-threaded situation, two threads happen to be running
+            # in lock step.
+            pass
+
     def _load_driver(self, domain_config):
         return manager.load_driver(Manager.driver_namespace,
                                    domain_config['cfg'].identity.driver,
@@ -100,12 +171,14 @@ class DomainConfigs(provider_api.ProviderAPIMixin, dict):
             would cause there to be more than one sql driver.
 
             """
-            if (new_config['driver'].is_sql and
-                    (self.driver.is_sql or self._any_sql)):
+            if not new_config['driver'].is_sql:
+                return
+            if (self.driver.is_sql or
+                    self._sql_domain_id not in (None, domain_ref['id'])):
                 # The addition of this driver would cause us to have more than
                 # one sql driver, so raise an exception.
                 raise exception.MultipleSQLDriversInConfig(source=config_file)
-            self._any_sql = self._any_sql or new_config['driver'].is_sql
+            self._sql_domain_id = domain_ref['id']
 
         try:
             domain_ref = resource_api.get_domain_by_name(domain_name)
@@ -127,7 +200,28 @@ class DomainConfigs(provider_api.ProviderAPIMixin, dict):
                              default_config_dirs=[])
         domain_config['driver'] = self._load_driver(domain_config)
         _assert_no_more_than_one_sql_driver(domain_config, file_list)
-        self[domain_ref['id']] = domain_config
+        self._store_domain_config(domain_ref['id'], domain_config)
+
+    def _find_config_files(self):
+        """Yield the path and domain name of each domain config file."""
+        conf_dir = CONF.identity.domain_config_dir
+        if not os.path.exists(conf_dir):
+            LOG.warning('Unable to locate domain config directory: %s',
+                        conf_dir)
+            return
+
+        for r, d, f in os.walk(conf_dir):
+            for fname in f:
+                if (fname.startswith(DOMAIN_CONF_FHEAD) and
+                        fname.endswith(DOMAIN_CONF_FTAIL)):
+                    if fname.count('.') >= 2:
+                        yield (os.path.join(r, fname),
+                               fname[len(DOMAIN_CONF_FHEAD):
+                                     -len(DOMAIN_CONF_FTAIL)])
+                    else:
+                        LOG.debug(('Ignoring file (%s) while scanning domain '
+                                   'config directory'),
+                                  fname)
 
     def _setup_domain_drivers_from_files(self, standard_driver, resource_api):
         """Read the domain specific configuration files and load the drivers.
@@ -144,26 +238,37 @@ class DomainConfigs(provider_api.ProviderAPIMixin, dict):
           options defined in this config file
         - Initialise a new instance of the required driver with this new config
 
+        If drivers are loaded on first use, only the names of the files are
+        read here.
+
         """
-        conf_dir = CONF.identity.domain_config_dir
-        if not os.path.exists(conf_dir):
-            LOG.warning('Unable to locate domain config directory: %s',
-                        conf_dir)
+        if self._lazy:
+            self._config_files = dict(
+                (domain_name, path)
+                for path, domain_name in self._find_config_files())
+            # The domain using the SQL driver is loaded straight away, so that
+            # it is called when a project is deleted.
+            for domain_name, path in self._config_files.items():
+                if _config_file_uses_sql_driver(path):
+                    self._load_config_from_file(resource_api, [path],
+                                                domain_name)
             return
 
-        for r, d, f in os.walk(conf_dir):
-            for fname in f:
-                if (fname.startswith(DOMAIN_CONF_FHEAD) and
-                        fname.endswith(DOMAIN_CONF_FTAIL)):
-                    if fname.count('.') >= 2:
-                        self._load_config_from_file(
-                            resource_api, [os.path.join(r, fname)],
-                            fname[len(DOMAIN_CONF_FHEAD):
-                                  -len(DOMAIN_CONF_FTAIL)])
-                    else:
-                        LOG.debug(('Ignoring file (%s) while scanning domain '
-                                   'config directory'),
-                                  fname)
+        for path, domain_name in self._find_config_files():
+            self._load_config_from_file(resource_api, [path], domain_name)
+
+    def _load_config_file_if_required(self, domain_id):
+        """Load the config file of a domain on its first use, if any."""
+        if self._config_files is None or domain_id in self:
+            return
+        try:
+            domain_name = PROVIDERS.resource_api.get_domain(domain_id)['name']
+        except exception.DomainNotFound:
+            return
+        path = self._config_files.get(domain_name)
+        if path is not None:
+            self._load_config_from_file(PROVIDERS.resource_api, [path],
+                                        domain_name)
 
     def _load_config_from_database(self, domain_id, specific_config):
 
@@ -272,7 +377,30 @@ class DomainConfigs(provider_api.ProviderAPIMixin, dict):
         domain_config['cfg_overrides'] = specific_config
         domain_config['driver'] = self._load_driver(domain_config)
         _assert_no_more_than_one_sql_driver(domain_id, domain_config)
-        self[domain_id] = domain_config
+        if domain_config['driver'].is_sql:
+            self._sql_domain_id = domain_id
+        elif self._sql_domain_id == domain_id:
+            self._sql_domain_id = None
+        self._store_domain_config(domain_id, domain_config)
+
+    def load_sql_domain_config(self):
+        """Load the config of the domain using the SQL driver, if needed.
+
+        When drivers are loaded on first use, the domain registered for the
+        SQL driver, possibly by another keystone process, may not have been
+        used by this one yet. Config files are only read at setup, when the
+        domain using the SQL driver is loaded straight away.
+
+        """
+        if (not self._lazy or
+                not CONF.identity.domain_configurations_from_database):
+            return
+        try:
+            domain_id = PROVIDERS.domain_config_api.read_registration(
+                SQL_DRIVER)
+        except exception.ConfigRegistrationNotFound:
+            return
+        self._get_domain_config(domain_id)
 
     def _setup_domain_drivers_from_database(self, standard_driver,
                                             resource_api):
@@ -286,7 +414,14 @@ class DomainConfigs(provider_api.ProviderAPIMixin, dict):
           defined in the resource backend
         - Initialise a new instance of the required driver with this new config
 
+        If drivers are loaded on first use, nothing is read here: the config
+        of a domain is read when checking whether it changed, see
+        check_config_and_reload_domain_driver_if_required().
+
         """
+        if self._lazy:
+            return
+
         for domain in resource_api.list_domains():
             domain_config_options = (
                 PROVIDERS.domain_config_api.
@@ -307,15 +442,23 @@ class DomainConfigs(provider_api.ProviderAPIMixin, dict):
                                                   resource_api)
         self.configured = True
 
-    def get_domain_driver(self, domain_id):
+    def _get_domain_config(self, domain_id):
+        self._load_config_file_if_required(domain_id)
         self.check_config_and_reload_domain_driver_if_required(domain_id)
-        if domain_id in self:
-            return self[domain_id]['driver']
+        domain_config = self.get(domain_id)
+        if domain_config is not None:
+            self._touch_domain_config(domain_id)
+        return domain_config
+
+    def get_domain_driver(self, domain_id):
+        domain_config = self._get_domain_config(domain_id)
+        if domain_config is not None:
+            return domain_config['driver']
 
     def get_domain_conf(self, domain_id):
-        self.check_config_and_reload_domain_driver_if_required(domain_id)
-        if domain_id in self:
-            return self[domain_id]['cfg']
+        domain_config = self._get_domain_config(domain_id)
+        if domain_config is not None:
+            return domain_config['cfg']
         else:
             return CONF
 
@@ -347,6 +490,10 @@ class DomainConfigs(provider_api.ProviderAPIMixin, dict):
         will get any config that has been updated from any other keystone
         process.
 
+        Only the config of the given domain is read, so when drivers are
+        loaded on first use this is also how the config and driver of a domain
+        are first loaded.
+
         This cache-timeout approach works for both multi-process and
         multi-threaded keystone configurations. In multi-threaded
         configurations, even though we might remove a driver object (that
@@ -367,23 +514,18 @@ class DomainConfigs(provider_api.ProviderAPIMixin, dict):
         latest_domain_config = (
             PROVIDERS.domain_config_api.
             get_config_with_sensitive_info(domain_id))
-        domain_config_in_use = domain_id in self
+        domain_config_in_use = self.get(domain_id)
 
         if latest_domain_config:
-            if (not domain_config_in_use or
-                    latest_domain_config != self[domain_id]['cfg_overrides']):
+            if (domain_config_in_use is None or
+                    latest_domain_config !=
+                    domain_config_in_use['cfg_overrides']):
                 self._load_config_from_database(domain_id,
                                                 latest_domain_config)
-        elif domain_config_in_use:
+        elif domain_config_in_use is not None:
             # The domain specific config has been deleted, so should remove the
             # specific driver for this domain.
-            try:
-                del self[domain_id]
-            except KeyError:  # nosec
-                # Allow this error in case we are unlucky and in a
-                # multi-threaded situation, two threads happen to be running
-                # in lock step.
-                pass
+            self._forget_domain_config(domain_id)
         # If we fall into the else condition, this means there is no domain
         # config set, and there is none in use either, so we have nothing
         # to do.
@@ -536,8 +678,10 @@ class Manager(manager.Manager):
 
         """
         project_id = payload['resource_info']
+        if self.domain_configs.configured:
+            self.domain_configs.load_sql_domain_config()
         drivers = itertools.chain(
-            self.domain_configs.values(), [{'driver': self.driver}]
+            list(self.domain_configs.values()), [{'driver': self.driver}]
         )
         for d in drivers:
             try:
@@ -1165,6 +1309,8 @@ class Manager(manager.Manager):
         group['id'] = uuid.uuid4().hex
         group['name'] = group['name'].strip()
         ref = driver.create_group(group['id'], group)
+        # Any negative name resolution cached for this group is now stale.
+        GROUP_NAME_REGION.invalidate()
 
         notifications.Audit.created(self._GROUP, group['id'], initiator)
 
@@ -1189,6 +1335,56 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.GROUP)
 
+    @MEMOIZE_GROUP_NAME
+    def get_group_id_by_name(self, group_name, domain_id):
+        """Resolve a group name within a domain to the group's public ID.
+
+        Both hits and misses are cached, so that mapped groups that do not
+        exist locally don't cost a backend query on every federated login.
+        The cache is invalidated whenever a group is created, renamed or
+        deleted.
+
+        :param group_name: name of the group
+        :param domain_id: ID of the domain owning the group
+        :returns: the public ID of the group, or None if there is no such
+                  group in the domain
+
+        """
+        try:
+            return self.get_group_by_name(group_name, domain_id)['id']
+        except exception.GroupNotFound:
+            return None
+
+    @domains_configured
+    def get_groups_by_ids(self, group_ids):
+        """Get the groups matching a list of public IDs.
+
+        The IDs are grouped by the driver that owns them, and each driver is
+        asked for all of its groups in a single call rather than once per ID.
+
+        :param group_ids: list of public group IDs
+        :returns: list of group refs. IDs that do not match a group are
+                  skipped, so callers must compare the result with the
+                  requested IDs if they need to detect missing groups.
+
+        """
+        entity_ids_by_driver = collections.OrderedDict()
+        for group_id in group_ids:
+            try:
+                domain_id, driver, entity_id = (
+                    self._get_domain_driver_and_entity_id(group_id))
+            except exception.PublicIDNotFound:
+                continue
+            entity_ids_by_driver.setdefault(
+                (domain_id, driver), []).append(entity_id)
+
+        groups = []
+        for (domain_id, driver), entity_ids in entity_ids_by_driver.items():
+            refs = driver.get_groups_by_ids(entity_ids)
+            groups.extend(self._set_domain_id_and_mapping(
+                refs, domain_id, driver, mapping.EntityType.GROUP))
+        return groups
+
     @domains_configured
     @exception_translated('group')
     def update_group(self, group_id, group, initiator=None):
@@ -1201,6 +1397,8 @@ class Manager(manager.Manager):
             group['name'] = group['name'].strip()
         ref = driver.update_group(entity_id, group)
         self.get_group.invalidate(self, group_id)
+        if 'name' in group:
+            GROUP_NAME_REGION.invalidate()
         notifications.Audit.updated(self._GROUP, group_id, initiator)
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.GROUP)
@@ -1216,6 +1414,7 @@ class Manager(manager.Manager):
         user_ids = (u['id'] for u in self.list_users_in_group(group_id))
         driver.delete_group(entity_id)
         self.get_group.invalidate(self, group_id)
+        GROUP_NAME_REGION.invalidate()
         PROVIDERS.id_mapping_api.delete_id_mapping(group_id)
         PROVIDERS.assignment_api.delete_group_assignments(group_id)
 
@@ -1410,30 +1609,11 @@ class Manager(manager.Manager):
 
         :returns: dictionary of the mapped User entity
         """
-        user_dict = {}
-        try:
-            PROVIDERS.shadow_users_api.update_federated_user_display_name(
-                idp_id, protocol_id, unique_id, display_name)
-            user_dict = PROVIDERS.shadow_users_api.get_federated_user(
-                idp_id, protocol_id, unique_id)
-            if email:
-                user_ref = {"email": email}
-                self.update_user(user_dict['id'], user_ref)
-                user_dict.update({"email": email})
-        except exception.UserNotFound:
-            idp = PROVIDERS.federation_api.get_idp(idp_id)
-            federated_dict = {
-                'idp_id': idp_id,
-                'protocol_id': protocol_id,
-                'unique_id': unique_id,
-                'display_name': display_name
-            }
-            user_dict = (
-                PROVIDERS.shadow_users_api.create_federated_user(
-                    idp['domain_id'], federated_dict, email=email
-                )
-            )
-        PROVIDERS.shadow_users_api.set_last_active_at(user_dict['id'])
+        user_dict = PROVIDERS.shadow_users_api.shadow_federated_user(
+            idp_id, protocol_id, unique_id, display_name, email=email)
+        if email and user_dict.get('email') != email:
+            self.update_user(user_dict['id'], {'email': email})
+            user_dict['email'] = email
         return user_dict
 
 
@@ -16,9 +16,13 @@ import abc
 
 import six
 
+from keystone.common import provider_api
 from keystone import exception
 
 
+PROVIDERS = provider_api.ProviderAPIs
+
+
 @six.add_metaclass(abc.ABCMeta)
 class ShadowUsersDriverBase(object):
     """Interface description for an Shadow Users driver."""
@@ -35,6 +39,43 @@ class ShadowUsersDriverBase(object):
         """
         raise exception.NotImplemented()
 
+    def shadow_federated_user(self, idp_id, protocol_id, unique_id,
+                              display_name, email=None):
+        """Return the user for a federated identity, creating it if needed.
+
+        The display name of an existing user is updated and, if
+        ``[security_compliance] disable_user_account_days_inactive`` is set,
+        the user's last active date is refreshed. Drivers should override
+        this to do all of it in a single transaction that is safe against
+        concurrent first logins of the same user; the default implementation
+        is built on the other driver methods.
+
+        :param idp_id: The identity provider ID
+        :param protocol_id: The federation protocol ID
+        :param unique_id: The user's unique ID (unique within the IdP)
+        :param display_name: The user's display name
+        :param email: Federated user's email, only used when the user is
+                      created
+        :returns dict: Containing the user reference
+
+        """
+        try:
+            self.update_federated_user_display_name(
+                idp_id, protocol_id, unique_id, display_name)
+            user = self.get_federated_user(idp_id, protocol_id, unique_id)
+        except exception.UserNotFound:
+            idp = PROVIDERS.federation_api.get_idp(idp_id)
+            federated_dict = {
+                'idp_id': idp_id,
+                'protocol_id': protocol_id,
+                'unique_id': unique_id,
+                'display_name': display_name
+            }
+            user = self.create_federated_user(
+                idp['domain_id'], federated_dict, email=email)
+        self.set_last_active_at(user['id'])
+        return user
+
     @abc.abstractmethod
     def get_federated_user(self, idp_id, protocol_id, unique_id):
         """Return the found user for the federated identity.
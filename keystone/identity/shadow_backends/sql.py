@@ -16,6 +16,7 @@ import sqlalchemy
 
 from oslo_config import cfg
 from oslo_db import api as oslo_db_api
+from oslo_db import exception as db_exception
 
 from keystone.common import provider_api
 from keystone.common import sql
@@ -28,6 +29,39 @@ from keystone.identity.shadow_backends import base
 CONF = cfg.CONF
 PROVIDERS = provider_api.ProviderAPIs
 
+# NOTE: only the columns needed to find the domain of an identity provider,
+# so that this driver doesn't depend on the federation driver's models.
+_IDENTITY_PROVIDER_TABLE = sqlalchemy.table(
+    'identity_provider',
+    sqlalchemy.column('id'),
+    sqlalchemy.column('domain_id'))
+
+
+def _upsert(session, table, values, conflict_columns, update_columns):
+    """Insert a row, updating ``update_columns`` if it already exists.
+
+    On PostgreSQL and MySQL this issues ``INSERT ... ON CONFLICT`` or
+    ``INSERT ... ON DUPLICATE KEY UPDATE`` respectively. Other dialects get a
+    plain ``INSERT``; a concurrent insert of the same row then raises
+    ``DBDuplicateEntry``.
+
+    """
+    dialect = session.bind.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects import postgresql
+        statement = postgresql.insert(table).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={c: statement.excluded[c] for c in update_columns})
+    elif dialect == 'mysql':
+        from sqlalchemy.dialects import mysql
+        statement = mysql.insert(table).values(**values)
+        statement = statement.on_duplicate_key_update(
+            **{c: statement.inserted[c] for c in update_columns})
+    else:
+        statement = table.insert().values(**values)
+    session.execute(statement)
+
 
 class ShadowUsers(base.ShadowUsersDriverBase):
     @sql.handle_conflicts(conflict_type='federated_user')
@@ -54,6 +88,88 @@ class ShadowUsers(base.ShadowUsersDriverBase):
             session.add(user_ref)
             return identity_base.filter_user(user_ref.to_dict())
 
+    @sql.handle_conflicts(conflict_type='federated_user')
+    def shadow_federated_user(self, idp_id, protocol_id, unique_id,
+                              display_name, email=None):
+        try:
+            return self._shadow_federated_user(
+                idp_id, protocol_id, unique_id, display_name, email)
+        except db_exception.DBDuplicateEntry:
+            # NOTE: the user ID is already taken. If a concurrent first login
+            # of the same user created it, the lookup of a new transaction
+            # finds the user. If it belongs to another identity, the insert
+            # fails again and is reported as a conflict.
+            return self._shadow_federated_user(
+                idp_id, protocol_id, unique_id, display_name, email)
+
+    @oslo_db_api.wrap_db_retry(retry_on_deadlock=True)
+    def _shadow_federated_user(self, idp_id, protocol_id, unique_id,
+                               display_name, email):
+        with sql.session_for_write() as session:
+            user_ref = self._query_federated_user(
+                session, idp_id, protocol_id, unique_id).first()
+            if user_ref is None:
+                self._insert_federated_user(
+                    session, idp_id, protocol_id, unique_id, display_name,
+                    email)
+                user_ref = self._query_federated_user(
+                    session, idp_id, protocol_id, unique_id).one()
+            else:
+                # Only write when something actually changed, so that the
+                # common case of a returning user is a single SELECT.
+                for federated_ref in user_ref.federated_users:
+                    if (federated_ref.idp_id == idp_id and
+                            federated_ref.protocol_id == protocol_id and
+                            federated_ref.unique_id == unique_id and
+                            federated_ref.display_name != display_name):
+                        federated_ref.display_name = display_name
+
+            if CONF.security_compliance.disable_user_account_days_inactive:
+                today = datetime.datetime.utcnow().date()
+                if user_ref.last_active_at != today:
+                    user_ref.last_active_at = today
+            return identity_base.filter_user(user_ref.to_dict())
+
+    def _query_federated_user(self, session, idp_id, protocol_id, unique_id):
+        query = session.query(model.User).outerjoin(model.LocalUser)
+        query = query.join(model.FederatedUser)
+        query = query.filter(model.FederatedUser.idp_id == idp_id)
+        query = query.filter(model.FederatedUser.protocol_id == protocol_id)
+        query = query.filter(model.FederatedUser.unique_id == unique_id)
+        return query
+
+    def _insert_federated_user(self, session, idp_id, protocol_id, unique_id,
+                               display_name, email):
+        query = sqlalchemy.select([_IDENTITY_PROVIDER_TABLE.c.domain_id])
+        query = query.where(_IDENTITY_PROVIDER_TABLE.c.id == idp_id)
+        domain_id = session.execute(query).scalar()
+        if domain_id is None:
+            raise exception.IdentityProviderNotFound(idp_id=idp_id)
+
+        # NOTE: the public ID is a hash of the domain and unique ID, so
+        # concurrent first logins of the same user compute the same ID, and
+        # so does the same unique ID asserted by another identity provider of
+        # the domain. The user insert must fail in both cases: the caller
+        # tells them apart in a new transaction.
+        user_id = PROVIDERS.id_generator_api.generate_public_ID(
+            {'domain_id': domain_id,
+             'local_id': unique_id,
+             'entity_type': 'user'})
+        session.execute(model.User.__table__.insert().values(
+            id=user_id,
+            domain_id=domain_id,
+            enabled=True,
+            extra={'email': email} if email else {},
+            created_at=datetime.datetime.utcnow()))
+        _upsert(session, model.FederatedUser.__table__,
+                {'user_id': user_id,
+                 'idp_id': idp_id,
+                 'protocol_id': protocol_id,
+                 'unique_id': unique_id,
+                 'display_name': display_name},
+                conflict_columns=['idp_id', 'protocol_id', 'unique_id'],
+                update_columns=['display_name'])
+
     def _update_query_with_federated_statements(self, hints, query):
         statements = []
         for filter_ in hints.filters:
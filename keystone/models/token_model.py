@@ -407,16 +407,21 @@ class TokenModel(object):
         return roles
 
     def _get_application_credential_roles(self):
+        # NOTE: The roles of the application credential are only valid while
+        # the user still has them on the project, the same check as when the
+        # application credential is created. The effective roles of the user
+        # are fetched once, from the computed assignments cache, rather than
+        # checking a grant for every role of the application credential.
         roles = []
         app_cred_roles = self.application_credential['roles']
+        user_roles = set(
+            PROVIDERS.assignment_api.get_roles_for_user_and_project(
+                self.user_id, self.project_id
+            )
+        )
         for role in app_cred_roles:
-            try:
-                r = PROVIDERS.assignment_api.get_grant(
-                    role['id'], user_id=self.user_id,
-                    domain_id=self.domain_id, project_id=self.project_id)
-                roles.append({'id': r['id'], 'name': r['name']})
-            except exception.RoleAssignmentNotFound:
-                pass
+            if role['id'] in user_roles:
+                roles.append({'id': role['id'], 'name': role['name']})
 
         return roles
 
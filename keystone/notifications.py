@@ -14,10 +14,15 @@
 
 """Notifications module for OpenStack Identity Service resources."""
 
+import atexit
 import collections
+import contextlib
 import functools
 import inspect
+import os
 import socket
+import threading
+import time
 
 import flask
 from oslo_log import log
@@ -33,6 +38,7 @@ from pycadf import reason
 from pycadf import resource
 
 from keystone.common import context
+from keystone.common import metrics
 from keystone.common import provider_api
 from keystone.common import utils
 import keystone.conf
@@ -71,7 +77,13 @@ CADF_TYPE_MAP = {
 SAML_AUDIT_TYPE = 'http://docs.oasis-open.org/security/saml/v2.0'
 # resource types that can be notified
 _SUBSCRIBERS = {}
+# coalesced callbacks waiting for the end of the callback scope of a thread
+_CALLBACK_SCOPE = threading.local()
 _notifier = None
+# whether notifications are sent, by (event_type, outcome), for the
+# notification_opt_out value they were computed with
+_NOTIFICATION_DECISIONS = {}
+_decisions_opt_out = None
 SERVICE = 'identity'
 
 ROOT_DOMAIN = '<<keystone.domain.root>>'
@@ -340,20 +352,241 @@ def listener(cls):
     return cls
 
 
+def coalesced_callback(callback):
+    """Declare that an event callback can handle many events at once.
+
+    A coalesced callback is given a list of payloads instead of a single one.
+    Within a :func:`callback_scope` it is run once, when the scope ends, for
+    each resource type and operation it was notified of, with the payloads of
+    all of those events. Outside of a scope it is run for each event, with a
+    list holding that event's payload. This suits callbacks that invalidate
+    a whole cache region, which only needs doing once however many entities
+    changed.
+
+    Example::
+
+        @notifications.coalesced_callback
+        def _drop_token_cache(self, service, resource_type, operation,
+                              payloads):
+            TOKENS_REGION.invalidate()
+
+    """
+    callback.coalesced = True
+    return callback
+
+
+@contextlib.contextmanager
+def callback_scope():
+    """Defer coalesced callbacks until the end of a bulk change.
+
+    Coalesced callbacks notified within the scope are run when it is left,
+    even if it is left with an exception since the entities changed before
+    the exception still need their callbacks. Other callbacks are run as the
+    events are notified. Scopes opened within a scope of the same thread are
+    part of the outer one.
+    """
+    if getattr(_CALLBACK_SCOPE, 'pending', None) is not None:
+        yield
+        return
+
+    pending = _CALLBACK_SCOPE.pending = collections.OrderedDict()
+    try:
+        yield
+    finally:
+        _CALLBACK_SCOPE.pending = None
+        for key, (service, payloads) in pending.items():
+            callback, resource_type, operation = key
+            _invoke_callback(callback, service, resource_type, operation,
+                             payloads)
+
+
+def _invoke_callback(callback, service, resource_type, operation, payload):
+    subst_dict = {'cb_name': callback.__name__,
+                  'service': service,
+                  'resource_type': resource_type,
+                  'operation': operation,
+                  'payload': payload}
+    LOG.debug('Invoking callback %(cb_name)s for event '
+              '%(service)s %(resource_type)s %(operation)s for '
+              '%(payload)s', subst_dict)
+    callback(service, resource_type, operation, payload)
+
+
 def notify_event_callbacks(service, resource_type, operation, payload):
     """Send a notification to registered extensions."""
     if operation in _SUBSCRIBERS:
         if resource_type in _SUBSCRIBERS[operation]:
+            pending = getattr(_CALLBACK_SCOPE, 'pending', None)
             for cb in _SUBSCRIBERS[operation][resource_type]:
-                subst_dict = {'cb_name': cb.__name__,
-                              'service': service,
-                              'resource_type': resource_type,
-                              'operation': operation,
-                              'payload': payload}
-                LOG.debug('Invoking callback %(cb_name)s for event '
-                          '%(service)s %(resource_type)s %(operation)s for '
-                          '%(payload)s', subst_dict)
-                cb(service, resource_type, operation, payload)
+                if not getattr(cb, 'coalesced', False):
+                    _invoke_callback(cb, service, resource_type, operation,
+                                     payload)
+                elif pending is None:
+                    _invoke_callback(cb, service, resource_type, operation,
+                                     [payload])
+                else:
+                    key = (cb, resource_type, operation)
+                    pending.setdefault(key, (service, []))[1].append(payload)
+
+
+def _get_queue_depth():
+    if _notifier:
+        yield {}, getattr(_notifier, 'queue_depth', 0)
+
+
+NOTIFICATION_QUEUE_DEPTH = metrics.gauge(
+    'keystone_notification_queue_depth',
+    'Number of notifications waiting to be sent in the background.',
+    callback=_get_queue_depth)
+NOTIFICATION_SEND_SECONDS = metrics.histogram(
+    'keystone_notification_send_seconds',
+    'Time spent sending a notification to the message bus.', ('mode',))
+NOTIFICATION_QUEUE_WAIT_SECONDS = metrics.histogram(
+    'keystone_notification_queue_wait_seconds',
+    'Time notifications spent queued before being sent.')
+NOTIFICATIONS_DROPPED = metrics.counter(
+    'keystone_notifications_dropped_total',
+    'Number of notifications dropped because the queue was full.')
+
+
+class _TimedNotifier(object):
+    """Send notifications from the calling thread and time the sends."""
+
+    def __init__(self, notifier):
+        self.notifier = notifier
+
+    def info(self, context, event_type, payload):
+        with NOTIFICATION_SEND_SECONDS.time(mode='sync'):
+            self.notifier.info(context, event_type, payload)
+
+
+class _AsyncNotifier(object):
+    """Queue notifications and send them from a background thread.
+
+    The thread is started by the first notification queued in a process, so
+    that worker processes forked after loading the application each run
+    their own. Up to ``batch_size`` notifications are taken from the queue
+    at once, and sent one at a time since consumers expect one event per
+    message.
+    """
+
+    def __init__(self, notifier, queue_size, batch_size, overflow_policy):
+        self.notifier = notifier
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.overflow_policy = overflow_policy
+        self._reset()
+
+    def _reset(self):
+        self._queue = collections.deque()
+        self._sending = 0
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = os.getpid()
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def _ensure_started(self):
+        if self._pid != os.getpid():
+            # NOTE: The process was forked after the thread was started, the
+            # thread and anything queued belong to the parent.
+            self._reset()
+        if self._thread is None or not self._thread.is_alive():
+            with self._cond:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, name='keystone-notifier')
+                    self._thread.daemon = True
+                    self._thread.start()
+
+    def info(self, context, event_type, payload):
+        self._ensure_started()
+        with self._cond:
+            while len(self._queue) >= self.queue_size:
+                if self.overflow_policy == 'block':
+                    self._cond.wait()
+                    continue
+                NOTIFICATIONS_DROPPED.inc()
+                if self.overflow_policy == 'drop_newest':
+                    LOG.warning('Notification queue is full, dropped a %s '
+                                'notification', event_type)
+                    return
+                LOG.warning('Notification queue is full, dropped a %s '
+                            'notification', self._queue.popleft()[1])
+            self._queue.append((context, event_type, payload, time.time()))
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in
+                         range(min(self.batch_size, len(self._queue)))]
+                self._sending = len(batch)
+                self._cond.notify_all()
+            for context, event_type, payload, queued_at in batch:
+                NOTIFICATION_QUEUE_WAIT_SECONDS.observe(
+                    time.time() - queued_at)
+                try:
+                    with NOTIFICATION_SEND_SECONDS.time(mode='async'):
+                        self.notifier.info(context, event_type, payload)
+                except Exception:
+                    # diaper defense: the thread must keep sending the
+                    # following notifications
+                    LOG.exception('Failed to send %s notification',
+                                  event_type)
+            with self._cond:
+                self._sending = 0
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until the queued notifications are sent.
+
+        :param timeout: maximum number of seconds to wait, forever if None
+        :returns: True if every queued notification was sent
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._queue or self._sending:
+                if self._thread is None or not self._thread.is_alive():
+                    break
+                remaining = None if deadline is None else (
+                    deadline - time.time())
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return not (self._queue or self._sending)
+
+    def stop(self, timeout=None):
+        """Send the queued notifications and stop the thread."""
+        sent = self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if not sent:
+            LOG.warning('%d notifications were not sent before exiting',
+                        len(self._queue))
+        return sent
+
+
+def _threads_disabled():
+    """Return True if threads started by the application are not run.
+
+    This is the case under uWSGI unless its ``enable-threads`` or ``threads``
+    option is set: the threads are created but never scheduled.
+    """
+    try:
+        import uwsgi
+    except ImportError:
+        return False
+    opt = getattr(uwsgi, 'opt', {})
+    return not (opt.get('enable-threads') or opt.get('threads'))
 
 
 def _get_notifier():
@@ -362,7 +595,8 @@ def _get_notifier():
     If _notifier is None it means that a notifier object has not been set.
     If _notifier is False it means that a notifier has previously failed to
     construct.
-    Otherwise it is a constructed Notifier object.
+    Otherwise it is a constructed notifier object, sending notifications in
+    the background if `notification_async` is set.
     """
     global _notifier
 
@@ -370,15 +604,46 @@ def _get_notifier():
         host = CONF.default_publisher_id or socket.gethostname()
         try:
             transport = oslo_messaging.get_notification_transport(CONF)
-            _notifier = oslo_messaging.Notifier(transport,
-                                                "identity.%s" % host)
+            notifier = oslo_messaging.Notifier(transport,
+                                               "identity.%s" % host)
         except Exception:
             LOG.exception("Failed to construct notifier")
             _notifier = False
+        else:
+            if CONF.notification_async and _threads_disabled():
+                LOG.warning('notification_async is enabled but uWSGI runs '
+                            'without threads, notifications are sent '
+                            'synchronously. Set the enable-threads option '
+                            'of uWSGI to send them in the background.')
+                _notifier = _TimedNotifier(notifier)
+            elif CONF.notification_async:
+                _notifier = _AsyncNotifier(
+                    notifier, CONF.notification_queue_size,
+                    CONF.notification_batch_size,
+                    CONF.notification_overflow_policy)
+            else:
+                _notifier = _TimedNotifier(notifier)
 
     return _notifier
 
 
+def flush_notifier(timeout=None):
+    """Wait until the notifications queued in the background are sent.
+
+    :param timeout: maximum number of seconds to wait, forever if None
+    :returns: True if no notification is left to send
+    """
+    if isinstance(_notifier, _AsyncNotifier):
+        return _notifier.flush(timeout)
+    return True
+
+
+@atexit.register
+def _stop_notifier():
+    if isinstance(_notifier, _AsyncNotifier):
+        _notifier.stop(CONF.notification_flush_timeout)
+
+
 def clear_subscribers():
     """Empty subscribers dictionary.
 
@@ -395,7 +660,10 @@ def reset_notifier():
 
     """
     global _notifier
+    if isinstance(_notifier, _AsyncNotifier):
+        _notifier.stop(timeout=0)
     _notifier = None
+    _NOTIFICATION_DECISIONS.clear()
 
 
 def _create_cadf_payload(operation, resource_type, resource_id,
@@ -434,12 +702,15 @@ def _create_cadf_payload(operation, resource_type, resource_id,
     if resource_id == ROOT_DOMAIN:
         return
 
+    event_type = '%s.%s.%s' % (SERVICE, resource_type, operation)
+    if not _notification_enabled(event_type, outcome):
+        return
+
     target = resource.Resource(typeURI=target_uri,
                                id=resource_id)
 
     audit_kwargs = {'resource_info': resource_id}
     cadf_action = '%s.%s' % (operation, resource_type)
-    event_type = '%s.%s.%s' % (SERVICE, resource_type, operation)
 
     _send_audit_notification(cadf_action, initiator, outcome,
                              target, event_type, reason=reason, **audit_kwargs)
@@ -480,21 +751,19 @@ def _send_notification(operation, resource_type, resource_id, initiator=None,
     # let the CADF functions handle sending the notification. But we check
     # here so as to not disrupt the notify_event_callbacks function.
     if public and CONF.notification_format == 'basic':
-        notifier = _get_notifier()
-        if notifier:
-            context = {}
-            event_type = '%(service)s.%(resource_type)s.%(operation)s' % {
-                'service': SERVICE,
-                'resource_type': resource_type,
-                'operation': operation}
-            if _check_notification_opt_out(event_type, outcome=None):
-                return
-            try:
-                notifier.info(context, event_type, payload)
-            except Exception:
-                LOG.exception(
-                    'Failed to send %(res_id)s %(event_type)s notification',
-                    {'res_id': resource_id, 'event_type': event_type})
+        event_type = '%(service)s.%(resource_type)s.%(operation)s' % {
+            'service': SERVICE,
+            'resource_type': resource_type,
+            'operation': operation}
+        if not _notification_enabled(event_type):
+            return
+        context = {}
+        try:
+            _get_notifier().info(context, event_type, payload)
+        except Exception:
+            LOG.exception(
+                'Failed to send %(res_id)s %(event_type)s notification',
+                {'res_id': resource_id, 'event_type': event_type})
 
 
 def _get_request_audit_info(context, user_id=None):
@@ -558,13 +827,21 @@ class CadfNotificationWrapper(object):
         self.event_type = '%s.%s' % (SERVICE, operation)
 
     def __call__(self, f):
-        @functools.wraps(f)
-        def wrapper(wrapped_self, user_id, *args, **kwargs):
-            """Will always send a notification."""
+        def send(user_id, outcome, audit_reason=None):
+            # NOTE: The CADF event is only built if it is going to be sent.
+            if not _notification_enabled(self.event_type, outcome):
+                return
             target = resource.Resource(typeURI=taxonomy.ACCOUNT_USER)
             initiator = build_audit_initiator()
             initiator.user_id = user_id
             initiator.id = utils.resource_uuid(user_id)
+            _send_audit_notification(self.action, initiator, outcome,
+                                     target, self.event_type,
+                                     reason=audit_reason)
+
+        @functools.wraps(f)
+        def wrapper(wrapped_self, user_id, *args, **kwargs):
+            """Send a notification, unless its outcome is opted out."""
             try:
                 result = f(wrapped_self, user_id, *args, **kwargs)
             except (exception.AccountLocked,
@@ -572,21 +849,14 @@ class CadfNotificationWrapper(object):
                 # Send a CADF event with a reason for PCI-DSS related
                 # authentication failures
                 audit_reason = reason.Reason(str(ex), str(ex.code))
-                _send_audit_notification(self.action, initiator,
-                                         taxonomy.OUTCOME_FAILURE,
-                                         target, self.event_type,
-                                         reason=audit_reason)
+                send(user_id, taxonomy.OUTCOME_FAILURE, audit_reason)
                 raise
             except Exception:
                 # For authentication failure send a CADF event as well
-                _send_audit_notification(self.action, initiator,
-                                         taxonomy.OUTCOME_FAILURE,
-                                         target, self.event_type)
+                send(user_id, taxonomy.OUTCOME_FAILURE)
                 raise
             else:
-                _send_audit_notification(self.action, initiator,
-                                         taxonomy.OUTCOME_SUCCESS,
-                                         target, self.event_type)
+                send(user_id, taxonomy.OUTCOME_SUCCESS)
                 return result
 
         return wrapper
@@ -654,39 +924,42 @@ class CadfRoleAssignmentNotificationWrapper(object):
             checking kwargs, we can check the positional arguments,
             based on the method signature.
             """
-            call_args = inspect.getcallargs(
-                f, wrapped_self, role_id, *args, **kwargs)
-            inherited = call_args['inherited_to_projects']
-            initiator = call_args.get('initiator', None)
-            target = resource.Resource(typeURI=taxonomy.ACCOUNT_USER)
-
-            audit_kwargs = {}
-            if call_args['project_id']:
-                audit_kwargs['project'] = call_args['project_id']
-            elif call_args['domain_id']:
-                audit_kwargs['domain'] = call_args['domain_id']
-
-            if call_args['user_id']:
-                audit_kwargs['user'] = call_args['user_id']
-            elif call_args['group_id']:
-                audit_kwargs['group'] = call_args['group_id']
-
-            audit_kwargs['inherited_to_projects'] = inherited
-            audit_kwargs['role'] = role_id
+            def send(outcome):
+                # NOTE: The call arguments are only inspected if the event
+                # is going to be sent.
+                if not _notification_enabled(self.event_type, outcome):
+                    return
+                call_args = inspect.getcallargs(
+                    f, wrapped_self, role_id, *args, **kwargs)
+                inherited = call_args['inherited_to_projects']
+                initiator = call_args.get('initiator', None)
+                target = resource.Resource(typeURI=taxonomy.ACCOUNT_USER)
+
+                audit_kwargs = {}
+                if call_args['project_id']:
+                    audit_kwargs['project'] = call_args['project_id']
+                elif call_args['domain_id']:
+                    audit_kwargs['domain'] = call_args['domain_id']
+
+                if call_args['user_id']:
+                    audit_kwargs['user'] = call_args['user_id']
+                elif call_args['group_id']:
+                    audit_kwargs['group'] = call_args['group_id']
+
+                audit_kwargs['inherited_to_projects'] = inherited
+                audit_kwargs['role'] = role_id
+
+                _send_audit_notification(self.action, initiator, outcome,
+                                         target, self.event_type,
+                                         **audit_kwargs)
 
             try:
                 result = f(wrapped_self, role_id, *args, **kwargs)
             except Exception:
-                _send_audit_notification(self.action, initiator,
-                                         taxonomy.OUTCOME_FAILURE,
-                                         target, self.event_type,
-                                         **audit_kwargs)
+                send(taxonomy.OUTCOME_FAILURE)
                 raise
             else:
-                _send_audit_notification(self.action, initiator,
-                                         taxonomy.OUTCOME_SUCCESS,
-                                         target, self.event_type,
-                                         **audit_kwargs)
+                send(taxonomy.OUTCOME_SUCCESS)
                 return result
 
         return wrapper
@@ -712,6 +985,9 @@ def send_saml_audit_notification(action, user_id, group_ids,
     :param outcome: One of :class:`pycadf.cadftaxonomy`
     :type outcome: str
     """
+    event_type = '%s.%s' % (SERVICE, action)
+    if not _notification_enabled(event_type, outcome):
+        return
     initiator = build_audit_initiator()
     target = resource.Resource(typeURI=taxonomy.ACCOUNT_USER)
     audit_type = SAML_AUDIT_TYPE
@@ -722,7 +998,6 @@ def send_saml_audit_notification(action, user_id, group_ids,
                                           identity_provider=identity_provider,
                                           user=user_id, groups=group_ids)
     initiator.credential = cred
-    event_type = '%s.%s' % (SERVICE, action)
     _send_audit_notification(action, initiator, outcome, target, event_type)
 
 
@@ -748,7 +1023,7 @@ def _send_audit_notification(action, initiator, outcome, target,
     :param reason: Reason for the notification which contains the response
         code and message description
     """
-    if _check_notification_opt_out(event_type, outcome):
+    if not _notification_enabled(event_type, outcome):
         return
 
     global _CATALOG_HELPER_OBJ
@@ -779,17 +1054,42 @@ def _send_audit_notification(action, initiator, outcome, target,
 
     context = {}
     payload = event.as_dict()
-    notifier = _get_notifier()
 
-    if notifier:
-        try:
-            notifier.info(context, event_type, payload)
-        except Exception:
-            # diaper defense: any exception that occurs while emitting the
-            # notification should not interfere with the API request
-            LOG.exception(
-                'Failed to send %(action)s %(event_type)s notification',
-                {'action': action, 'event_type': event_type})
+    try:
+        _get_notifier().info(context, event_type, payload)
+    except Exception:
+        # diaper defense: any exception that occurs while emitting the
+        # notification should not interfere with the API request
+        LOG.exception(
+            'Failed to send %(action)s %(event_type)s notification',
+            {'action': action, 'event_type': event_type})
+
+
+def _notification_enabled(event_type, outcome=None):
+    """Return whether notifications of an event type are sent.
+
+    A notification is sent if a notifier could be built and the event type,
+    along with the outcome for authentication events, is not in
+    ``notification_opt_out``. The decision for each event type and outcome
+    is computed on first use and kept until the opt-out list changes or the
+    notifier is reset, so that callers can check it before building the
+    notification payload.
+
+    :param event_type: the event type, for example identity.user.created
+    :param outcome: The CADF outcome, for authentication events
+    """
+    global _decisions_opt_out
+    opt_out = CONF.notification_opt_out
+    if opt_out != _decisions_opt_out:
+        _NOTIFICATION_DECISIONS.clear()
+        _decisions_opt_out = list(opt_out)
+    try:
+        return _NOTIFICATION_DECISIONS[(event_type, outcome)]
+    except KeyError:
+        enabled = bool(not _check_notification_opt_out(event_type, outcome) and
+                       _get_notifier())
+        _NOTIFICATION_DECISIONS[(event_type, outcome)] = enabled
+        return enabled
 
 
 def _check_notification_opt_out(event_type, outcome):
@@ -93,7 +93,9 @@ class Manager(manager.Manager):
                 notifications.register_event_callback(event, resource_type,
                                                       callback_fns)
 
-    def _drop_receipt_cache(self, service, resource_type, operation, payload):
+    @notifications.coalesced_callback
+    def _drop_receipt_cache(self, service, resource_type, operation,
+                            payloads):
         """Invalidate the entire receipt cache.
 
         This is a handy private utility method that should be used when
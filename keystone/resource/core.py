@@ -467,10 +467,13 @@ class Manager(manager.Manager):
         :raises keystone.exception.Forbidden: if project is not a leaf
         """
         project = self.driver.get_project(project_id)
-        if project.get('is_domain'):
-            self._delete_domain(project, initiator)
-        else:
-            self._delete_project(project, initiator, cascade)
+        # NOTE: Deleting a domain or a subtree notifies callbacks for each
+        # deleted entity, cache invalidations are coalesced until it is done.
+        with notifications.callback_scope():
+            if project.get('is_domain'):
+                self._delete_domain(project, initiator)
+            else:
+                self._delete_project(project, initiator, cascade)
 
     def _delete_project(self, project, initiator=None, cascade=False):
         project_id = project['id']
@@ -785,7 +788,8 @@ class Manager(manager.Manager):
             domain = self.driver.get_project(domain_id)
         except exception.ProjectNotFound:
             raise exception.DomainNotFound(domain_id=domain_id)
-        self._delete_domain(domain, initiator)
+        with notifications.callback_scope():
+            self._delete_domain(domain, initiator)
 
     def _delete_domain(self, domain, initiator=None):
         # To help avoid inadvertent deletes, we insist that the domain
@@ -12,6 +12,7 @@
 import sys
 
 from oslo_log import log
+from oslo_utils import importutils
 
 from keystone import access_rules_config
 from keystone import application_credential
@@ -19,14 +20,14 @@ from keystone import assignment
 from keystone import auth
 from keystone import catalog
 from keystone.common import cache
+from keystone.common import profiler
 from keystone.common import provider_api
+import keystone.conf
 from keystone import credential
-from keystone import endpoint_policy
 from keystone import exception
 from keystone import federation
 from keystone import identity
 from keystone import limit
-from keystone import oauth1
 from keystone import policy
 from keystone import receipt
 from keystone import resource
@@ -34,8 +35,28 @@ from keystone import revoke
 from keystone import token
 from keystone import trust
 
+CONF = keystone.conf.CONF
 LOG = log.getLogger(__name__)
 
+# NOTE: The managers of rarely used APIs, with the name of the api they
+# provide. They are imported by name so that, with [wsgi] lazy_load set,
+# neither them nor their drivers are loaded before their first use.
+LAZY_MANAGERS = (
+    ('endpoint_policy_api', 'keystone.endpoint_policy.core.Manager'),
+    ('oauth_api', 'keystone.oauth1.core.Manager'),
+)
+
+
+def _build_manager(name, manager_cls):
+    with profiler.STARTUP_PROFILE.measure('manager', name):
+        return manager_cls()
+
+
+def _lazy_manager_loader(name, class_path):
+    def loader():
+        return _build_manager(name, importutils.import_class(class_path))
+    return loader
+
 
 def load_backends():
 
@@ -47,21 +68,30 @@ def load_backends():
     cache.configure_cache(region=token.provider.TOKENS_REGION)
     cache.configure_cache(region=receipt.provider.RECEIPTS_REGION)
     cache.configure_cache(region=identity.ID_MAPPING_REGION)
+    cache.configure_cache(region=identity.GROUP_NAME_REGION)
+    cache.configure_cache(region=federation.IDENTITY_PROVIDER_REGION)
     cache.configure_invalidation_region()
 
     managers = [access_rules_config.Manager,
                 application_credential.Manager, assignment.Manager,
                 catalog.Manager, credential.Manager,
                 credential.provider.Manager, resource.DomainConfigManager,
-                endpoint_policy.Manager, federation.Manager,
-                identity.generator.Manager, identity.MappingManager,
-                identity.Manager, identity.ShadowUsersManager,
-                limit.Manager, oauth1.Manager, policy.Manager,
+                federation.Manager, identity.generator.Manager,
+                identity.MappingManager, identity.Manager,
+                identity.ShadowUsersManager, limit.Manager, policy.Manager,
                 resource.Manager, revoke.Manager, assignment.RoleManager,
                 receipt.provider.Manager, trust.Manager,
                 token.provider.Manager]
 
-    drivers = {d._provides_api: d() for d in managers}
+    drivers = {d._provides_api: _build_manager(d._provides_api, d)
+               for d in managers}
+    for name, class_path in LAZY_MANAGERS:
+        if CONF.wsgi.lazy_load:
+            provider_api.ProviderAPIs._register_deferred_provider_api(
+                name, _lazy_manager_loader(name, class_path))
+        else:
+            drivers[name] = _build_manager(
+                name, importutils.import_class(class_path))
 
     # NOTE(morgan): lock the APIs, these should only ever be instantiated
     # before running keystone.
@@ -13,7 +13,9 @@
 from __future__ import absolute_import
 
 import functools
+import importlib
 import sys
+import threading
 
 import flask
 import oslo_i18n
@@ -23,13 +25,19 @@ import six
 import werkzeug.wsgi
 
 import keystone.api
+from keystone.common import metrics
+from keystone.common import profiler
+import keystone.conf
 from keystone import exception
+from keystone.identity.backends.ldap import common as ldap_common
 from keystone.server.flask import common as ks_flask
 from keystone.server.flask.request_processing import json_body
 from keystone.server.flask.request_processing import req_logging
+from keystone.server.flask.request_processing import req_metrics
 
 from keystone.receipt import handlers as receipt_handlers
 
+CONF = keystone.conf.CONF
 LOG = log.getLogger(__name__)
 
 
@@ -122,12 +130,7 @@ def _handle_unknown_keystone_exception(error):
     return _handle_keystone_exception(new_exc)
 
 
-@fail_gracefully
-def application_factory(name='public'):
-    if name not in ('admin', 'public'):
-        raise RuntimeError('Application name (for base_url lookup) must be '
-                           'either `admin` or `public`.')
-
+def _create_app(name):
     app = flask.Flask(name)
 
     # Register Error Handler Function for Keystone Errors.
@@ -145,29 +148,120 @@ def application_factory(name='public'):
     app.register_error_handler(TypeError, _handle_unknown_keystone_exception)
 
     # Add core before request functions
+    app.before_request(ldap_common.prewarm_connection_pools)
+    app.before_request(req_metrics.start_request_timer)
     app.before_request(req_logging.log_request_info)
     app.before_request(json_body.json_body_before_request)
 
-    # Add core after request functions
+    # Add core after request functions, they are run in the reverse order
+    app.after_request(req_metrics.record_response_status)
     app.after_request(_add_vary_x_auth_token_header)
 
+    # Add core teardown request functions, they are run even if the request
+    # failed with an exception that was not handled
+    app.teardown_request(req_metrics.observe_request)
+
     # NOTE(morgan): Configure the Flask Environment for our needs.
     app.config.update(
         # We want to bubble up Flask Exceptions (for now)
         PROPAGATE_EXCEPTIONS=True)
+    return app
 
-    for api in keystone.api.__apis__:
+
+def _register_api(app, api):
+    with profiler.STARTUP_PROFILE.measure('api', api.__name__):
         for api_bp in api.APIs:
             api_bp.instantiate_and_register_to_app(app)
 
+
+def _import_and_register_api(app, module_name):
+    module_name = '%s.%s' % (keystone.api.__name__, module_name)
+    with profiler.STARTUP_PROFILE.measure('import', module_name):
+        api = importlib.import_module(module_name)
+    _register_api(app, api)
+
+
+class _LazyAPIDispatcher(object):
+    """Dispatch requests to APIs that are only loaded on first use.
+
+    Each API of `keystone.api.__lazy_apis__` is served by its own Flask
+    application, built the same way as the main one when the first request
+    under one of its URL prefixes is received. Blueprints cannot be
+    registered to an application once it has started serving requests.
+    Every other request goes to the main application.
+    """
+
+    def __init__(self, wsgi_app, name, lazy_apis):
+        self.wsgi_app = wsgi_app
+        self.name = name
+        self._prefixes = [(prefix, module_name)
+                          for module_name, prefixes in lazy_apis
+                          for prefix in prefixes]
+        self._module_names = [module_name for module_name, _ in lazy_apis]
+        self._apps = {}
+        self._lock = threading.Lock()
+
+    def _get_app(self, module_name):
+        app = self._apps.get(module_name)
+        if app is None:
+            with self._lock:
+                app = self._apps.get(module_name)
+                if app is None:
+                    app = _create_app(self.name)
+                    _import_and_register_api(app, module_name)
+                    self._apps[module_name] = app
+        return app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '').rstrip('/')
+        # NOTE: The JSON Home document lists the resources of every
+        # registered API, so all of them are loaded before rendering it.
+        if (path in ('', '/v3') and
+                'application/json-home' in environ.get('HTTP_ACCEPT', '')):
+            for module_name in self._module_names:
+                self._get_app(module_name)
+        for prefix, module_name in self._prefixes:
+            if path == prefix or path.startswith(prefix + '/'):
+                app = self._get_app(module_name)
+                return app.wsgi_app(environ, start_response)
+        return self.wsgi_app(environ, start_response)
+
+
+def _metrics_app(environ, start_response):
+    body = metrics.render().encode('utf-8')
+    start_response('200 OK', [('Content-Type', metrics.CONTENT_TYPE),
+                              ('Content-Length', str(len(body)))])
+    return [body]
+
+
+@fail_gracefully
+def application_factory(name='public'):
+    if name not in ('admin', 'public'):
+        raise RuntimeError('Application name (for base_url lookup) must be '
+                           'either `admin` or `public`.')
+
+    app = _create_app(name)
+
+    for api in keystone.api.__apis__:
+        _register_api(app, api)
+
+    if CONF.wsgi.lazy_load:
+        app.wsgi_app = _LazyAPIDispatcher(app.wsgi_app, name,
+                                          keystone.api.__lazy_apis__)
+    else:
+        for module_name, _prefixes in keystone.api.__lazy_apis__:
+            _import_and_register_api(app, module_name)
+
     # Load in Healthcheck and map it to /healthcheck
     hc_app = healthcheck.Healthcheck.app_factory(
         {}, oslo_config_project='keystone')
 
+    mounts = {'/healthcheck': hc_app}
+    if CONF.wsgi.expose_metrics:
+        mounts['/metrics'] = _metrics_app
+
     # Use the simple form of the dispatch middleware, no extra logic needed
-    # for legacy dispatching. This is to mount /healthcheck at a consistent
-    # place
-    app.wsgi_app = werkzeug.wsgi.DispatcherMiddleware(
-        app.wsgi_app,
-        {'/healthcheck': hc_app})
+    # for legacy dispatching. This is to mount /healthcheck (and /metrics) at
+    # a consistent place
+    app.wsgi_app = werkzeug.wsgi.DispatcherMiddleware(app.wsgi_app, mounts)
     return app
@@ -164,6 +164,7 @@ def initialize_application(name, post_log_configured_function=lambda: None,
 
     _unused, app = keystone.server.setup_backends(
         startup_application_fn=loadapp)
+    profiler.STARTUP_PROFILE.log_report()
 
     # setup OSprofiler notifier and enable the profiling if that is configured
     # in Keystone configuration file.
@@ -242,7 +242,8 @@ class AuthContextMiddleware(provider_api.ProviderAPIMixin,
     def fetch_token(self, token, **kwargs):
         try:
             self.token = self.token_provider_api.validate_token(token)
-            return render_token.render_token_response_from_model(self.token)
+            return render_token.render_token_response_from_model(self.token,
+                                                                 lazy=True)
         except exception.TokenNotFound:
             raise auth_token.InvalidToken(_('Could not find token'))
 
@@ -360,10 +361,17 @@ class AuthContextMiddleware(provider_api.ProviderAPIMixin,
         # and the middleware_exceptions helper removed.
         self.fill_context(request)
 
-    def _keystone_specific_values(self, token, request_context):
-        request_context.token_reference = (
-            render_token.render_token_response_from_model(token)
-        )
+    def _keystone_specific_values(self, token, request_context,
+                                  token_reference=None):
+        # NOTE: The token reference is a lazy view, only the attributes read
+        # by policy or by the API handling the request are computed. The view
+        # built when the token was fetched is reused if it is given, so that
+        # they are only computed once.
+        if token_reference is None:
+            token_reference = render_token.render_token_response_from_model(
+                token, lazy=True
+            )
+        request_context.token_reference = token_reference
         if token.domain_scoped:
             # Domain scoped tokens should never have is_admin_project set
             # Even if KSA defaults it otherwise.  The two mechanisms are
@@ -421,7 +429,12 @@ class AuthContextMiddleware(provider_api.ProviderAPIMixin,
                 self.token = PROVIDERS.token_provider_api.validate_token(
                     request.user_token
                 )
-            self._keystone_specific_values(self.token, request_context)
+            token_reference = request.token_info
+            token_view = (token_reference or {}).get('token')
+            if getattr(token_view, 'token', None) is not self.token:
+                token_reference = None
+            self._keystone_specific_values(self.token, request_context,
+                                           token_reference)
             request_context.auth_token = request.user_token
             auth_context = request_context.to_policy_values()
             additional = {
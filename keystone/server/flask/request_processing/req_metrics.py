@@ -0,0 +1,65 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+# Record the duration and the number of SQL statements of each request, by
+# route rather than by path so that the number of label values stays bounded.
+
+import time
+
+import flask
+
+from keystone.common import metrics
+from keystone.common import sql
+
+
+REQUEST_SECONDS = metrics.histogram(
+    'keystone_http_request_duration_seconds',
+    'Time spent handling API requests, by method, route and status code.',
+    ('method', 'route', 'status'))
+REQUEST_SQL_QUERIES = metrics.histogram(
+    'keystone_http_request_sql_queries',
+    'Number of SQL statements executed by API requests, by route.',
+    ('route',), buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+
+
+def start_request_timer():
+    flask.g.request_start_time = time.time()
+    sql.reset_query_count()
+
+
+def record_response_status(response):
+    flask.g.response_status = response.status_code
+    return response
+
+
+def observe_request(exc=None):
+    """Record the request once it is torn down.
+
+    This runs even when an exception was not handled by an error handler,
+    in which case no response was made and the request is recorded with a
+    500 status, like the server reports it.
+
+    """
+    start_time = getattr(flask.g, 'request_start_time', None)
+    if start_time is None:
+        return
+    status = getattr(flask.g, 'response_status', None)
+    if exc is not None or status is None:
+        status = 500
+    rule = flask.request.url_rule
+    # NOTE: Requests that did not match a route, such as those ending with a
+    # 404, are all recorded under the same route.
+    route = rule.rule if rule is not None else 'unmatched'
+    REQUEST_SECONDS.observe(time.time() - start_time,
+                            method=flask.request.method, route=route,
+                            status=status)
+    REQUEST_SQL_QUERIES.observe(sql.get_query_count(), route=route)
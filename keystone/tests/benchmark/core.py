@@ -0,0 +1,81 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Helpers shared by the keystone micro-benchmarks.
+
+The modules in this package are not collected by the unit test runner. Each
+one can be run directly, for example::
+
+    python -m keystone.tests.benchmark.saml_signing --iterations 200
+
+"""
+
+import argparse
+import timeit
+
+from keystone.common import utils
+
+
+def measure(func, iterations, warmup=1):
+    """Call ``func`` repeatedly and return timing statistics in seconds.
+
+    :param func: callable taking no arguments
+    :param iterations: number of timed calls
+    :param warmup: number of untimed calls made first, so that one-off costs
+                   such as loading keys or compiling rules are not measured
+    :returns: dict with ``iterations``, ``total``, ``mean``, ``min``,
+              ``p50``, ``p95``, ``p99`` and ``max``
+
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        start = timeit.default_timer()
+        func()
+        samples.append(timeit.default_timer() - start)
+    samples.sort()
+
+    total = sum(samples)
+    return {
+        'iterations': iterations,
+        'total': total,
+        'mean': total / iterations if iterations else 0.0,
+        'min': samples[0] if samples else 0.0,
+        'p50': utils.percentile(samples, 50),
+        'p95': utils.percentile(samples, 95),
+        'p99': utils.percentile(samples, 99),
+        'max': samples[-1] if samples else 0.0,
+    }
+
+
+def print_results(results):
+    """Print a table of ``(name, stats)`` pairs, with times in milliseconds."""
+    header = '%-40s %8s %10s %10s %10s %10s' % (
+        'benchmark', 'calls', 'mean ms', 'p50 ms', 'p95 ms', 'p99 ms')
+    print(header)
+    print('-' * len(header))
+    for name, stats in results:
+        print('%-40s %8d %10.3f %10.3f %10.3f %10.3f' % (
+            name, stats['iterations'], stats['mean'] * 1000,
+            stats['p50'] * 1000, stats['p95'] * 1000, stats['p99'] * 1000))
+
+
+def get_parser(description):
+    """Return an argument parser with the options every benchmark accepts."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--iterations', type=int, default=100,
+                        help='number of timed calls per benchmark')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='number of untimed calls per benchmark')
+    return parser
@@ -0,0 +1,222 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Measure the LDAP identity driver against an in-memory directory.
+
+The directory is the fake LDAP handler used by the unit tests, registered for
+``fake://`` URLs, so no LDAP server is needed. It is seeded with users and
+groups, then the driver operations are timed and the number of searches and
+binds each of them sends to the directory is counted::
+
+    python -m keystone.tests.benchmark.ldap_backend --users 1000 \\
+        --groups 100 --memberships 5
+
+Options of the ``[ldap]`` group, such as the entity cache, the connection pool
+or the membership batch size, can be set in a configuration file passed with
+``--config-file``. Only the URL and suffix of the directory are overridden.
+
+"""
+
+import collections
+import itertools
+import random
+
+from keystone.common import driver_hints
+import keystone.conf
+from keystone.identity.backends import ldap as ldap_identity
+from keystone.identity.backends.ldap import common as common_ldap
+from keystone.tests.benchmark import core
+from keystone.tests.unit import fakeldap
+
+
+CONF = keystone.conf.CONF
+
+URL = 'fake://memory'
+POOL_URL = 'fakepool://memory'
+SUFFIX = 'cn=example,cn=com'
+PASSWORD = 'password'
+
+# The operations sent to the directory, by kind.
+CALLS = collections.Counter()
+
+
+class _CountingMixin(object):
+    """Count the operations a fake LDAP handler sends to the directory."""
+
+    def simple_bind_s(self, *args, **kwargs):
+        CALLS['bind'] += 1
+        return super(_CountingMixin, self).simple_bind_s(*args, **kwargs)
+
+    def search_s(self, *args, **kwargs):
+        CALLS['search'] += 1
+        return super(_CountingMixin, self).search_s(*args, **kwargs)
+
+    def search_ext(self, *args, **kwargs):
+        CALLS['search'] += 1
+        return super(_CountingMixin, self).search_ext(*args, **kwargs)
+
+    def result3(self, *args, **kwargs):
+        CALLS['page'] += 1
+        # The fake directory runs the search of every page with search_s,
+        # which is not a request of its own.
+        CALLS['search'] -= 1
+        return super(_CountingMixin, self).result3(*args, **kwargs)
+
+
+class CountingFakeLdap(_CountingMixin, fakeldap.FakeLdap):
+    """Fake LDAP handler counting the operations sent to the directory."""
+
+
+class CountingFakeLdapPool(_CountingMixin, fakeldap.FakeLdapPool):
+    """Fake pooled LDAP connector counting the operations it sends."""
+
+
+def seed(driver, users, groups, memberships):
+    """Fill the directory and return the IDs of the users.
+
+    Every user is made a member of ``memberships`` groups picked at random,
+    with a fixed seed so that runs are comparable.
+
+    """
+    user_api = driver.user
+    group_api = driver.group
+    rand = random.Random(0)
+
+    with user_api.get_connection() as conn:
+        for tree_dn, ou in ((user_api.tree_dn, 'Users'),
+                            (group_api.tree_dn, 'UserGroups')):
+            conn.add_s(tree_dn, [('objectClass', ['organizationalUnit']),
+                                 ('ou', [ou])])
+
+        user_ids = ['user%06d' % i for i in range(users)]
+        for user_id in user_ids:
+            conn.add_s(user_api._id_to_dn_string(user_id), [
+                ('objectClass', [user_api.object_class]),
+                (user_api.id_attr, [user_id]),
+                (user_api.attribute_mapping['name'], [user_id]),
+                (user_api.attribute_mapping['password'], [PASSWORD]),
+                (user_api.attribute_mapping['email'],
+                 ['%s@example.com' % user_id])])
+
+        members = collections.defaultdict(list)
+        group_ids = ['group%06d' % i for i in range(groups)]
+        for user_id in user_ids:
+            for group_id in rand.sample(group_ids,
+                                        min(memberships, len(group_ids))):
+                members[group_id].append(user_api._id_to_dn_string(user_id))
+        for group_id in group_ids:
+            conn.add_s(group_api._id_to_dn_string(group_id), [
+                ('objectClass', [group_api.object_class]),
+                (group_api.id_attr, [group_id]),
+                (group_api.attribute_mapping['name'], [group_id]),
+                (group_api.member_attribute,
+                 members[group_id] or [group_api.dumb_member])])
+    return user_ids
+
+
+def measure(name, func, args):
+    """Time ``func`` and return its stats with directory calls per call."""
+    for _ in range(args.warmup):
+        func()
+    CALLS.clear()
+    stats = core.measure(func, args.iterations, warmup=0)
+    for operation in ('search', 'page', 'bind'):
+        stats[operation] = (float(CALLS[operation]) /
+                            max(args.iterations, 1))
+    return name, stats
+
+
+def print_calls(results):
+    """Print the directory operations sent by each benchmark, per call."""
+    header = '%-40s %10s %10s %10s' % ('benchmark', 'searches', 'pages',
+                                       'binds')
+    print(header)
+    print('-' * len(header))
+    for name, stats in results:
+        print('%-40s %10.1f %10.1f %10.1f' % (
+            name, stats['search'], stats['page'], stats['bind']))
+
+
+def get_parser():
+    parser = core.get_parser(__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000,
+                        help='number of users in the directory')
+    parser.add_argument('--groups', type=int, default=100,
+                        help='number of groups in the directory')
+    parser.add_argument('--memberships', type=int, default=5,
+                        help='number of groups every user is a member of')
+    parser.add_argument('--page-size', type=int, default=100,
+                        help='page size of the paged listing benchmark')
+    parser.add_argument('--config-file', action='append', default=[],
+                        help='keystone configuration file to load, may be '
+                             'repeated')
+    return parser
+
+
+def run(args):
+    """Seed the directory and run the benchmarks, using the loaded config.
+
+    Only the URL and suffix of the ``[ldap]`` group are overridden, to point
+    to the fake directory. With ``[ldap] use_pool``, the directory is
+    reached through the connection pool.
+
+    :returns: a list of ``(name, stats)`` pairs
+
+    """
+    if CONF.ldap.use_pool:
+        CONF.set_override('url', POOL_URL, group='ldap')
+        common_ldap.PooledLDAPHandler.Connector = CountingFakeLdapPool
+    else:
+        CONF.set_override('url', URL, group='ldap')
+        common_ldap.register_handler('fake://', CountingFakeLdap)
+    CONF.set_override('suffix', SUFFIX, group='ldap')
+
+    driver = ldap_identity.Identity()
+    user_ids = seed(driver, args.users, args.groups, args.memberships)
+    print('Seeded %d users and %d groups, %d memberships per user.' % (
+        args.users, args.groups, args.memberships))
+
+    page_size = CONF.ldap.page_size
+    CONF.set_override('page_size', args.page_size, group='ldap')
+    paged_driver = ldap_identity.Identity()
+    CONF.set_override('page_size', page_size, group='ldap')
+
+    users = itertools.cycle(user_ids)
+    return [
+        measure('list_users',
+                lambda: driver.list_users(driver_hints.Hints()), args),
+        measure('list_users[page_size=%d]' % args.page_size,
+                lambda: paged_driver.list_users(driver_hints.Hints()), args),
+        measure('list_groups',
+                lambda: driver.list_groups(driver_hints.Hints()), args),
+        measure('list_groups_for_user',
+                lambda: driver.list_groups_for_user(next(users),
+                                                    driver_hints.Hints()),
+                args),
+        measure('authenticate',
+                lambda: driver.authenticate(next(users), PASSWORD), args),
+    ]
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    keystone.conf.configure()
+    CONF([], project='keystone', default_config_files=args.config_file)
+
+    results = run(args)
+    core.print_results(results)
+    print('')
+    print_calls(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Measure the cost of enforcing every keystone policy.
+
+Each registered policy is enforced against a target referencing the user,
+project and domain of the credentials, first with the rules as parsed by
+oslo.policy and then with the rules compiled by keystone::
+
+    python -m keystone.tests.benchmark.policy --iterations 1000 \\
+        --action identity:get_user --action identity:list_projects
+
+Overrides in the policy file found by ``--config-file``, if any, are loaded
+like they are by the API.
+
+"""
+
+import re
+
+from oslo_policy import policy as common_policy
+
+from keystone.common import policies
+from keystone.common.rbac_enforcer import evaluator
+import keystone.conf
+from keystone.tests.benchmark import core
+
+
+CONF = keystone.conf.CONF
+
+USER_ID = 'user'
+PROJECT_ID = 'project'
+DOMAIN_ID = 'domain'
+
+CREDENTIALS = {
+    'project-member': {'user_id': USER_ID, 'project_id': PROJECT_ID,
+                       'domain_id': None, 'system_scope': None,
+                       'roles': ['member', 'reader']},
+    'system-admin': {'user_id': USER_ID, 'project_id': None,
+                     'domain_id': None, 'system_scope': 'all',
+                     'roles': ['admin', 'member', 'reader']},
+}
+
+
+def build_target():
+    """Return a flattened target with every value policies reference."""
+    target = {}
+    for rule in policies.list_rules():
+        for key in re.findall(r'%\(([^)]+)\)s', rule.check_str):
+            if 'domain' in key:
+                target[key] = DOMAIN_ID
+            elif 'project' in key or 'tenant' in key:
+                target[key] = PROJECT_ID
+            else:
+                target[key] = USER_ID
+    return target
+
+
+def build_enforcer(compiled):
+    enforcer = common_policy.Enforcer(CONF)
+    enforcer.register_defaults(policies.list_rules())
+    enforcer.load_rules()
+    if compiled:
+        evaluator.compile_rules(enforcer)
+    return enforcer
+
+
+def main(argv=None):
+    parser = core.get_parser(__doc__.splitlines()[0])
+    parser.add_argument('--action', action='append', default=[],
+                        help='policy to measure, may be repeated; all of '
+                             'them by default')
+    parser.add_argument('--credentials', choices=sorted(CREDENTIALS),
+                        default='project-member',
+                        help='credentials the policies are enforced with')
+    parser.add_argument('--config-file', action='append', default=[],
+                        help='keystone configuration file to load, may be '
+                             'repeated')
+    args = parser.parse_args(argv)
+
+    keystone.conf.configure()
+    CONF([], project='keystone', default_config_files=args.config_file)
+
+    oslo_enforcer = build_enforcer(compiled=False)
+    compiled_enforcer = build_enforcer(compiled=True)
+    actions = args.action or sorted(
+        rule.name for rule in policies.list_rules())
+    target = build_target()
+    creds = CREDENTIALS[args.credentials]
+
+    def enforce(enforcer, action):
+        return lambda: enforcer.enforce(action, target, dict(creds))
+
+    results = []
+    totals = [0.0, 0.0]
+    header = '%-50s %12s %12s %8s' % ('action', 'oslo us', 'compiled us',
+                                      'speedup')
+    print(header)
+    print('-' * len(header))
+    for action in actions:
+        oslo = core.measure(enforce(oslo_enforcer, action),
+                            args.iterations, warmup=args.warmup)
+        compiled = core.measure(enforce(compiled_enforcer, action),
+                                args.iterations, warmup=args.warmup)
+        totals[0] += oslo['mean']
+        totals[1] += compiled['mean']
+        results.append((action, compiled))
+        print('%-50s %12.1f %12.1f %7.2fx' % (
+            action, oslo['mean'] * 1e6, compiled['mean'] * 1e6,
+            oslo['mean'] / max(compiled['mean'], 1e-9)))
+    print('-' * len(header))
+    print('%-50s %12.1f %12.1f %7.2fx' % (
+        'mean of %d actions' % len(actions),
+        totals[0] * 1e6 / len(actions), totals[1] * 1e6 / len(actions),
+        totals[0] / max(totals[1], 1e-9)))
+
+
+if __name__ == '__main__':
+    main()
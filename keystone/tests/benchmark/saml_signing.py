@@ -0,0 +1,98 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare in-process SAML assertion signing with the xmlsec1 binary.
+
+Signs the same assertion with every available ``[saml] signing_backend`` using
+the example certificate and key shipped in ``examples/pki``::
+
+    python -m keystone.tests.benchmark.saml_signing --iterations 200
+
+"""
+
+import os
+import subprocess  # nosec : only used to look up the xmlsec1 binary
+
+import keystone.conf
+from keystone.federation import idp
+from keystone.tests.benchmark import core
+
+
+CONF = keystone.conf.CONF
+
+ROOTDIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__)))))
+CERTFILE = os.path.join(ROOTDIR, 'examples', 'pki', 'certs',
+                        'signing_cert.pem')
+KEYFILE = os.path.join(ROOTDIR, 'examples', 'pki', 'private',
+                       'signing_key.pem')
+
+ISSUER = 'https://acme.com/FIM/sps/openstack/saml20'
+RECIPIENT = 'http://beta.com/Shibboleth.sso/SAML2/POST'
+
+
+def _build_assertion():
+    generator = idp.SAMLGenerator()
+    expiration_time = generator._determine_expiration_time(None)
+    return generator._create_assertion(
+        generator._create_issuer(ISSUER),
+        generator._create_signature(),
+        generator._create_subject('test_user', expiration_time, RECIPIENT),
+        generator._create_authn_statement(ISSUER, expiration_time),
+        generator._create_attribute_statement(
+            'test_user', 'user_domain', ['admin', 'member'],
+            'development', 'project_domain'))
+
+
+def _is_xmlsec1_installed():
+    try:
+        subprocess.check_output(  # nosec : trusted, configured binary name
+            ['/usr/bin/which', CONF.saml.xmlsec1_binary])
+    except subprocess.CalledProcessError:
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = core.get_parser(__doc__.splitlines()[0])
+    parser.add_argument('--certfile', default=CERTFILE)
+    parser.add_argument('--keyfile', default=KEYFILE)
+    args = parser.parse_args(argv)
+
+    keystone.conf.configure()
+    CONF([], project='keystone', default_config_files=[])
+    CONF.set_override('certfile', args.certfile, group='saml')
+    CONF.set_override('keyfile', args.keyfile, group='saml')
+
+    backends = []
+    if idp.xmlsec and idp.etree:
+        backends.append('inprocess')
+    else:
+        print('Skipping inprocess: the xmlsec Python package is missing.')
+    if _is_xmlsec1_installed():
+        backends.append('xmlsec1')
+    else:
+        print('Skipping xmlsec1: %s is not installed.' %
+              CONF.saml.xmlsec1_binary)
+
+    results = []
+    for backend in backends:
+        CONF.set_override('signing_backend', backend, group='saml')
+        assertion = _build_assertion()
+        stats = core.measure(lambda: idp._sign_assertion(assertion),
+                             args.iterations, warmup=args.warmup)
+        results.append(('sign_assertion[%s]' % backend, stats))
+    core.print_results(results)
+
+
+if __name__ == '__main__':
+    main()
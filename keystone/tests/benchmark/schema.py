@@ -0,0 +1,135 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Measure the cost of validating request bodies against keystone schemas.
+
+Every public schema of the ``schema.py`` modules is validated against a
+body generated from the schema, first with a validator built for each call,
+as ``lazy_validate`` used to do, and then with the cached validator::
+
+    python -m keystone.tests.benchmark.schema --iterations 1000 \\
+        --schema identity.user_create --list-size 100
+
+Bodies that do not satisfy the schema, for instance because a pattern could
+not be honoured by the generator, are flagged in the ``valid`` column; they
+are still measured since rejecting a body costs validation time too.
+
+"""
+
+import importlib
+
+from keystone.common.validation import validators
+from keystone import exception
+from keystone.tests.benchmark import core
+
+
+SCHEMA_MODULES = [
+    'application_credential', 'assignment', 'auth', 'catalog', 'credential',
+    'federation', 'identity', 'limit', 'oauth1', 'policy', 'resource',
+    'trust',
+]
+
+
+def list_schemas():
+    """Return ``(name, schema)`` pairs for every public request schema."""
+    schemas = []
+    for package in SCHEMA_MODULES:
+        module = importlib.import_module('keystone.%s.schema' % package)
+        for attr in sorted(vars(module)):
+            value = getattr(module, attr)
+            if (not attr.startswith('_') and isinstance(value, dict) and
+                    value.get('type') == 'object'):
+                schemas.append(('%s.%s' % (package, attr), value))
+    return schemas
+
+
+def build_body(schema, list_size):
+    """Return a value that tries to satisfy ``schema``."""
+    if 'enum' in schema:
+        return [value for value in schema['enum'] if value is not None][0]
+    schema_type = schema.get('type', 'string')
+    if isinstance(schema_type, list):
+        schema_type = [t for t in schema_type if t != 'null'][0]
+    if schema_type == 'object':
+        return dict(
+            (key, build_body(prop, list_size))
+            for key, prop in schema.get('properties', {}).items())
+    if schema_type == 'array':
+        items = schema.get('items', {})
+        size = list_size if items else 0
+        if schema.get('maxItems') is not None:
+            size = min(size, schema['maxItems'])
+        return [build_body(items, list_size) for _ in range(size)]
+    if schema_type == 'boolean':
+        return True
+    if schema_type in ('integer', 'number'):
+        return schema.get('minimum', 1)
+    if schema.get('format') == 'uri':
+        return 'https://keystone.example.com/v3'
+    return 'x' * max(schema.get('minLength', 1), 1)
+
+
+def main(argv=None):
+    parser = core.get_parser(__doc__.splitlines()[0])
+    parser.add_argument('--schema', action='append', default=[],
+                        help='schema to measure, as package.name, may be '
+                             'repeated; all of them by default')
+    parser.add_argument('--list-size', type=int, default=10,
+                        help='number of items generated for array '
+                             'properties, such as role lists')
+    args = parser.parse_args(argv)
+
+    schemas = [(name, schema) for name, schema in list_schemas()
+               if not args.schema or name in args.schema]
+
+    def validate(get_validator, schema, body):
+        def func():
+            try:
+                get_validator(schema).validate(body)
+            except exception.SchemaValidationError:
+                pass
+        return func
+
+    totals = [0.0, 0.0]
+    header = '%-45s %6s %12s %12s %8s' % ('schema', 'valid', 'uncached us',
+                                          'cached us', 'speedup')
+    print(header)
+    print('-' * len(header))
+    for name, schema in schemas:
+        body = build_body(schema, args.list_size)
+        try:
+            validators.get_validator(schema).validate(body)
+            valid = 'yes'
+        except exception.SchemaValidationError:
+            valid = 'no'
+        uncached = core.measure(
+            validate(validators.SchemaValidator, schema, body),
+            args.iterations, warmup=args.warmup)
+        cached = core.measure(
+            validate(validators.get_validator, schema, body),
+            args.iterations, warmup=args.warmup)
+        totals[0] += uncached['mean']
+        totals[1] += cached['mean']
+        print('%-45s %6s %12.1f %12.1f %7.2fx' % (
+            name, valid, uncached['mean'] * 1e6, cached['mean'] * 1e6,
+            uncached['mean'] / max(cached['mean'], 1e-9)))
+    if not schemas:
+        return
+    print('-' * len(header))
+    print('%-45s %6s %12.1f %12.1f %7.2fx' % (
+        'mean of %d schemas' % len(schemas), '',
+        totals[0] * 1e6 / len(schemas), totals[1] * 1e6 / len(schemas),
+        totals[0] / max(totals[1], 1e-9)))
+
+
+if __name__ == '__main__':
+    main()
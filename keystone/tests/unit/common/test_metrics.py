@@ -0,0 +1,102 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import uuid
+
+from keystone.common import metrics
+from keystone.tests import unit
+
+
+class MetricsTestCase(unit.BaseTestCase):
+
+    def test_counter(self):
+        counter = metrics.Counter('test_total', 'Test counter.', ('kind',))
+        counter.inc(kind='a')
+        counter.inc(2, kind='a')
+        counter.inc(kind='b')
+        self.assertEqual(3, counter.value(kind='a'))
+        self.assertEqual(0, counter.value(kind='c'))
+        self.assertEqual([('test_total', {'kind': 'a'}, 3),
+                          ('test_total', {'kind': 'b'}, 1)],
+                         counter.samples())
+
+    def test_labels_must_match(self):
+        counter = metrics.Counter('test_total', 'Test counter.', ('kind',))
+        self.assertRaises(ValueError, counter.inc)
+        self.assertRaises(ValueError, counter.inc, kind='a', other='b')
+
+    def test_gauge(self):
+        gauge = metrics.Gauge('test_gauge', 'Test gauge.')
+        gauge.set(5)
+        gauge.dec(2)
+        self.assertEqual(3, gauge.value())
+
+    def test_gauge_callback(self):
+        gauge = metrics.Gauge(
+            'test_gauge', 'Test gauge.', ('pool',),
+            callback=lambda: [({'pool': 'a'}, 1), ({'pool': 'b'}, 2)])
+        self.assertEqual(2, gauge.value(pool='b'))
+        self.assertEqual([('test_gauge', {'pool': 'a'}, 1),
+                          ('test_gauge', {'pool': 'b'}, 2)],
+                         gauge.samples())
+
+    def test_histogram(self):
+        histogram = metrics.Histogram('test_seconds', 'Test histogram.',
+                                      buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        self.assertEqual(4, histogram.count())
+        self.assertEqual(
+            [('test_seconds_bucket', {'le': '0.1'}, 2),
+             ('test_seconds_bucket', {'le': '1.0'}, 3),
+             ('test_seconds_bucket', {'le': '+Inf'}, 4),
+             ('test_seconds_sum', {}, 5.65),
+             ('test_seconds_count', {}, 4)],
+            histogram.samples())
+
+    def test_histogram_time(self):
+        histogram = metrics.Histogram('test_seconds', 'Test histogram.')
+        with histogram.time():
+            pass
+        self.assertEqual(1, histogram.count())
+
+    def test_register_returns_existing_metric(self):
+        registry = metrics.Registry()
+        name = uuid.uuid4().hex
+        counter = registry.register(metrics.Counter(name, 'Test.'))
+        self.assertIs(counter,
+                      registry.register(metrics.Counter(name, 'Test.')))
+        self.assertRaises(ValueError, registry.register,
+                          metrics.Gauge(name, 'Test.'))
+        self.assertEqual([counter], registry.collect())
+
+    def test_render(self):
+        registry = metrics.Registry()
+        counter = registry.register(metrics.Counter(
+            'test_total', 'Test\ncounter.', ('kind',)))
+        counter.inc(kind='a "b"')
+        histogram = registry.register(metrics.Histogram(
+            'test_seconds', 'Test histogram.', buckets=(0.1,)))
+        histogram.observe(0.5)
+        self.assertEqual(
+            '# HELP test_seconds Test histogram.\n'
+            '# TYPE test_seconds histogram\n'
+            'test_seconds_bucket{le="0.1"} 0\n'
+            'test_seconds_bucket{le="+Inf"} 1\n'
+            'test_seconds_sum 0.5\n'
+            'test_seconds_count 1\n'
+            '# HELP test_total Test\\ncounter.\n'
+            '# TYPE test_total counter\n'
+            'test_total{kind="a \\"b\\""} 1\n',
+            metrics.render(registry))
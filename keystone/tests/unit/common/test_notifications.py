@@ -13,6 +13,8 @@
 #   under the License.
 
 import datetime
+import threading
+import time
 import uuid
 
 import fixtures
@@ -235,6 +237,138 @@ class NotificationsTestCase(unit.BaseTestCase):
                                                    event_type)
             mocked.assert_not_called()
 
+    def test_notification_enabled_follows_opt_out(self):
+        event_type = 'identity.%s.created' % EXP_RESOURCE_TYPE
+        self.assertTrue(notifications._notification_enabled(event_type))
+
+        # NOTE: The decision is kept per event type, so changing the
+        # opt-out list must invalidate it.
+        conf = self.useFixture(config_fixture.Config(CONF))
+        conf.config(notification_opt_out=[event_type])
+        self.assertFalse(notifications._notification_enabled(event_type))
+
+    def test_notification_enabled_for_authenticate_outcome(self):
+        conf = self.useFixture(config_fixture.Config(CONF))
+        conf.config(notification_opt_out=['identity.authenticate.success'])
+        self.assertFalse(notifications._notification_enabled(
+            'identity.authenticate', 'success'))
+        self.assertTrue(notifications._notification_enabled(
+            'identity.authenticate', 'failure'))
+
+    def test_opted_out_authenticate_event_is_not_built(self):
+        conf = self.useFixture(config_fixture.Config(CONF))
+        conf.config(notification_opt_out=['identity.authenticate.success'])
+
+        @notifications.emit_event('authenticate')
+        def authenticate(self, user_id):
+            return user_id
+
+        user_id = uuid.uuid4().hex
+        with mock.patch.object(notifications,
+                               'build_audit_initiator') as build:
+            with mock.patch.object(notifications,
+                                   '_send_audit_notification') as send:
+                self.assertEqual(user_id, authenticate(self, user_id))
+        build.assert_not_called()
+        send.assert_not_called()
+
+
+class AsyncNotifierTestCase(unit.BaseTestCase):
+
+    def _build_notifier(self, queue_size=10, batch_size=10,
+                        overflow_policy='drop_newest'):
+        self.sent = []
+        self.release = threading.Event()
+
+        class FakeNotifier(object):
+            def info(notifier, context, event_type, payload):
+                self.release.wait(5)
+                if payload.get('fail'):
+                    raise ArbitraryException()
+                self.sent.append(event_type)
+
+        notifier = notifications._AsyncNotifier(
+            FakeNotifier(), queue_size, batch_size, overflow_policy)
+        self.addCleanup(self.release.set)
+        self.addCleanup(notifier.stop, 5)
+        return notifier
+
+    def _wait_for_empty_queue(self, notifier):
+        deadline = time.time() + 5
+        while notifier.queue_depth and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(0, notifier.queue_depth)
+
+    def test_notifications_sent_in_order(self):
+        notifier = self._build_notifier(batch_size=2)
+        self.release.set()
+        for i in range(5):
+            notifier.info({}, 'event.%d' % i, {})
+        self.assertTrue(notifier.flush(5))
+        self.assertEqual(['event.%d' % i for i in range(5)], self.sent)
+
+    def test_failed_send_does_not_stop_the_thread(self):
+        notifier = self._build_notifier()
+        self.release.set()
+        notifier.info({}, 'event.failed', {'fail': True})
+        notifier.info({}, 'event.sent', {})
+        self.assertTrue(notifier.flush(5))
+        self.assertEqual(['event.sent'], self.sent)
+
+    def test_flush_times_out(self):
+        notifier = self._build_notifier()
+        notifier.info({}, 'event.blocked', {})
+        self.assertFalse(notifier.flush(0.01))
+
+    def _overflow(self, overflow_policy):
+        notifier = self._build_notifier(queue_size=1, batch_size=1,
+                                        overflow_policy=overflow_policy)
+        dropped = notifications.NOTIFICATIONS_DROPPED.value()
+        # The first notification is being sent, the second one fills the
+        # queue.
+        notifier.info({}, 'event.1', {})
+        self._wait_for_empty_queue(notifier)
+        notifier.info({}, 'event.2', {})
+        notifier.info({}, 'event.3', {})
+        self.assertEqual(dropped + 1,
+                         notifications.NOTIFICATIONS_DROPPED.value())
+        self.release.set()
+        self.assertTrue(notifier.flush(5))
+        return self.sent
+
+    def test_overflow_drops_newest(self):
+        self.assertEqual(['event.1', 'event.2'],
+                         self._overflow('drop_newest'))
+
+    def test_overflow_drops_oldest(self):
+        self.assertEqual(['event.1', 'event.3'],
+                         self._overflow('drop_oldest'))
+
+    def test_get_notifier_is_async_when_configured(self):
+        conf = self.useFixture(config_fixture.Config(CONF))
+        conf.config(notification_async=True)
+        notifications.reset_notifier()
+        self.addCleanup(notifications.reset_notifier)
+        self.assertIsInstance(notifications._get_notifier(),
+                              notifications._AsyncNotifier)
+
+    def _get_notifier_under_uwsgi(self, **opt):
+        conf = self.useFixture(config_fixture.Config(CONF))
+        conf.config(notification_async=True)
+        notifications.reset_notifier()
+        self.addCleanup(notifications.reset_notifier)
+        uwsgi = mock.Mock(opt=opt)
+        with mock.patch.dict('sys.modules', uwsgi=uwsgi):
+            return notifications._get_notifier()
+
+    def test_get_notifier_is_sync_under_uwsgi_without_threads(self):
+        self.assertIsInstance(self._get_notifier_under_uwsgi(),
+                              notifications._TimedNotifier)
+
+    def test_get_notifier_is_async_under_uwsgi_with_threads(self):
+        notifier = self._get_notifier_under_uwsgi(**{'enable-threads': True})
+        self.assertIsInstance(notifier, notifications._AsyncNotifier)
+
 
 class BaseNotificationTest(test_v3.RestfulTestCase):
 
@@ -262,6 +396,13 @@ class BaseNotificationTest(test_v3.RestfulTestCase):
         self.useFixture(fixtures.MockPatchObject(
             notifications, '_send_notification', fake_notify))
 
+        # NOTE: Events are only built if they are going to be sent, which
+        # the fakes stand in for regardless of the notifier and the opt-out
+        # configuration.
+        self.useFixture(fixtures.MockPatchObject(
+            notifications, '_notification_enabled',
+            lambda *args, **kwargs: True))
+
         def fake_audit(action, initiator, outcome, target,
                        event_type, reason=None, **kwargs):
             service_security = cadftaxonomy.SERVICE_SECURITY
@@ -1089,6 +1230,102 @@ class TestEventCallbacks(test_v3.RestfulTestCase):
         self.assertRaises(TypeError, PROVIDERS.resource_api.create_project,
                           project_ref['id'], project_ref)
 
+    def test_coalesced_callback_outside_scope(self):
+        payloads = []
+
+        @notifications.coalesced_callback
+        def callback(service, resource_type, operation, payload):
+            payloads.append(payload)
+
+        notifications.register_event_callback(DELETED_OPERATION, 'project',
+                                              callback)
+        project_id = uuid.uuid4().hex
+        notifications.notify_event_callbacks(
+            'identity', 'project', DELETED_OPERATION,
+            {'resource_info': project_id})
+        self.assertEqual([[{'resource_info': project_id}]], payloads)
+
+    def test_coalesced_callback_runs_once_per_scope(self):
+        coalesced = []
+        immediate = []
+
+        @notifications.coalesced_callback
+        def coalesced_callback(service, resource_type, operation, payload):
+            coalesced.append((resource_type, payload))
+
+        def callback(service, resource_type, operation, payload):
+            immediate.append(payload)
+
+        for resource_type in ('project', 'user'):
+            notifications.register_event_callback(
+                DELETED_OPERATION, resource_type,
+                [coalesced_callback, callback])
+
+        project_ids = [uuid.uuid4().hex for _ in range(3)]
+        user_id = uuid.uuid4().hex
+        with notifications.callback_scope():
+            with notifications.callback_scope():
+                for project_id in project_ids:
+                    notifications.notify_event_callbacks(
+                        'identity', 'project', DELETED_OPERATION,
+                        {'resource_info': project_id})
+            notifications.notify_event_callbacks(
+                'identity', 'user', DELETED_OPERATION,
+                {'resource_info': user_id})
+            # Callbacks that are not coalesced are not deferred, and the
+            # inner scope is part of the outer one.
+            self.assertEqual(4, len(immediate))
+            self.assertEqual([], coalesced)
+
+        self.assertEqual(
+            [('project', [{'resource_info': p} for p in project_ids]),
+             ('user', [{'resource_info': user_id}])],
+            coalesced)
+
+    def test_coalesced_callbacks_run_when_scope_raises(self):
+        payloads = []
+
+        @notifications.coalesced_callback
+        def callback(service, resource_type, operation, payload):
+            payloads.append(payload)
+
+        notifications.register_event_callback(DELETED_OPERATION, 'project',
+                                              callback)
+
+        def delete():
+            with notifications.callback_scope():
+                notifications.notify_event_callbacks(
+                    'identity', 'project', DELETED_OPERATION,
+                    {'resource_info': uuid.uuid4().hex})
+                raise ArbitraryException()
+
+        self.assertRaises(ArbitraryException, delete)
+        self.assertEqual(1, len(payloads))
+
+    def test_cascade_delete_coalesces_callbacks(self):
+        payloads = []
+
+        @notifications.coalesced_callback
+        def callback(service, resource_type, operation, payload):
+            payloads.append(payload)
+
+        notifications.register_event_callback(DELETED_OPERATION, 'project',
+                                              callback)
+        root = unit.new_project_ref(domain_id=self.domain_id, enabled=False)
+        PROVIDERS.resource_api.create_project(root['id'], root)
+        project_ids = set([root['id']])
+        for _ in range(2):
+            child = unit.new_project_ref(domain_id=self.domain_id,
+                                         parent_id=root['id'], enabled=False)
+            PROVIDERS.resource_api.create_project(child['id'], child)
+            project_ids.add(child['id'])
+
+        PROVIDERS.resource_api.delete_project(root['id'], cascade=True)
+
+        self.assertEqual(1, len(payloads))
+        self.assertEqual(project_ids,
+                         set(p['resource_info'] for p in payloads[0]))
+
 
 class CadfNotificationsWrapperTestCase(test_v3.RestfulTestCase):
 
@@ -1126,6 +1363,9 @@ class CadfNotificationsWrapperTestCase(test_v3.RestfulTestCase):
 
         self.useFixture(fixtures.MockPatchObject(
             notifications, '_send_audit_notification', fake_notify))
+        self.useFixture(fixtures.MockPatchObject(
+            notifications, '_notification_enabled',
+            lambda *args, **kwargs: True))
 
     def _get_last_note(self):
         self.assertTrue(self._notifications)
@@ -81,3 +81,29 @@ class TestProviderAPIRegistry(unit.BaseTestCase):
                                               second_manager._provides_api))
         self.assertIs(manager, getattr(second_manager,
                                        manager._provides_api))
+
+    def test_deferred_provider_built_on_first_lookup(self):
+        api_name = '%s_api' % uuid.uuid4().hex
+        built = []
+
+        def loader():
+            built.append(True)
+            return self._create_manager_instance(provides_api=api_name)
+
+        provider_api.ProviderAPIs._register_deferred_provider_api(
+            api_name, loader)
+        provider_api.ProviderAPIs.lock_provider_registry()
+        self.assertEqual([], built)
+
+        test_manager = getattr(provider_api.ProviderAPIs, api_name)
+        self.assertEqual(api_name, test_manager.do_something())
+        self.assertIs(test_manager,
+                      getattr(provider_api.ProviderAPIs, api_name))
+        self.assertEqual([True], built)
+
+    def test_deferred_provider_duplicate(self):
+        test_manager = self._create_manager_instance()
+        self.assertRaises(
+            provider_api.DuplicateProviderError,
+            provider_api.ProviderAPIs._register_deferred_provider_api,
+            test_manager._provides_api, lambda: None)
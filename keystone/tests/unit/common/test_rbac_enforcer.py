@@ -697,3 +697,73 @@ class TestRBACEnforcerRest(_TestRBACEnforcerBase):
                 getattr(flask.g,
                         rbac_enforcer.enforcer._ENFORCEMENT_CHECK_ATTR),
                 True)
+
+    def test_enforce_call_reuses_decisions_within_request(self):
+        token_path = '/v3/auth/tokens'
+        auth_json = self._auth_json()
+        with self.test_client() as c:
+            r = c.post(token_path, json=auth_json, expected_status_code=201)
+            token_id = r.headers.get('X-Subject-Token')
+            c.get('%s/argument/%s' % (
+                self.restful_api_url_prefix, uuid.uuid4().hex),
+                headers={'X-Auth-Token': token_id})
+            enforce = self.enforcer._enforcer.enforce
+            with mock.patch.object(self.enforcer._enforcer, 'enforce',
+                                   side_effect=enforce) as mock_method:
+                for _ in range(2):
+                    self.enforcer.enforce_call(action='example:allowed')
+                    self.assertRaises(exception.ForbiddenAction,
+                                      self.enforcer.enforce_call,
+                                      action='example:denied')
+                self.assertEqual(2, mock_method.call_count)
+
+                # A different target is evaluated again.
+                self.enforcer.enforce_call(
+                    action='example:allowed',
+                    target_attr={'myuser': {'id': uuid.uuid4().hex}})
+                self.assertEqual(3, mock_method.call_count)
+
+            # Decisions are not reused by the next request.
+            c.get('%s/argument/%s' % (
+                self.restful_api_url_prefix, uuid.uuid4().hex),
+                headers={'X-Auth-Token': token_id})
+            with mock.patch.object(self.enforcer._enforcer, 'enforce',
+                                   side_effect=enforce) as mock_method:
+                self.enforcer.enforce_call(action='example:allowed')
+                mock_method.assert_called_once()
+
+    def test_enforce_call_reuses_target_independent_decisions(self):
+        self.config_fixture.config(group='policy', decision_cache_time=60)
+        token_path = '/v3/auth/tokens'
+        auth_json = self._auth_json()
+        with self.test_client() as c:
+            r = c.post(token_path, json=auth_json, expected_status_code=201)
+            token_id = r.headers.get('X-Subject-Token')
+            target = {'myuser': {'id': self.user_req_admin['id']}}
+            for _ in range(2):
+                c.get('%s/argument/%s' % (
+                    self.restful_api_url_prefix, uuid.uuid4().hex),
+                    headers={'X-Auth-Token': token_id})
+                self.enforcer.enforce_call(action='example:allowed')
+                self.assertRaises(exception.ForbiddenAction,
+                                  self.enforcer.enforce_call,
+                                  action='example:denied')
+                self.enforcer.enforce_call(action='example:target',
+                                           target_attr=target)
+
+            c.get('%s/argument/%s' % (
+                self.restful_api_url_prefix, uuid.uuid4().hex),
+                headers={'X-Auth-Token': token_id})
+            enforce = self.enforcer._enforcer.enforce
+            with mock.patch.object(self.enforcer._enforcer, 'enforce',
+                                   side_effect=enforce) as mock_method:
+                self.enforcer.enforce_call(action='example:allowed')
+                self.assertRaises(exception.ForbiddenAction,
+                                  self.enforcer.enforce_call,
+                                  action='example:denied')
+                mock_method.assert_not_called()
+
+                # Rules checking the target are always evaluated.
+                self.enforcer.enforce_call(action='example:target',
+                                           target_attr=target)
+                mock_method.assert_called_once()
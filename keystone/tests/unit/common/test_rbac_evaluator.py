@@ -0,0 +1,158 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import re
+
+import mock
+from oslo_policy import _checks
+from oslo_policy import _parser
+from oslo_policy import policy
+
+from keystone.common import policies
+from keystone.common import rbac_enforcer
+from keystone.common.rbac_enforcer import evaluator
+from keystone.tests import unit
+
+
+class _Enforcer(object):
+
+    def __init__(self, rules):
+        self.rules = rules
+
+
+class _CustomCheck(_checks.Check):
+
+    def __call__(self, target, creds, enforcer, current_rule=None):
+        return self.match == creds.get('custom')
+
+
+class EvaluatorTestCase(unit.BaseTestCase):
+
+    def _assert_same_result(self, rule, target, creds, rules=None):
+        enforcer = _Enforcer(rules or {})
+        expected = _checks._check(rule, target, creds, enforcer, None)
+        compiled = evaluator.compile_check(rule)
+        self.assertEqual(bool(expected),
+                         compiled(target, creds, enforcer, None))
+        return expected
+
+    def test_keystone_policies_match_oslo_policy(self):
+        rules = dict((r.name, _parser.parse_rule(r.check_str))
+                     for r in policies.list_rules())
+        keys = set()
+        for r in policies.list_rules():
+            keys.update(re.findall(r'%\(([^)]+)\)s', r.check_str))
+        targets = [{}, dict((k, 'user') for k in keys),
+                   dict((k, 'project') for k in keys)]
+        credentials = []
+        for roles in ([], ['admin'], ['Member', 'reader']):
+            for system_scope in (None, 'all'):
+                credentials.append({'roles': roles,
+                                    'system_scope': system_scope,
+                                    'user_id': 'user',
+                                    'project_id': 'project',
+                                    'domain_id': None})
+
+        compiled = dict((name, evaluator.compile_check(rule))
+                        for name, rule in rules.items())
+        for name in rules:
+            for target in targets:
+                for creds in credentials:
+                    expected = _checks._check(rules[name], target, creds,
+                                              _Enforcer(rules), name)
+                    self.assertEqual(
+                        bool(expected),
+                        compiled[name](target, creds, _Enforcer(compiled),
+                                       name),
+                        '%s: %s' % (name, rules[name]))
+
+    def test_role_check(self):
+        for check_str in ('role:admin', 'role:Admin',
+                          'role:admin or role:reader or user_id:user',
+                          'role:%(target.role.name)s'):
+            rule = _parser.parse_rule(check_str)
+            for roles in ([], ['ADMIN'], ['reader'], ['member']):
+                for target in ({}, {'target.role.name': 'admin'}):
+                    self._assert_same_result(
+                        rule, target, {'roles': roles, 'user_id': 'other'})
+        self._assert_same_result(_parser.parse_rule('role:admin'), {}, {})
+
+    def test_generic_check(self):
+        for check_str in ('user_id:%(target.user.id)s',
+                          'user_id:user',
+                          'token.user.id:%(user_id)s',
+                          'groups:%(group_id)s',
+                          'True:%(enabled)s',
+                          '"member":%(role)s'):
+            rule = _parser.parse_rule(check_str)
+            for target in ({}, {'target.user.id': 'user', 'user_id': 'user',
+                                'group_id': 'group', 'enabled': True,
+                                'role': 'member'}):
+                for creds in ({}, {'user_id': 'user',
+                                   'token': {'user': {'id': 'user'}},
+                                   'groups': ['other', 'group']}):
+                    self._assert_same_result(rule, target, creds)
+
+    def test_target_value_is_formatted(self):
+        rule = _parser.parse_rule('project_id:%(target.project.id)s')
+        self.assertTrue(self._assert_same_result(
+            rule, {'target.project.id': 1}, {'project_id': '1'}))
+
+    def test_rule_check(self):
+        rules = {'admin': _parser.parse_rule('role:admin'),
+                 'owner': evaluator.compile_check(
+                     _parser.parse_rule('user_id:%(user_id)s'))}
+        rule = _parser.parse_rule('rule:admin or rule:owner or rule:missing')
+        for creds in ({'roles': ['admin']}, {'user_id': 'user'}, {}):
+            self._assert_same_result(rule, {'user_id': 'user'}, creds,
+                                     rules=rules)
+
+    def test_other_checks_are_left_to_oslo_policy(self):
+        custom = _CustomCheck('custom', 'value')
+        rule = _checks.AndCheck([_parser.parse_rule('role:admin'), custom])
+        with mock.patch.object(_CustomCheck, '__call__',
+                               autospec=True,
+                               side_effect=_CustomCheck.__call__) as call:
+            self.assertTrue(self._assert_same_result(
+                rule, {}, {'roles': ['admin'], 'custom': 'value'}))
+            self.assertFalse(self._assert_same_result(
+                rule, {}, {'roles': ['admin']}))
+        self.assertEqual(4, call.call_count)
+
+    def test_compiled_check_renders_as_source(self):
+        rule = _parser.parse_rule('role:admin and user_id:%(user_id)s')
+        self.assertEqual(str(rule), str(evaluator.compile_check(rule)))
+
+
+class EnforcerCompiledRulesTestCase(unit.TestCase):
+
+    def test_rules_are_compiled(self):
+        enforcer = rbac_enforcer.enforcer.RBACEnforcer()
+        enforcer._reset()
+        rules = enforcer._enforcer.rules
+        self.assertNotEqual(0, len(rules))
+        for rule in rules.values():
+            self.assertIsInstance(rule, evaluator.CompiledCheck)
+
+    def test_reloaded_rules_are_compiled(self):
+        enforcer = rbac_enforcer.enforcer.RBACEnforcer()
+        enforcer._reset()
+        action = 'identity:get_user'
+        enforcer._enforcer.set_rules(
+            policy.Rules.from_dict({action: 'user_id:%(user_id)s'}),
+            overwrite=False)
+        self.assertNotIsInstance(enforcer._enforcer.rules[action],
+                                 evaluator.CompiledCheck)
+        self.assertTrue(enforcer._enforce(
+            {'user_id': 'user'}, action, {'user_id': 'user'}))
+        self.assertIsInstance(enforcer._enforcer.rules[action],
+                              evaluator.CompiledCheck)
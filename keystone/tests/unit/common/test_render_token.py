@@ -0,0 +1,80 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import mock
+
+from keystone.common import provider_api
+from keystone.common import render_token
+from keystone.models import token_model
+from keystone.tests import unit
+from keystone.tests.unit import default_fixtures
+from keystone.tests.unit.ksfixtures import database
+
+PROVIDERS = provider_api.ProviderAPIs
+
+
+class TokenViewTestCase(unit.TestCase):
+
+    def setUp(self):
+        super(TokenViewTestCase, self).setUp()
+        self.useFixture(database.Database())
+        self.load_backends()
+        self.load_fixtures(default_fixtures)
+
+        PROVIDERS.assignment_api.add_role_to_user_and_project(
+            self.user_foo['id'], self.project_bar['id'], self.role_member['id']
+        )
+        self.token = token_model.TokenModel()
+        self.token.user_id = self.user_foo['id']
+        self.token.project_id = self.project_bar['id']
+        self.token.methods = ['password']
+        self.token.audit_id = 'TP4xiW_bRmWiOvlQdWyjmQ'
+        self.token.expires_at = '2038-01-19T03:14:07.000000Z'
+        self.token.issued_at = '2018-01-19T03:14:07.000000Z'
+
+    def test_lazy_view_matches_rendered_token(self):
+        token_reference = render_token.render_token_response_from_model(
+            self.token
+        )
+        lazy_reference = render_token.render_token_response_from_model(
+            self.token, lazy=True
+        )
+        self.assertIsInstance(lazy_reference['token'],
+                              render_token.TokenView)
+        self.assertEqual(token_reference['token'],
+                         dict(lazy_reference['token']))
+
+    def test_attributes_are_computed_when_read(self):
+        token_view = render_token.TokenView(self.token)
+        with mock.patch.object(PROVIDERS.catalog_api,
+                               'get_v3_catalog') as catalog_mock:
+            self.assertEqual([], token_view.materialized)
+            self.assertIn(self.role_member['id'],
+                          [role['id'] for role in token_view['roles']])
+            self.assertEqual(self.project_bar['id'],
+                             token_view['project']['id'])
+            token_view['roles']
+            self.assertFalse(catalog_mock.called)
+        self.assertEqual(['roles', 'project'], token_view.materialized)
+
+        self.assertIn('catalog', token_view)
+        self.assertNotIn('system', token_view)
+        self.assertRaises(KeyError, token_view.__getitem__, 'system')
+        self.assertIsNone(token_view.get('domain'))
+
+    def test_materialized_attributes_are_counted(self):
+        counter = render_token.MATERIALIZED_ATTRIBUTES
+        before = counter.value(attribute='roles')
+        token_view = render_token.TokenView(self.token)
+        token_view['roles']
+        token_view['roles']
+        self.assertEqual(before + 1, counter.value(attribute='roles'))
@@ -181,6 +181,14 @@ class UtilsTestCase(unit.BaseTestCase):
         self.assertFalse(common_utils.auth_str_equal('aaaaa', 'a'))
         self.assertFalse(common_utils.auth_str_equal('ABC123', 'abc123'))
 
+    def test_percentile(self):
+        samples = [1, 2, 3, 4, 5]
+        self.assertEqual(1, common_utils.percentile(samples, 0))
+        self.assertEqual(3, common_utils.percentile(samples, 50))
+        self.assertEqual(5, common_utils.percentile(samples, 99))
+        self.assertEqual(5, common_utils.percentile(samples, 100))
+        self.assertEqual(0.0, common_utils.percentile([], 50))
+
     def test_url_safe_check(self):
         base_str = 'i am safe'
         self.assertFalse(common_utils.is_not_url_safe(base_str))
@@ -10,17 +10,25 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
+import json
 import uuid
 
+import fixtures
+import freezegun
+import mock
 from six.moves import range
 
 from keystone.common import provider_api
+import keystone.conf
+from keystone import exception
 from keystone.credential.providers import fernet as credential_provider
 from keystone.tests import unit
 from keystone.tests.unit import default_fixtures
 from keystone.tests.unit import ksfixtures
 from keystone.tests.unit.ksfixtures import database
 
+CONF = keystone.conf.CONF
 PROVIDERS = provider_api.ProviderAPIs
 
 
@@ -90,3 +98,163 @@ class SqlCredential(SqlTests):
     def test_backend_credential_sql_no_hints(self):
         credentials = PROVIDERS.credential_api.list_credentials()
         self._validate_credential_list(credentials, self.user_credentials)
+
+    def test_list_credentials_without_decryption(self):
+        credential_api = PROVIDERS.credential_api
+        provider = PROVIDERS.credential_provider_api
+        with mock.patch.object(provider, 'decrypt_many',
+                               wraps=provider.decrypt_many) as decrypt_many:
+            credentials = credential_api.list_credentials(decrypt=False)
+            self._validate_credential_list(credentials,
+                                           self.user_credentials)
+            self.assertFalse(decrypt_many.called)
+            for credential in credentials:
+                self.assertNotIn('blob', credential)
+                self.assertIn('encrypted_blob', credential)
+
+            credentials = credential_api.decrypt_credentials(credentials[:2])
+            self.assertEqual(1, decrypt_many.call_count)
+
+        expected = {c['id']: c['blob'] for c in self.user_credentials}
+        self.assertEqual(2, len(credentials))
+        for credential in credentials:
+            self.assertEqual(expected[credential['id']], credential['blob'])
+            self.assertNotIn('encrypted_blob', credential)
+            self.assertNotIn('key_hash', credential)
+
+    def _create_totp_credential(self, user_id):
+        credential = unit.new_totp_credential(user_id=user_id)
+        PROVIDERS.credential_api.create_credential(
+            credential['id'], credential
+        )
+        return credential
+
+    def test_list_totp_secrets_for_user_is_cached(self):
+        self.config_fixture.config(group='totp', secret_cache_time=30)
+        credential = self._create_totp_credential(self.user_foo['id'])
+        credential_api = PROVIDERS.credential_api
+        expected = [(credential['id'], credential['blob'])]
+        list_credentials = self.useFixture(fixtures.MockPatchObject(
+            credential_api, 'list_credentials_for_user',
+            wraps=credential_api.list_credentials_for_user)).mock
+
+        with freezegun.freeze_time() as frozen_time:
+            self.assertEqual(
+                expected,
+                credential_api.list_totp_secrets_for_user(
+                    self.user_foo['id']))
+            self.assertEqual(
+                expected,
+                credential_api.list_totp_secrets_for_user(
+                    self.user_foo['id']))
+            self.assertEqual(1, list_credentials.call_count)
+
+            frozen_time.tick(datetime.timedelta(
+                seconds=CONF.totp.secret_cache_time + 1))
+            credential_api.list_totp_secrets_for_user(self.user_foo['id'])
+            self.assertEqual(2, list_credentials.call_count)
+
+    def test_list_totp_secrets_for_user_cache_disabled_by_default(self):
+        self._create_totp_credential(self.user_foo['id'])
+        credential_api = PROVIDERS.credential_api
+        with mock.patch.object(credential_api, 'list_credentials_for_user',
+                               wraps=credential_api.list_credentials_for_user
+                               ) as list_credentials:
+            credential_api.list_totp_secrets_for_user(self.user_foo['id'])
+            credential_api.list_totp_secrets_for_user(self.user_foo['id'])
+            self.assertEqual(2, list_credentials.call_count)
+
+    def test_list_totp_secrets_for_user_invalidated_on_change(self):
+        self.config_fixture.config(group='totp', secret_cache_time=30)
+        credential_api = PROVIDERS.credential_api
+        user_id = self.user_foo['id']
+        credential = self._create_totp_credential(user_id)
+        credential_api.list_totp_secrets_for_user(user_id)
+
+        new_credential = self._create_totp_credential(user_id)
+        self.assertEqual(
+            {credential['id'], new_credential['id']},
+            {c_id for c_id, dummy in
+             credential_api.list_totp_secrets_for_user(user_id)})
+
+        credential_api.update_credential(credential['id'],
+                                         {'blob': 'ABCDEFGHIJKLMNOP'})
+        self.assertIn((credential['id'], 'ABCDEFGHIJKLMNOP'),
+                      credential_api.list_totp_secrets_for_user(user_id))
+
+        credential_api.delete_credential(credential['id'])
+        self.assertEqual(
+            [new_credential['id']],
+            [c_id for c_id, dummy in
+             credential_api.list_totp_secrets_for_user(user_id)])
+
+        credential_api.delete_credentials_for_user(user_id)
+        self.assertEqual(
+            [], credential_api.list_totp_secrets_for_user(user_id))
+
+    def _create_ec2_credential(self, user_id):
+        blob, credential = unit.new_ec2_credential(
+            user_id, project_id=uuid.uuid4().hex)
+        PROVIDERS.credential_api.create_credential(
+            credential['id'], credential
+        )
+        return blob, credential
+
+    def test_get_ec2_credential_is_cached(self):
+        self.config_fixture.config(group='credential',
+                                   access_key_cache_time=30)
+        dummy, credential = self._create_ec2_credential(self.user_foo['id'])
+        credential_api = PROVIDERS.credential_api
+        get_credential = self.useFixture(fixtures.MockPatchObject(
+            credential_api, 'get_credential',
+            wraps=credential_api.get_credential)).mock
+
+        with freezegun.freeze_time() as frozen_time:
+            ref = credential_api.get_ec2_credential(credential['id'])
+            self.assertEqual(credential['blob'], ref['blob'])
+            self.assertEqual(credential['project_id'], ref['project_id'])
+            ref['project_id'] = uuid.uuid4().hex
+            ref = credential_api.get_ec2_credential(credential['id'])
+            self.assertEqual(credential['project_id'], ref['project_id'])
+            self.assertEqual(1, get_credential.call_count)
+
+            frozen_time.tick(datetime.timedelta(
+                seconds=CONF.credential.access_key_cache_time + 1))
+            credential_api.get_ec2_credential(credential['id'])
+            self.assertEqual(2, get_credential.call_count)
+
+    def test_get_ec2_credential_cache_disabled_by_default(self):
+        dummy, credential = self._create_ec2_credential(self.user_foo['id'])
+        credential_api = PROVIDERS.credential_api
+        with mock.patch.object(credential_api, 'get_credential',
+                               wraps=credential_api.get_credential
+                               ) as get_credential:
+            credential_api.get_ec2_credential(credential['id'])
+            credential_api.get_ec2_credential(credential['id'])
+            self.assertEqual(2, get_credential.call_count)
+
+    def test_get_ec2_credential_invalidated_on_change(self):
+        self.config_fixture.config(group='credential',
+                                   access_key_cache_time=30)
+        credential_api = PROVIDERS.credential_api
+        user_id = self.user_foo['id']
+        blob, credential = self._create_ec2_credential(user_id)
+        credential_api.get_ec2_credential(credential['id'])
+
+        blob['secret'] = uuid.uuid4().hex
+        credential_api.update_credential(credential['id'],
+                                         {'blob': json.dumps(blob)})
+        self.assertEqual(
+            blob, credential_api.get_ec2_credential(credential['id'])['blob'])
+
+        credential_api.delete_credential(credential['id'])
+        self.assertRaises(exception.CredentialNotFound,
+                          credential_api.get_ec2_credential,
+                          credential['id'])
+
+        dummy, credential = self._create_ec2_credential(user_id)
+        credential_api.get_ec2_credential(credential['id'])
+        credential_api.delete_credentials_for_user(user_id)
+        self.assertRaises(exception.CredentialNotFound,
+                          credential_api.get_ec2_credential,
+                          credential['id'])
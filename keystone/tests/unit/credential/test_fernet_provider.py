@@ -14,15 +14,20 @@ import fixtures
 import hashlib
 import uuid
 
+import mock
 from oslo_log import log
 
 from keystone.common import fernet_utils
+import keystone.conf
 from keystone.credential.providers import fernet as credential_fernet
 from keystone.tests import unit
 from keystone.tests.unit import ksfixtures
 from keystone.tests.unit.ksfixtures import database
 
 
+CONF = keystone.conf.CONF
+
+
 class TestFernetCredentialProvider(unit.TestCase):
     def setUp(self):
         super(TestFernetCredentialProvider, self).setUp()
@@ -45,6 +50,38 @@ class TestFernetCredentialProvider(unit.TestCase):
         self.assertEqual(blob, decrypted_blob)
         self.assertIsNotNone(primary_key_hash)
 
+    def test_decrypt_many(self):
+        blobs = [uuid.uuid4().hex for _ in range(3)]
+        encrypted_blobs = [self.provider.encrypt(b)[0] for b in blobs]
+        self.assertEqual(blobs, self.provider.decrypt_many(encrypted_blobs))
+
+    def test_keys_are_loaded_once(self):
+        blob = uuid.uuid4().hex
+        with mock.patch.object(fernet_utils.FernetUtils, 'load_keys',
+                               autospec=True,
+                               side_effect=fernet_utils.FernetUtils.load_keys
+                               ) as load_keys:
+            encrypted_blob, primary_key_hash = self.provider.encrypt(blob)
+            for _ in range(3):
+                self.assertEqual(blob, self.provider.decrypt(encrypted_blob))
+            self.assertEqual(1, load_keys.call_count)
+
+    def test_keys_are_reloaded_after_rotation(self):
+        blob = uuid.uuid4().hex
+        encrypted_blob, primary_key_hash = self.provider.encrypt(blob)
+
+        fernet_utils.FernetUtils(
+            CONF.credential.key_repository,
+            credential_fernet.MAX_ACTIVE_KEYS,
+            'credential').rotate_keys()
+
+        new_encrypted_blob, new_primary_key_hash = self.provider.encrypt(blob)
+        self.assertNotEqual(primary_key_hash, new_primary_key_hash)
+        # Credentials encrypted with the previous primary key can still be
+        # decrypted.
+        self.assertEqual(blob, self.provider.decrypt(encrypted_blob))
+        self.assertEqual(blob, self.provider.decrypt(new_encrypted_blob))
+
 
 class TestFernetCredentialProviderWithNullKey(unit.TestCase):
     def setUp(self):
@@ -110,10 +110,24 @@ def _match_query(query, attrs, attrs_checked):
         return not _match_query(query[2:-1], attrs, attrs_checked)
 
     (k, _sep, v) = inner.partition('=')
+    if k.endswith(('>', '<')):
+        # Ordering match, e.g. (modifyTimestamp>=20190101000000Z).
+        (k, op) = (k[:-1], k[-1])
+        attrs_checked.add(k.lower())
+        return _match_ordering(k, v, op, attrs)
     attrs_checked.add(k.lower())
     return _match(k, v, attrs)
 
 
+def _match_ordering(key, value, op, attrs):
+    """Match a >= or <= assertion by comparing the values as strings."""
+    if key not in attrs:
+        return False
+    if op == '>':
+        return any(x >= value for x in attrs[key])
+    return any(x <= value for x in attrs[key])
+
+
 def _paren_groups(source):
     """Split a string into parenthesized groups."""
     count = 0
@@ -564,20 +578,31 @@ class FakeLdap(common.LDAPHandler):
         # that's why we use only the first 5.
         results = self.search_s(*params[:5])
 
-        # extract limit from serverctrl
+        # extract limit from serverctrl, the cookie is the offset of the
+        # page to return
         serverctrls = params[5]
         ctrl = serverctrls[0]
+        offset = int(ctrl.cookie or 0)
 
         if ctrl.size:
-            rdata = results[:ctrl.size]
+            rdata = results[offset:offset + ctrl.size]
+        elif ctrl.cookie:
+            # a page size of zero abandons the paged search
+            rdata = []
         else:
             rdata = results
 
+        cookie = ''
+        if ctrl.size and offset + len(rdata) < len(results):
+            cookie = str(offset + len(rdata))
+
         # real result3 returns various service info -- rtype, rmsgid,
-        # serverctrls. Now this info is not used, so all this info is None
+        # serverctrls. Only the paged results control is used, the other
+        # info is None
         rtype = None
         rmsgid = None
-        serverctrls = None
+        serverctrls = [ldap.controls.SimplePagedResultsControl(
+            criticality=True, size=ctrl.size, cookie=cookie)]
         return (rtype, rdata, rmsgid, serverctrls)
 
 
@@ -10,8 +10,12 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import copy
 import uuid
 
+import mock
+from six.moves import range
+
 from keystone.common import provider_api
 from keystone import exception
 from keystone.tests import unit
@@ -97,3 +101,133 @@ class TestFederationProtocol(unit.TestCase):
                           self.idp['id'],
                           protocol['id'],
                           protocol)
+
+
+class TestFederationCaching(unit.TestCase):
+
+    def setUp(self):
+        super(TestFederationCaching, self).setUp()
+        self.useFixture(database.Database())
+        self.load_backends()
+        PROVIDERS.resource_api.create_domain(
+            default_fixtures.ROOT_DOMAIN['id'], default_fixtures.ROOT_DOMAIN)
+        self.remote_id = uuid.uuid4().hex
+        self.idp = {
+            'id': uuid.uuid4().hex,
+            'enabled': True,
+            'remote_ids': [self.remote_id],
+        }
+        PROVIDERS.federation_api.create_idp(self.idp['id'], self.idp)
+        self.mapping = copy.deepcopy(mapping_fixtures.MAPPING_EPHEMERAL_USER)
+        self.mapping['id'] = uuid.uuid4().hex
+        PROVIDERS.federation_api.create_mapping(
+            self.mapping['id'], self.mapping)
+        self.protocol = {
+            'id': uuid.uuid4().hex,
+            'mapping_id': self.mapping['id']
+        }
+        PROVIDERS.federation_api.create_protocol(
+            self.idp['id'], self.protocol['id'], self.protocol)
+
+    def test_get_idp_protocol_and_mapping(self):
+        idp, protocol, mapping = (
+            PROVIDERS.federation_api.get_idp_protocol_and_mapping(
+                self.idp['id'], self.protocol['id']))
+        self.assertEqual(self.idp['id'], idp['id'])
+        self.assertEqual(self.protocol['id'], protocol['id'])
+        self.assertEqual(self.mapping['id'], mapping['id'])
+        self.assertRaises(
+            exception.FederatedProtocolNotFound,
+            PROVIDERS.federation_api.get_idp_protocol_and_mapping,
+            self.idp['id'], uuid.uuid4().hex)
+
+    @unit.skip_if_cache_disabled('federation')
+    def test_cache_layer_idp_resolution(self):
+        driver = PROVIDERS.federation_api.driver
+        with mock.patch.object(driver, 'get_idp_from_remote_id',
+                               wraps=driver.get_idp_from_remote_id) as m:
+            for _ in range(2):
+                ref = PROVIDERS.federation_api.get_idp_from_remote_id(
+                    self.remote_id)
+                self.assertEqual(self.idp['id'], ref['idp_id'])
+            self.assertEqual(1, m.call_count)
+
+        with mock.patch.object(driver, 'get_idp',
+                               wraps=driver.get_idp) as m:
+            for _ in range(2):
+                PROVIDERS.federation_api.get_idp_protocol_and_mapping(
+                    self.idp['id'], self.protocol['id'])
+                PROVIDERS.federation_api.evaluate(
+                    self.idp['id'], self.protocol['id'],
+                    mapping_fixtures.EMPLOYEE_ASSERTION)
+            self.assertEqual(1, m.call_count)
+
+    @unit.skip_if_cache_disabled('federation')
+    def test_update_idp_invalidates_cache(self):
+        PROVIDERS.federation_api.get_idp(self.idp['id'])
+        PROVIDERS.federation_api.get_idp_from_remote_id(self.remote_id)
+
+        new_remote_id = uuid.uuid4().hex
+        PROVIDERS.federation_api.update_idp(
+            self.idp['id'], {'enabled': False, 'remote_ids': [new_remote_id]})
+
+        self.assertFalse(
+            PROVIDERS.federation_api.get_idp(self.idp['id'])['enabled'])
+        self.assertRaises(exception.IdentityProviderNotFound,
+                          PROVIDERS.federation_api.get_idp_from_remote_id,
+                          self.remote_id)
+        ref = PROVIDERS.federation_api.get_idp_from_remote_id(new_remote_id)
+        self.assertEqual(self.idp['id'], ref['idp_id'])
+
+    @unit.skip_if_cache_disabled('federation')
+    def test_delete_idp_invalidates_cache(self):
+        PROVIDERS.federation_api.get_idp(self.idp['id'])
+        PROVIDERS.federation_api.delete_idp(self.idp['id'])
+        self.assertRaises(exception.IdentityProviderNotFound,
+                          PROVIDERS.federation_api.get_idp,
+                          self.idp['id'])
+
+    @unit.skip_if_cache_disabled('federation')
+    def test_update_protocol_invalidates_cache(self):
+        PROVIDERS.federation_api.get_mapping_from_idp_and_protocol(
+            self.idp['id'], self.protocol['id'])
+
+        new_mapping = copy.deepcopy(mapping_fixtures.MAPPING_EPHEMERAL_USER)
+        new_mapping['id'] = uuid.uuid4().hex
+        PROVIDERS.federation_api.create_mapping(new_mapping['id'],
+                                                new_mapping)
+        self.protocol['mapping_id'] = new_mapping['id']
+        PROVIDERS.federation_api.update_protocol(
+            self.idp['id'], self.protocol['id'], self.protocol)
+
+        mapping = PROVIDERS.federation_api.get_mapping_from_idp_and_protocol(
+            self.idp['id'], self.protocol['id'])
+        self.assertEqual(new_mapping['id'], mapping['id'])
+        _idp, protocol, mapping = (
+            PROVIDERS.federation_api.get_idp_protocol_and_mapping(
+                self.idp['id'], self.protocol['id']))
+        self.assertEqual(new_mapping['id'], protocol['mapping_id'])
+        self.assertEqual(new_mapping['id'], mapping['id'])
+
+    @unit.skip_if_cache_disabled('federation')
+    def test_delete_protocol_invalidates_cache(self):
+        PROVIDERS.federation_api.get_idp_protocol_and_mapping(
+            self.idp['id'], self.protocol['id'])
+        PROVIDERS.federation_api.delete_protocol(
+            self.idp['id'], self.protocol['id'])
+        self.assertRaises(
+            exception.FederatedProtocolNotFound,
+            PROVIDERS.federation_api.get_idp_protocol_and_mapping,
+            self.idp['id'], self.protocol['id'])
+
+    @unit.skip_if_cache_disabled('federation')
+    def test_update_mapping_invalidates_cache(self):
+        PROVIDERS.federation_api.get_mapping_from_idp_and_protocol(
+            self.idp['id'], self.protocol['id'])
+
+        new_rules = copy.deepcopy(mapping_fixtures.MAPPING_SMALL)
+        PROVIDERS.federation_api.update_mapping(self.mapping['id'], new_rules)
+
+        mapping = PROVIDERS.federation_api.get_mapping_from_idp_and_protocol(
+            self.idp['id'], self.protocol['id'])
+        self.assertEqual(new_rules['rules'], mapping['rules'])
@@ -331,6 +331,15 @@ class IdentityDriverTests(object):
             exception.GroupNotFound, self.driver.get_group_by_name,
             group_name=uuid.uuid4().hex, domain_id=uuid.uuid4().hex)
 
+    def test_get_groups_by_ids(self):
+        group1 = self.create_group()
+        group2 = self.create_group()
+
+        actual_groups = self.driver.get_groups_by_ids(
+            [group1['id'], uuid.uuid4().hex, group2['id']])
+        self.assertItemsEqual([group1['id'], group2['id']],
+                              [g['id'] for g in actual_groups])
+
     def test_update_group(self):
         group = self.create_group()
 
@@ -16,6 +16,7 @@ import tempfile
 import uuid
 
 import fixtures
+import ldap.controls
 import ldap.dn
 import mock
 from oslo_config import fixture as config_fixture
@@ -24,6 +25,7 @@ from keystone.common import driver_hints
 from keystone.common import provider_api
 import keystone.conf
 from keystone import exception as ks_exception
+from keystone.identity.backends import ldap as ldap_identity
 from keystone.identity.backends.ldap import common as common_ldap
 from keystone.tests import unit
 from keystone.tests.unit import default_fixtures
@@ -203,6 +205,44 @@ class DnCompareTest(unit.BaseTestCase):
         parent = u'ou=OpenStäck'
         self.assertTrue(common_ldap.dn_startswith(child, parent))
 
+    def test_parse_dn_is_memoized(self):
+        common_ldap.clear_dn_caches()
+        self.addCleanup(common_ldap.clear_dn_caches)
+        dn = 'cn=Babs Jansen,ou=OpenStack+cn=OpenSource'
+        with mock.patch.object(ldap.dn, 'str2dn',
+                               wraps=ldap.dn.str2dn) as str2dn:
+            parsed = common_ldap.parse_dn(dn)
+            self.assertIs(parsed, common_ldap.parse_dn(dn))
+            self.assertTrue(common_ldap.is_dn_equal(
+                dn, 'CN=babs  jansen,cn=OpenSource+ou=OpenStack'))
+            self.assertTrue(common_ldap.dn_startswith(dn, 'ou=OpenStack+'
+                                                          'cn=OpenSource'))
+        self.assertEqual(3, str2dn.call_count)
+        self.assertEqual(((('cn', 'Babs Jansen', 1),),
+                          (('ou', 'OpenStack', 1), ('cn', 'OpenSource', 1))),
+                         parsed)
+
+    def test_parsed_dn_cache_is_bounded(self):
+        cache = common_ldap._BoundedCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+
+    def test_normalize_dn(self):
+        self.assertEqual(((('cn', 'babs jansen'),),
+                          (('cn', 'opensource'), ('ou', 'openstack'))),
+                         common_ldap.normalize_dn(
+                             'CN=Babs Jansen,ou=OpenStack+cn=OpenSource'))
+        self.assertEqual(
+            common_ldap.normalize_dn('cn=Babs Jansen,ou=OpenStack'),
+            common_ldap.normalize_dn(
+                ldap.dn.str2dn('cn=babs jansen,OU=openstack')))
+
 
 class LDAPDeleteTreeTest(unit.TestCase):
 
@@ -413,6 +453,90 @@ class LDAPPagedResultsTest(unit.TestCase):
         attrlist = sorted([attr for attr in args[3] if attr])
         self.assertEqual(['mail', 'userPassword'], attrlist)
 
+    @mock.patch.object(fakeldap.FakeLdap, 'search_ext')
+    @mock.patch.object(fakeldap.FakeLdap, 'result3')
+    def test_search_s_iter_requests_pages_lazily(self, mock_result3,
+                                                 mock_search_ext):
+        def page(dn, cookie):
+            ctrl = ldap.controls.SimplePagedResultsControl(
+                True, size=1, cookie=cookie)
+            return ('', [(dn, {'cn': [b'junk']})], 1, [ctrl])
+
+        mock_result3.side_effect = [
+            page('cn=junk1,dc=example,dc=test', 'cookie1'),
+            page('cn=junk2,dc=example,dc=test', 'cookie2'),
+            ('', [], 1, []),
+        ]
+        self.config_fixture.config(group='ldap', page_size=1)
+
+        conn = ldap_identity.UserApi(CONF).get_connection()
+        entries = conn.search_s_iter('dc=example,dc=test',
+                                     ldap.SCOPE_SUBTREE,
+                                     'objectclass=*',
+                                     ['cn'])
+        self.assertEqual(('cn=junk1,dc=example,dc=test', {'cn': ['junk']}),
+                         next(entries))
+        self.assertEqual(('cn=junk2,dc=example,dc=test', {'cn': ['junk']}),
+                         next(entries))
+        # Pages are only requested while the entries are being consumed.
+        self.assertEqual(2, mock_search_ext.call_count)
+
+        # Stopping early releases the search on the server by asking for a
+        # page of size zero.
+        entries.close()
+        self.assertEqual(3, mock_search_ext.call_count)
+        _, kwargs = mock_search_ext.call_args
+        self.assertEqual(0, kwargs['serverctrls'][0].size)
+        self.assertEqual('cookie2', kwargs['serverctrls'][0].cookie)
+
+    def test_get_all_stops_paged_search_at_limit(self):
+        self.config_fixture.config(group='ldap', page_size=1)
+        user_api = ldap_identity.UserApi(CONF)
+        received = []
+
+        def search_s_iter(conn, base, scope, filterstr, attrlist):
+            for i in range(10):
+                received.append(i)
+                yield ('cn=junk%d,dc=example,dc=test' % i,
+                       {'cn': ['junk%d' % i], 'sn': ['junk%d' % i]})
+
+        self.useFixture(fixtures.MockPatchObject(
+            common_ldap.KeystoneLDAPHandler, 'search_s_iter', search_s_iter))
+
+        hints = driver_hints.Hints()
+        hints.set_limit(2)
+        users = user_api.get_all(hints=hints)
+        self.assertEqual(['junk0', 'junk1'], [u['name'] for u in users])
+        self.assertTrue(hints.limit['truncated'])
+        # One more entry than the limit is needed to detect the truncation,
+        # nothing past it is read.
+        self.assertEqual([0, 1, 2], received)
+
+    def test_iter_all_yields_before_search_ends(self):
+        self.config_fixture.config(group='ldap', page_size=1)
+        user_api = ldap_identity.UserApi(CONF)
+        received = []
+
+        def search_s_iter(conn, base, scope, filterstr, attrlist):
+            for i in range(10):
+                received.append(i)
+                yield ('cn=junk%d,dc=example,dc=test' % i,
+                       {'cn': ['junk%d' % i], 'sn': ['junk%d' % i]})
+
+        self.useFixture(fixtures.MockPatchObject(
+            common_ldap.KeystoneLDAPHandler, 'search_s_iter', search_s_iter))
+
+        hints = driver_hints.Hints()
+        hints.set_limit(3)
+        users = user_api.iter_all(hints=hints)
+        self.assertEqual('junk0', next(users)['name'])
+        # The first model is built as soon as its entry is received.
+        self.assertEqual([0], received)
+        self.assertEqual(['junk1', 'junk2'], [u['name'] for u in users])
+        self.assertTrue(hints.limit['truncated'])
+        self.assertEqual(3, hints.limit['limit'])
+        self.assertEqual([0, 1, 2, 3], received)
+
 
 class CommonLdapTestCase(unit.BaseTestCase):
     """These test cases call functions in keystone.common.ldap."""
@@ -13,6 +13,8 @@
 import datetime
 import uuid
 
+import mock
+
 from keystone.common import provider_api
 from keystone.common import sql
 import keystone.conf
@@ -115,6 +117,105 @@ class ShadowUsersBackendTests(object):
                          new_display_name)
         self.assertEqual(user_dict_create["id"], user_ref.id)
 
+    def test_shadow_federated_user_creates_user(self):
+        user = PROVIDERS.shadow_users_api.shadow_federated_user(
+            self.federated_user['idp_id'],
+            self.federated_user['protocol_id'],
+            self.federated_user['unique_id'],
+            self.federated_user['display_name'],
+            email=self.email)
+        self.assertEqual(self.domain_id, user['domain_id'])
+        self.assertEqual(self.federated_user['display_name'], user['name'])
+        self.assertEqual(self.email, user['email'])
+
+        user_dict_get = PROVIDERS.shadow_users_api.get_federated_user(
+            self.federated_user['idp_id'],
+            self.federated_user['protocol_id'],
+            self.federated_user['unique_id'])
+        self.assertEqual(user['id'], user_dict_get['id'])
+
+    def test_shadow_federated_user_updates_existing_user(self):
+        user_dict_create = PROVIDERS.shadow_users_api.create_federated_user(
+            self.domain_id, self.federated_user)
+        new_display_name = uuid.uuid4().hex
+        user = PROVIDERS.shadow_users_api.shadow_federated_user(
+            self.federated_user['idp_id'],
+            self.federated_user['protocol_id'],
+            self.federated_user['unique_id'],
+            new_display_name)
+        self.assertEqual(user_dict_create['id'], user['id'])
+        self.assertEqual(new_display_name, user['name'])
+
+    def test_shadow_federated_user_is_idempotent(self):
+        # Simulate a concurrent first login that created the user between
+        # the lookup and the insert: the insert must not fail.
+        driver = PROVIDERS.shadow_users_api.driver
+        with sql.session_for_write() as session:
+            driver._insert_federated_user(
+                session, self.federated_user['idp_id'],
+                self.federated_user['protocol_id'],
+                self.federated_user['unique_id'],
+                self.federated_user['display_name'], None)
+
+        query_federated_user = driver._query_federated_user
+        lookups = []
+
+        def _miss_first_lookup(*args):
+            query = query_federated_user(*args)
+            if not lookups:
+                query = mock.Mock()
+                query.first.return_value = None
+            lookups.append(query)
+            return query
+
+        with mock.patch.object(driver, '_query_federated_user',
+                               side_effect=_miss_first_lookup):
+            user = PROVIDERS.shadow_users_api.shadow_federated_user(
+                self.federated_user['idp_id'],
+                self.federated_user['protocol_id'],
+                self.federated_user['unique_id'],
+                self.federated_user['display_name'])
+        self.assertEqual(2, len(lookups))
+        users = PROVIDERS.shadow_users_api.list_federated_users_info()
+        self.assertEqual([user['id']], [u['user_id'] for u in users])
+
+    def test_shadow_federated_user_of_another_idp_conflicts(self):
+        idp = {'id': uuid.uuid4().hex, 'enabled': True,
+               'domain_id': self.domain_id}
+        protocol = {'id': uuid.uuid4().hex, 'idp_id': idp['id'],
+                    'mapping_id': self.mapping['id']}
+        PROVIDERS.federation_api.create_idp(idp['id'], idp)
+        PROVIDERS.federation_api.create_protocol(
+            idp['id'], protocol['id'], protocol)
+        user = PROVIDERS.shadow_users_api.shadow_federated_user(
+            self.federated_user['idp_id'],
+            self.federated_user['protocol_id'],
+            self.federated_user['unique_id'],
+            self.federated_user['display_name'])
+
+        # The same unique ID asserted by another identity provider of the
+        # domain maps to the same user ID, which must not be shared.
+        self.assertRaises(exception.Conflict,
+                          PROVIDERS.shadow_users_api.shadow_federated_user,
+                          idp['id'], protocol['id'],
+                          self.federated_user['unique_id'],
+                          uuid.uuid4().hex)
+        users = PROVIDERS.shadow_users_api.list_federated_users_info()
+        self.assertEqual([(user['id'], self.federated_user['idp_id'])],
+                         [(u['user_id'], u['idp_id']) for u in users])
+
+    def test_shadow_federated_user_sets_last_active_at(self):
+        self.config_fixture.config(group='security_compliance',
+                                   disable_user_account_days_inactive=90)
+        now = datetime.datetime.utcnow().date()
+        user = PROVIDERS.shadow_users_api.shadow_federated_user(
+            self.federated_user['idp_id'],
+            self.federated_user['protocol_id'],
+            self.federated_user['unique_id'],
+            self.federated_user['display_name'])
+        user_ref = self._get_user_ref(user['id'])
+        self.assertGreaterEqual(now, user_ref.last_active_at)
+
     def test_set_last_active_at(self):
         self.config_fixture.config(group='security_compliance',
                                    disable_user_account_days_inactive=90)
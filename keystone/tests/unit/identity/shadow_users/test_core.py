@@ -62,3 +62,25 @@ class ShadowUsersCoreTests(object):
 
         # The shadowed users still share the same unique ID.
         self.assertEqual(shadow_user1['id'], shadow_user2['id'])
+
+    def test_shadow_existing_federated_user_updates_email(self):
+        user = PROVIDERS.identity_api.shadow_federated_user(
+            self.federated_user['idp_id'],
+            self.federated_user['protocol_id'],
+            self.federated_user['unique_id'],
+            self.federated_user['display_name'],
+            self.email)
+        self.assertEqual(self.email, user['email'])
+
+        # shadow the user again, with another name to invalidate the cache
+        new_email = uuid.uuid4().hex
+        self.federated_user['display_name'] = uuid.uuid4().hex
+        user = PROVIDERS.identity_api.shadow_federated_user(
+            self.federated_user['idp_id'],
+            self.federated_user['protocol_id'],
+            self.federated_user['unique_id'],
+            self.federated_user['display_name'],
+            new_email)
+        self.assertEqual(new_email, user['email'])
+        self.assertEqual(
+            new_email, PROVIDERS.identity_api.get_user(user['id'])['email'])
@@ -879,6 +879,61 @@ class IdentityTests(object):
                           uuid.uuid4().hex,
                           CONF.identity.default_domain_id)
 
+    def test_get_groups_by_ids(self):
+        group1 = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group1 = PROVIDERS.identity_api.create_group(group1)
+        group2 = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group2 = PROVIDERS.identity_api.create_group(group2)
+
+        groups = PROVIDERS.identity_api.get_groups_by_ids(
+            [group1['id'], uuid.uuid4().hex, group2['id']])
+        self.assertItemsEqual([group1['id'], group2['id']],
+                              [g['id'] for g in groups])
+        self.assertEqual([], PROVIDERS.identity_api.get_groups_by_ids([]))
+
+    def test_get_group_id_by_name(self):
+        group = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
+        group = PROVIDERS.identity_api.create_group(group)
+
+        self.assertEqual(
+            group['id'],
+            PROVIDERS.identity_api.get_group_id_by_name(
+                group['name'], CONF.identity.default_domain_id))
+        self.assertIsNone(
+            PROVIDERS.identity_api.get_group_id_by_name(
+                uuid.uuid4().hex, CONF.identity.default_domain_id))
+
+    @unit.skip_if_cache_disabled('identity')
+    def test_cache_layer_group_id_by_name(self):
+        domain_id = CONF.identity.default_domain_id
+        group = unit.new_group_ref(domain_id=domain_id)
+        # cache the miss
+        self.assertIsNone(PROVIDERS.identity_api.get_group_id_by_name(
+            group['name'], domain_id))
+
+        # creating the group must invalidate the cached miss
+        group = PROVIDERS.identity_api.create_group(group)
+        self.assertEqual(
+            group['id'],
+            PROVIDERS.identity_api.get_group_id_by_name(
+                group['name'], domain_id))
+
+        # renaming the group must invalidate both names
+        old_name = group['name']
+        group['name'] = uuid.uuid4().hex
+        PROVIDERS.identity_api.update_group(group['id'], group)
+        self.assertIsNone(PROVIDERS.identity_api.get_group_id_by_name(
+            old_name, domain_id))
+        self.assertEqual(
+            group['id'],
+            PROVIDERS.identity_api.get_group_id_by_name(
+                group['name'], domain_id))
+
+        # deleting the group must invalidate the cached hit
+        PROVIDERS.identity_api.delete_group(group['id'])
+        self.assertIsNone(PROVIDERS.identity_api.get_group_id_by_name(
+            group['name'], domain_id))
+
     @unit.skip_if_cache_disabled('identity')
     def test_cache_layer_group_crud(self):
         group = unit.new_group_ref(domain_id=CONF.identity.default_domain_id)
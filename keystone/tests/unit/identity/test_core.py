@@ -16,6 +16,7 @@ import itertools
 import os
 import uuid
 
+import fixtures
 import mock
 from oslo_config import fixture as config_fixture
 
@@ -127,6 +128,51 @@ class TestDomainConfigs(unit.BaseTestCase):
 
                     self.assertEqual(3, load_driver_mock.call_count)
 
+    def test_config_files_loaded_on_first_use(self):
+        self.config_fixture.config(domain_driver_cache_size=10,
+                                   group='identity')
+        domain_config_filename = os.path.join(self.tmp_dir,
+                                              'keystone.domain1.conf')
+        with open(domain_config_filename, 'w'):
+            """Write an empty config file."""
+        self.addCleanup(os.remove, domain_config_filename)
+
+        domain_config = identity.DomainConfigs()
+        with mock.patch.object(identity.DomainConfigs,
+                               '_load_config_from_file') as mock_load_config:
+            domain_config.setup_domain_drivers(None, None)
+            mock_load_config.assert_not_called()
+
+            with mock.patch.object(identity.core, 'PROVIDERS') as providers:
+                providers.resource_api.get_domain.side_effect = (
+                    lambda domain_id: {'id': domain_id, 'name': domain_id})
+                domain_config.get_domain_driver('domain2')
+                mock_load_config.assert_not_called()
+                domain_config.get_domain_driver('domain1')
+                mock_load_config.assert_called_once_with(
+                    providers.resource_api, [domain_config_filename],
+                    'domain1')
+
+    def test_sql_config_file_loaded_at_setup(self):
+        self.config_fixture.config(domain_driver_cache_size=10,
+                                   group='identity')
+        for domain_name, driver in (('domain1', 'ldap'), ('domain2', 'sql')):
+            domain_config_filename = os.path.join(
+                self.tmp_dir, 'keystone.%s.conf' % domain_name)
+            with open(domain_config_filename, 'w') as f:
+                f.write('[identity]\ndriver = %s\n' % driver)
+            self.addCleanup(os.remove, domain_config_filename)
+
+        domain_config = identity.DomainConfigs()
+        resource_api = mock.Mock()
+        with mock.patch.object(identity.DomainConfigs,
+                               '_load_config_from_file') as mock_load_config:
+            domain_config.setup_domain_drivers(None, resource_api)
+            mock_load_config.assert_called_once_with(
+                resource_api, [os.path.join(self.tmp_dir,
+                                            'keystone.domain2.conf')],
+                'domain2')
+
 
 class TestDatabaseDomainConfigs(unit.TestCase):
 
@@ -181,3 +227,67 @@ class TestDatabaseDomainConfigs(unit.TestCase):
         self.assertEqual(CONF.ldap.suffix, res.ldap.suffix)
         self.assertEqual(CONF.ldap.use_tls, res.ldap.use_tls)
         self.assertEqual(CONF.ldap.query_scope, res.ldap.query_scope)
+
+    def test_loading_config_from_database_on_first_use(self):
+        self.config_fixture.config(domain_configurations_from_database=True,
+                                   domain_driver_cache_size=2,
+                                   group='identity')
+        domains = []
+        for _ in range(3):
+            domain = unit.new_domain_ref()
+            PROVIDERS.resource_api.create_domain(domain['id'], domain)
+            PROVIDERS.domain_config_api.create_config(
+                domain['id'], {'ldap': {'url': uuid.uuid4().hex},
+                               'identity': {'driver': 'ldap'}})
+            domains.append(domain)
+
+        domain_config = identity.DomainConfigs()
+        domain_config.setup_domain_drivers(None, PROVIDERS.resource_api)
+        self.assertEqual(0, len(domain_config))
+
+        for domain in domains:
+            domain_config.get_domain_driver(domain['id'])
+        # The least recently used driver has been dropped
+        self.assertEqual(2, len(domain_config))
+        self.assertNotIn(domains[0]['id'], domain_config)
+
+        # Using the second domain makes the third one the least recently used
+        domain_config.get_domain_driver(domains[1]['id'])
+        res = domain_config.get_domain_conf(domains[0]['id'])
+        self.assertEqual(
+            PROVIDERS.domain_config_api.get_config(
+                domains[0]['id'])['ldap']['url'], res.ldap.url)
+        self.assertEqual(set([domains[0]['id'], domains[1]['id']]),
+                         set(domain_config))
+
+    def test_sql_domain_driver_loaded_when_project_deleted(self):
+        self.config_fixture.config(domain_specific_drivers_enabled=True,
+                                   domain_configurations_from_database=True,
+                                   domain_driver_cache_size=1,
+                                   group='identity')
+        domain = unit.new_domain_ref()
+        PROVIDERS.resource_api.create_domain(domain['id'], domain)
+        PROVIDERS.domain_config_api.create_config(
+            domain['id'], {'identity': {'driver': 'sql'}})
+        # Another process loaded the SQL driver of the domain
+        PROVIDERS.domain_config_api.obtain_registration(
+            domain['id'], identity.SQL_DRIVER)
+
+        domain_config = identity.DomainConfigs()
+        domain_config.setup_domain_drivers(mock.Mock(is_sql=False),
+                                           PROVIDERS.resource_api)
+        self.assertNotIn(domain['id'], domain_config)
+        identity_api = PROVIDERS.identity_api
+        self.useFixture(fixtures.MockPatchObject(
+            identity_api, 'domain_configs', domain_config))
+
+        sql_driver = mock.Mock(is_sql=True)
+        project_id = uuid.uuid4().hex
+        with mock.patch.object(domain_config, '_load_driver',
+                               return_value=sql_driver):
+            identity_api._unset_default_project(
+                'identity', 'project', 'deleted',
+                {'resource_info': project_id})
+        self.assertIn(domain['id'], domain_config)
+        sql_driver.unset_default_project_id.assert_called_once_with(
+            project_id)
@@ -15,11 +15,14 @@ import fixtures
 
 from keystone import catalog
 from keystone.common import cache
+from keystone import federation
+from keystone import identity
 from keystone import revoke
 
 
 CACHE_REGIONS = (cache.CACHE_REGION, catalog.COMPUTED_CATALOG_REGION,
-                 revoke.REVOKE_REGION)
+                 revoke.REVOKE_REGION, identity.GROUP_NAME_REGION,
+                 federation.IDENTITY_PROVIDER_REGION)
 
 
 class Cache(fixtures.Fixture):
@@ -38,5 +38,6 @@ class LDAPDatabase(fixtures.Fixture):
         common_ldap.WRITABLE = False
 
     def clear(self):
+        common_ldap.clear_dn_caches()
         for shelf in fakeldap.FakeShelves:
             fakeldap.FakeShelves[shelf].clear()
@@ -15,9 +15,11 @@
 # under the License.
 
 import copy
+import datetime
 import uuid
 
 import fixtures
+import freezegun
 import ldap
 import mock
 from oslo_log import versionutils
@@ -2179,6 +2181,401 @@ class LDAPPosixGroupsTest(LDAPTestSetup, unit.TestCase):
         self.assertIn(new_group['id'], (x['id'] for x in group_refs))
 
 
+class LDAPEntityCacheTests(LDAPTestSetup, unit.TestCase):
+
+    def assert_backends(self):
+        _assert_backends(self, identity='ldap')
+
+    def config_overrides(self):
+        super(LDAPEntityCacheTests, self).config_overrides()
+        self.config_fixture.config(group='identity', driver='ldap')
+        self.config_fixture.config(group='ldap', entity_cache_enabled=True,
+                                   entity_cache_time=600)
+
+    def config_files(self):
+        config_files = super(LDAPEntityCacheTests, self).config_files()
+        config_files.append(unit.dirs.tests_conf('backend_ldap.conf'))
+        return config_files
+
+    def _create_user(self):
+        user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        user = PROVIDERS.identity_api.create_user(user)
+        self._modify_user(user['id'], modifyTimestamp='20190101000000Z')
+        return user
+
+    def _modify_user(self, user_id, **attrs):
+        # Change the entry behind keystone's back, as another LDAP client
+        # would do.
+        user_api = PROVIDERS.identity_api.driver.user
+        conn = user_api.get_connection()
+        conn.modify_s(user_api._id_to_dn(user_id),
+                      [(ldap.MOD_REPLACE, k, [v]) for k, v in attrs.items()])
+
+    def _reload_user_api(self, **kwargs):
+        self.config_fixture.config(group='ldap', **kwargs)
+        user_api = ldap_identity.UserApi(CONF)
+        PROVIDERS.identity_api.driver.user = user_api
+        return user_api
+
+    def test_get_user_is_served_from_cache(self):
+        user = self._create_user()
+        driver = PROVIDERS.identity_api.driver
+        driver.get_user(user['id'])
+
+        self._modify_user(user['id'], sn=uuid.uuid4().hex)
+        with mock.patch.object(common_ldap.KeystoneLDAPHandler,
+                               'search_s') as search_s:
+            user_ref = driver.get_user(user['id'])
+        search_s.assert_not_called()
+        self.assertEqual(user['name'], user_ref['name'])
+
+    def test_unchanged_entry_is_revalidated_by_timestamp_only(self):
+        user_api = self._reload_user_api(entity_cache_time=0)
+        user = self._create_user()
+        driver = PROVIDERS.identity_api.driver
+        driver.get_user(user['id'])
+
+        # Without a new timestamp the change is not noticed, which proves
+        # the entry itself was not read again.
+        self._modify_user(user['id'], sn=uuid.uuid4().hex)
+        search_s = common_ldap.KeystoneLDAPHandler.search_s
+        with mock.patch.object(common_ldap.KeystoneLDAPHandler, 'search_s',
+                               autospec=True,
+                               side_effect=search_s) as mock_search:
+            user_ref = driver.get_user(user['id'])
+        self.assertEqual(user['name'], user_ref['name'])
+        self.assertEqual(1, mock_search.call_count)
+        (_conn, base, scope, _filter, attrlist) = mock_search.call_args[0]
+        self.assertEqual(user_api._id_to_dn(user['id']), base)
+        self.assertEqual(ldap.SCOPE_BASE, scope)
+        self.assertEqual(['modifyTimestamp'], attrlist)
+
+    def test_changed_entry_is_fetched_again(self):
+        self._reload_user_api(entity_cache_time=0)
+        user = self._create_user()
+        driver = PROVIDERS.identity_api.driver
+        driver.get_user(user['id'])
+
+        new_name = uuid.uuid4().hex
+        self._modify_user(user['id'], sn=new_name,
+                          modifyTimestamp='20190101000001Z')
+        self.assertEqual(new_name, driver.get_user(user['id'])['name'])
+
+    def test_deleted_entry_is_dropped(self):
+        user_api = self._reload_user_api(entity_cache_time=0)
+        user = self._create_user()
+        driver = PROVIDERS.identity_api.driver
+        driver.get_user(user['id'])
+
+        # The LDAP driver does not delete users, remove the entry directly.
+        conn = user_api.get_connection()
+        conn.conn.delete_s(user_api._id_to_dn(user['id']))
+        self.assertRaises(exception.UserNotFound,
+                          driver.get_user, user['id'])
+        self.assertEqual(0, len(user_api.entity_cache))
+
+    def test_delta_sync_refreshes_changed_entries(self):
+        with freezegun.freeze_time(datetime.datetime.utcnow()) as frozen_time:
+            self._reload_user_api(entity_cache_sync_interval=30)
+            user = self._create_user()
+            other_user = self._create_user()
+            driver = PROVIDERS.identity_api.driver
+            driver.get_user(user['id'])
+            driver.get_user(other_user['id'])
+
+            new_name = uuid.uuid4().hex
+            self._modify_user(user['id'], sn=new_name,
+                              modifyTimestamp='20190101000001Z')
+            # Not due yet, the cached entry is still served.
+            self.assertEqual(user['name'],
+                             driver.get_user(user['id'])['name'])
+
+            frozen_time.tick(delta=datetime.timedelta(seconds=31))
+            search_s = common_ldap.KeystoneLDAPHandler.search_s
+            with mock.patch.object(common_ldap.KeystoneLDAPHandler,
+                                   'search_s', autospec=True,
+                                   side_effect=search_s) as mock_search:
+                self.assertEqual(new_name,
+                                 driver.get_user(user['id'])['name'])
+                self.assertEqual(other_user['name'],
+                                 driver.get_user(other_user['id'])['name'])
+            # A single search refreshed the changed entry.
+            self.assertEqual(1, mock_search.call_count)
+            self.assertIn('(modifyTimestamp>=20190101000000Z)',
+                          mock_search.call_args[0][3])
+
+    def test_update_invalidates_cached_entry(self):
+        user = self._create_user()
+        driver = PROVIDERS.identity_api.driver
+        driver.get_user(user['id'])
+
+        new_email = uuid.uuid4().hex
+        driver.update_user(user['id'], {'email': new_email})
+        self.assertEqual(new_email, driver.get_user(user['id'])['email'])
+
+
+class LDAPDnCacheTests(LDAPTestSetup, unit.TestCase):
+
+    def assert_backends(self):
+        _assert_backends(self, identity='ldap')
+
+    def config_overrides(self):
+        super(LDAPDnCacheTests, self).config_overrides()
+        self.config_fixture.config(group='identity', driver='ldap')
+
+    def config_files(self):
+        config_files = super(LDAPDnCacheTests, self).config_files()
+        config_files.append(unit.dirs.tests_conf('backend_ldap.conf'))
+        return config_files
+
+    def _get_subtree_user_api(self):
+        user_api = PROVIDERS.identity_api.driver.user
+        # Look up DNs by searching the tree, which requires its root entry.
+        user_api.LDAP_SCOPE = ldap.SCOPE_SUBTREE
+        with user_api.get_connection() as conn:
+            conn.add_s(user_api.tree_dn,
+                       [('objectclass', ['organizationalUnit']),
+                        ('ou', ['Users'])])
+        return user_api
+
+    def test_id_to_dn_searches_once(self):
+        user_api = self._get_subtree_user_api()
+        common_ldap._DNS_BY_ID.clear()
+        dn = 'cn=foo,ou=Nested,%s' % user_api.tree_dn
+        with mock.patch.object(common_ldap.KeystoneLDAPHandler, 'search_s',
+                               return_value=[(dn, {})]) as search_s:
+            self.assertEqual(dn, user_api._id_to_dn(self.user_foo['id']))
+            self.assertEqual(dn, user_api._id_to_dn(self.user_foo['id']))
+        self.assertEqual(1, search_s.call_count)
+
+    def test_id_to_dn_uses_dns_of_listed_entries(self):
+        user_api = self._get_subtree_user_api()
+        users = user_api.get_all()
+        common_ldap._DNS_BY_ID.clear()
+        user_api.get_all()
+        with mock.patch.object(common_ldap.KeystoneLDAPHandler,
+                               'search_s') as search_s:
+            for user in users:
+                self.assertEqual(user_api._id_to_dn_string(user['id']),
+                                 user_api._id_to_dn(user['id']))
+        search_s.assert_not_called()
+
+    def test_id_to_dn_is_cached_per_server(self):
+        user_api = self._get_subtree_user_api()
+        # A domain specific driver using another server with the same tree.
+        other_api = copy.copy(user_api)
+        other_api.LDAP_URL = 'fake://memory/other'
+        common_ldap._DNS_BY_ID.clear()
+        dn = 'cn=foo,ou=Nested,%s' % user_api.tree_dn
+        other_dn = 'cn=foo,ou=Elsewhere,%s' % user_api.tree_dn
+        with mock.patch.object(common_ldap.KeystoneLDAPHandler, 'search_s',
+                               side_effect=[[(dn, {})], [(other_dn, {})]]
+                               ) as search_s:
+            for _ in range(2):
+                self.assertEqual(dn, user_api._id_to_dn(self.user_foo['id']))
+                self.assertEqual(other_dn,
+                                 other_api._id_to_dn(self.user_foo['id']))
+        self.assertEqual(2, search_s.call_count)
+
+    def test_id_to_dn_expires(self):
+        user_api = self._get_subtree_user_api()
+        common_ldap._DNS_BY_ID.clear()
+        dn = 'cn=foo,ou=Nested,%s' % user_api.tree_dn
+        moved_dn = 'cn=foo,ou=Moved,%s' % user_api.tree_dn
+        with mock.patch.object(common_ldap.KeystoneLDAPHandler, 'search_s',
+                               side_effect=[[(dn, {})], [(moved_dn, {})]]):
+            with freezegun.freeze_time() as frozen_time:
+                self.assertEqual(dn, user_api._id_to_dn(self.user_foo['id']))
+                frozen_time.tick(
+                    delta=datetime.timedelta(
+                        seconds=common_ldap.DN_CACHE_TTL - 1))
+                self.assertEqual(dn, user_api._id_to_dn(self.user_foo['id']))
+                frozen_time.tick(delta=datetime.timedelta(seconds=1))
+                self.assertEqual(moved_dn,
+                                 user_api._id_to_dn(self.user_foo['id']))
+
+
+class LDAPMembershipBatchTests(LDAPTestSetup, unit.TestCase):
+
+    def setUp(self):
+        super(LDAPMembershipBatchTests, self).setUp()
+        self.addCleanup(self._close_batch_executors)
+
+    def _close_batch_executors(self):
+        for executor in common_ldap._BATCH_EXECUTORS.values():
+            executor.terminate()
+        common_ldap._BATCH_EXECUTORS.clear()
+
+    def assert_backends(self):
+        _assert_backends(self, identity='ldap')
+
+    def config_overrides(self):
+        super(LDAPMembershipBatchTests, self).config_overrides()
+        self.config_fixture.config(group='identity', driver='ldap')
+        self.config_fixture.config(group='ldap', membership_batch_size=2,
+                                   membership_batch_concurrency=2)
+
+    def config_files(self):
+        config_files = super(LDAPMembershipBatchTests, self).config_files()
+        config_files.append(unit.dirs.tests_conf('backend_ldap.conf'))
+        return config_files
+
+    def _create_users_in_group(self, count):
+        domain_id = CONF.identity.default_domain_id
+        group = PROVIDERS.identity_api.create_group(
+            unit.new_group_ref(domain_id=domain_id))
+        users = []
+        for _ in range(count):
+            user = PROVIDERS.identity_api.create_user(
+                unit.new_user_ref(domain_id=domain_id))
+            PROVIDERS.identity_api.add_user_to_group(user['id'], group['id'])
+            users.append(user)
+        return group, users
+
+    def test_list_users_in_group_batches_searches(self):
+        group, users = self._create_users_in_group(5)
+        driver = PROVIDERS.identity_api.driver
+
+        get_all = ldap_identity.UserApi.get_all
+        with mock.patch.object(ldap_identity.UserApi, 'get_all',
+                               autospec=True,
+                               side_effect=get_all) as mock_get_all:
+            user_refs = driver.list_users_in_group(group['id'],
+                                                   driver_hints.Hints())
+        self.assertEqual([u['id'] for u in users],
+                         [u['id'] for u in user_refs])
+        # Five members resolved two at a time.
+        self.assertEqual(3, mock_get_all.call_count)
+
+    def test_list_users_in_group_ignores_missing_members(self):
+        group, users = self._create_users_in_group(2)
+        group_api = PROVIDERS.identity_api.driver.group
+        missing_dn = PROVIDERS.identity_api.driver.user._id_to_dn_string(
+            uuid.uuid4().hex)
+        conn = group_api.get_connection()
+        conn.modify_s(group_api.get(group['id'])['dn'],
+                      [(ldap.MOD_ADD, group_api.member_attribute,
+                        missing_dn)])
+
+        user_refs = PROVIDERS.identity_api.driver.list_users_in_group(
+            group['id'], driver_hints.Hints())
+        self.assertEqual([u['id'] for u in users],
+                         [u['id'] for u in user_refs])
+
+    def test_batches_are_searched_concurrently(self):
+        group, users = self._create_users_in_group(5)
+        driver = PROVIDERS.identity_api.driver
+
+        thread_pool = common_ldap.multiprocessing.pool.ThreadPool
+        with mock.patch.object(common_ldap.multiprocessing.pool,
+                               'ThreadPool',
+                               side_effect=thread_pool) as mock_pool:
+            user_refs = driver.list_users_in_group(group['id'],
+                                                   driver_hints.Hints())
+        self.assertEqual(5, len(user_refs))
+        mock_pool.assert_called_once_with(2)
+
+    def test_batch_thread_pool_is_reused(self):
+        group, users = self._create_users_in_group(5)
+        driver = PROVIDERS.identity_api.driver
+
+        thread_pool = common_ldap.multiprocessing.pool.ThreadPool
+        with mock.patch.object(common_ldap.multiprocessing.pool,
+                               'ThreadPool',
+                               side_effect=thread_pool) as mock_pool:
+            for _ in range(2):
+                user_refs = driver.list_users_in_group(group['id'],
+                                                       driver_hints.Hints())
+                self.assertEqual(5, len(user_refs))
+        mock_pool.assert_called_once_with(2)
+
+    def test_batch_concurrency_leaves_a_pooled_connection(self):
+        self.config_fixture.config(group='ldap', pool_size=3,
+                                   membership_batch_concurrency=4)
+        group, users = self._create_users_in_group(5)
+        driver = PROVIDERS.identity_api.driver
+        driver.user = ldap_identity.UserApi(CONF)
+
+        thread_pool = common_ldap.multiprocessing.pool.ThreadPool
+        with mock.patch.object(common_ldap.multiprocessing.pool,
+                               'ThreadPool',
+                               side_effect=thread_pool) as mock_pool:
+            driver.list_users_in_group(group['id'], driver_hints.Hints())
+        mock_pool.assert_called_once_with(2)
+
+    def test_batches_are_searched_sequentially_without_pool(self):
+        self.config_fixture.config(group='ldap', use_pool=False)
+        group, users = self._create_users_in_group(5)
+        driver = PROVIDERS.identity_api.driver
+        driver.user = ldap_identity.UserApi(CONF)
+
+        with mock.patch.object(common_ldap.multiprocessing.pool,
+                               'ThreadPool') as mock_pool:
+            user_refs = driver.list_users_in_group(group['id'],
+                                                   driver_hints.Hints())
+        self.assertEqual(5, len(user_refs))
+        mock_pool.assert_not_called()
+
+    def _create_groups_with_member_of(self):
+        self.config_fixture.config(group='ldap',
+                                   user_member_of_attribute='memberOf')
+        driver = PROVIDERS.identity_api.driver
+        driver.user = ldap_identity.UserApi(CONF)
+        domain_id = CONF.identity.default_domain_id
+        user = PROVIDERS.identity_api.create_user(
+            unit.new_user_ref(domain_id=domain_id))
+        groups = [PROVIDERS.identity_api.create_group(
+            unit.new_group_ref(domain_id=domain_id)) for _ in range(3)]
+        # fakeldap does not maintain memberOf, set it as the directory would.
+        # Groups outside of the group tree are ignored.
+        group_dns = [driver.group.get(g['id'])['dn'] for g in groups]
+        group_dns.append('cn=other,ou=Other,cn=example,cn=com')
+        conn = driver.user.get_connection()
+        conn.modify_s(driver.user._id_to_dn(user['id']),
+                      [(ldap.MOD_ADD, 'memberOf', group_dns)])
+        return user, groups
+
+    def test_list_groups_for_user_uses_member_of(self):
+        user, groups = self._create_groups_with_member_of()
+        driver = PROVIDERS.identity_api.driver
+
+        with mock.patch.object(driver.group,
+                               'list_user_groups_filtered') as mock_list:
+            group_refs = driver.list_groups_for_user(user['id'],
+                                                     driver_hints.Hints())
+        mock_list.assert_not_called()
+        self.assertEqual(sorted(g['id'] for g in groups),
+                         sorted(g['id'] for g in group_refs))
+
+    def test_list_groups_for_user_uses_member_of_with_filter(self):
+        user, groups = self._create_groups_with_member_of()
+        hints = driver_hints.Hints()
+        hints.add_filter('name', groups[1]['name'])
+
+        group_refs = PROVIDERS.identity_api.driver.list_groups_for_user(
+            user['id'], hints)
+        self.assertEqual([groups[1]['id']], [g['id'] for g in group_refs])
+        self.assertEqual([], hints.filters)
+
+    def test_list_groups_for_user_uses_member_of_with_limit(self):
+        self.config_fixture.config(group='ldap', use_pool=False)
+        user, groups = self._create_groups_with_member_of()
+        driver = PROVIDERS.identity_api.driver
+        driver.group = ldap_identity.GroupApi(CONF)
+        hints = driver_hints.Hints()
+        hints.set_limit(1)
+
+        get_all = ldap_identity.GroupApi.get_all
+        with mock.patch.object(ldap_identity.GroupApi, 'get_all',
+                               autospec=True,
+                               side_effect=get_all) as mock_get_all:
+            group_refs = driver.list_groups_for_user(user['id'], hints)
+        self.assertEqual(1, len(group_refs))
+        self.assertTrue(hints.limit['truncated'])
+        # The first batch of two groups is enough to fill the limit.
+        self.assertEqual(1, mock_get_all.call_count)
+
+
 class LdapIdentityWithMapping(
         BaseLDAPIdentity, unit.SQLDriverOverrides, unit.TestCase):
     """Class to test mapping of default LDAP backend.
@@ -2432,7 +2829,7 @@ class MultiLDAPandSQLIdentity(BaseLDAPIdentity, unit.SQLDriverOverrides,
             self.assertNotIn('password', user_ref)
         self.assertEqual(expected_user_ids, user_ids)
 
-    @mock.patch.object(common_ldap.BaseLdap, '_ldap_get_all')
+    @mock.patch.object(common_ldap.BaseLdap, '_ldap_iter_truncated')
     def test_list_limit_domain_specific_inheritance(self, ldap_get_all):
         # passiging hints is important, because if it's not passed, limiting
         # is considered be disabled
@@ -2447,7 +2844,7 @@ class MultiLDAPandSQLIdentity(BaseLDAPIdentity, unit.SQLDriverOverrides,
         hints = args[0]
         self.assertEqual(1000, hints.limit['limit'])
 
-    @mock.patch.object(common_ldap.BaseLdap, '_ldap_get_all')
+    @mock.patch.object(common_ldap.BaseLdap, '_ldap_iter_truncated')
     def test_list_limit_domain_specific_override(self, ldap_get_all):
         # passiging hints is important, because if it's not passed, limiting
         # is considered to be disabled
@@ -14,12 +14,13 @@
 # under the License.
 
 import fixtures
+import ldap
 import ldappool
 import mock
 
 from keystone.common import provider_api
 import keystone.conf
-from keystone.identity.backends import ldap
+from keystone.identity.backends import ldap as ldap_identity
 from keystone.identity.backends.ldap import common as common_ldap
 from keystone.tests import unit
 from keystone.tests.unit import fakeldap
@@ -53,7 +54,7 @@ class LdapPoolCommonTestMixin(object):
         self.config_fixture.config(group='ldap', use_auth_pool=True)
         self.cleanup_pools()
 
-        user_api = ldap.UserApi(CONF)
+        user_api = ldap_identity.UserApi(CONF)
         handler = user_api.get_connection(user=None, password=None,
                                           end_user_auth=True)
         # use_auth_pool flag does not matter when use_pool is False
@@ -69,7 +70,7 @@ class LdapPoolCommonTestMixin(object):
         self.config_fixture.config(group='ldap', use_auth_pool=False)
         self.cleanup_pools()
 
-        user_api = ldap.UserApi(CONF)
+        user_api = ldap_identity.UserApi(CONF)
         handler = user_api.get_connection(user=None, password=None,
                                           end_user_auth=True)
         self.assertIsInstance(handler.conn, common_ldap.PythonLDAPHandler)
@@ -231,3 +232,191 @@ class LDAPIdentity(LdapPoolCommonTestMixin,
         config_files = super(LDAPIdentity, self).config_files()
         config_files.append(unit.dirs.tests_conf('backend_ldap_pool.conf'))
         return config_files
+
+
+class StatefulFakeLdapPool(fakeldap.FakeLdapPool):
+    """Fake connector which stays connected once bound, like ldappool's."""
+
+    def simple_bind_s(self, who=None, cred=None,
+                      serverctrls=None, clientctrls=None):
+        super(StatefulFakeLdapPool, self).simple_bind_s(
+            who=who, cred=cred, serverctrls=serverctrls,
+            clientctrls=clientctrls)
+        self.connected = True
+        self.who = who
+        self.cred = cred
+
+
+class LDAPPoolMetricsTest(test_backend_ldap.LDAPTestSetup, unit.TestCase):
+
+    def setUp(self):
+        self.useFixture(fixtures.MockPatchObject(
+            common_ldap.PooledLDAPHandler, 'Connector', StatefulFakeLdapPool))
+        super(LDAPPoolMetricsTest, self).setUp()
+        self.addCleanup(common_ldap.PooledLDAPHandler.connection_pools.clear)
+        self.who = CONF.ldap.user
+        self.cred = CONF.ldap.password
+
+    def assert_backends(self):
+        test_backend_ldap._assert_backends(self, identity='ldap')
+
+    def config_overrides(self):
+        super(LDAPPoolMetricsTest, self).config_overrides()
+        self.config_fixture.config(group='identity', driver='ldap')
+
+    def config_files(self):
+        config_files = super(LDAPPoolMetricsTest, self).config_files()
+        config_files.append(unit.dirs.tests_conf('backend_ldap.conf'))
+        config_files.append(unit.dirs.tests_conf('backend_ldap_pool.conf'))
+        return config_files
+
+    def _get_pool(self):
+        PROVIDERS.identity_api.driver.user.get_connection()
+        return common_ldap.PooledLDAPHandler.connection_pools[CONF.ldap.url]
+
+    def test_connections_in_use_and_idle(self):
+        pool = self._get_pool()
+        with pool.connection(self.who, self.cred):
+            with pool.connection(self.who, self.cred):
+                self.assertEqual(2, common_ldap.POOL_CONNECTIONS_IN_USE.value(
+                    pool=pool.name))
+                self.assertEqual(0, common_ldap.POOL_CONNECTIONS_IDLE.value(
+                    pool=pool.name))
+        self.assertEqual(0, common_ldap.POOL_CONNECTIONS_IN_USE.value(
+            pool=pool.name))
+        self.assertEqual(2, common_ldap.POOL_CONNECTIONS_IDLE.value(
+            pool=pool.name))
+
+    def test_wait_time_is_observed(self):
+        pool = self._get_pool()
+        waits = common_ldap.POOL_WAIT_SECONDS.count(pool=pool.name)
+        with pool.connection(self.who, self.cred):
+            pass
+        self.assertEqual(waits + 1,
+                         common_ldap.POOL_WAIT_SECONDS.count(pool=pool.name))
+
+    def test_pool_exhaustion_is_counted(self):
+        pool = self._get_pool()
+        pool.size = 1
+        exhausted = common_ldap.POOL_EXHAUSTED.value(pool=pool.name)
+        with pool.connection(self.who, self.cred):
+            def _get_second_connection():
+                with pool.connection(self.who, self.cred):
+                    pass
+            self.assertRaises(ldappool.MaxConnectionReachedError,
+                              _get_second_connection)
+        self.assertEqual(exhausted + 1,
+                         common_ldap.POOL_EXHAUSTED.value(pool=pool.name))
+
+    def test_connection_failures_are_counted(self):
+        pool = self._get_pool()
+        failures = common_ldap.POOL_CONNECTION_FAILURES.value(pool=pool.name)
+        user = PROVIDERS.identity_api.driver.user
+        user_dn = user._id_to_dn(self.user_foo['id'])
+
+        def _bind_with_wrong_password():
+            with pool.connection(user_dn, 'wrong password'):
+                pass
+        self.assertRaises(ldap.INVALID_CREDENTIALS, _bind_with_wrong_password)
+        self.assertEqual(failures + 1,
+                         common_ldap.POOL_CONNECTION_FAILURES.value(
+                             pool=pool.name))
+        self.assertEqual(0, common_ldap.POOL_CONNECTIONS_IN_USE.value(
+            pool=pool.name))
+
+    def test_binds_are_observed(self):
+        pool = self._get_pool()
+        binds = common_ldap.POOL_BIND_SECONDS.count(pool=pool.name)
+        failures = common_ldap.POOL_BIND_FAILURES.value(pool=pool.name)
+        with pool.connection(self.who, self.cred):
+            # The idle connection is in use, so another one is bound.
+            with pool.connection(self.who, self.cred):
+                pass
+        self.assertEqual(binds + 1,
+                         common_ldap.POOL_BIND_SECONDS.count(pool=pool.name))
+
+        user_dn = PROVIDERS.identity_api.driver.user._id_to_dn(
+            self.user_foo['id'])
+
+        def _bind_with_wrong_password():
+            with pool.connection(user_dn, 'wrong password'):
+                pass
+        self.assertRaises(ldap.INVALID_CREDENTIALS, _bind_with_wrong_password)
+        # ldappool may retry the bind, each attempt is counted.
+        self.assertLess(failures,
+                        common_ldap.POOL_BIND_FAILURES.value(pool=pool.name))
+
+    def test_reconnects_are_counted(self):
+        pool = self._get_pool()
+        reconnects = common_ldap.POOL_RECONNECTS.value(pool=pool.name)
+        with pool.connection(self.who, self.cred):
+            with pool.connection(self.who, self.cred):
+                pass
+        # Growing the pool is not a reconnect.
+        self.assertEqual(reconnects,
+                         common_ldap.POOL_RECONNECTS.value(pool=pool.name))
+
+        # Expired connections are dropped and replaced by new ones.
+        pool.max_lifetime = 0
+        with pool.connection(self.who, self.cred):
+            pass
+        self.assertEqual(reconnects + 1,
+                         common_ldap.POOL_RECONNECTS.value(pool=pool.name))
+
+    def test_only_public_ldappool_interface_is_overridden(self):
+        # NOTE: ldappool only has a lower bound in the requirements, the
+        # manager must not depend on its private members.
+        overridden = sorted(
+            name for name in vars(common_ldap.ConnectionManager)
+            if hasattr(ldappool.ConnectionManager, name) and
+            not name.startswith('__'))
+        self.assertEqual(['connection'], overridden)
+
+    def _reset_prewarm(self):
+        common_ldap.PooledLDAPHandler.connection_pools.clear()
+        self.useFixture(fixtures.MockPatchObject(
+            common_ldap, '_PREWARM_PENDING', []))
+        self.useFixture(fixtures.MockPatchObject(
+            common_ldap, '_prewarmed_pid', None))
+
+    def test_prewarm_opens_connections_on_first_request(self):
+        self._reset_prewarm()
+        self.config_fixture.config(group='ldap', pool_prewarm_size=3)
+        ldap_identity.Identity(CONF)
+        # Loading the driver does not connect, the first request does.
+        self.assertNotIn(CONF.ldap.url,
+                         common_ldap.PooledLDAPHandler.connection_pools)
+        common_ldap.prewarm_connection_pools()
+        pool = common_ldap.PooledLDAPHandler.connection_pools[CONF.ldap.url]
+        self.assertEqual(3, len(pool))
+        self.assertEqual(3, common_ldap.POOL_CONNECTIONS_IDLE.value(
+            pool=pool.name))
+
+    def test_prewarm_once_per_process(self):
+        self._reset_prewarm()
+        self.config_fixture.config(group='ldap', pool_prewarm_size=3)
+        common_ldap.prewarm_connection_pools()
+        # Drivers loaded after the first request, such as domain specific
+        # ones, open connections on demand.
+        ldap_identity.Identity(CONF)
+        with mock.patch.object(common_ldap.ConnectionManager,
+                               'prewarm') as prewarm:
+            common_ldap.prewarm_connection_pools()
+            prewarm.assert_not_called()
+
+    def test_prewarm_is_capped_by_pool_size(self):
+        self._reset_prewarm()
+        self.config_fixture.config(group='ldap', pool_prewarm_size=10,
+                                   pool_size=2)
+        ldap_identity.Identity(CONF)
+        common_ldap.prewarm_connection_pools()
+        pool = common_ldap.PooledLDAPHandler.connection_pools[CONF.ldap.url]
+        self.assertEqual(2, len(pool))
+
+    def test_prewarm_failure_does_not_fail_the_request(self):
+        self._reset_prewarm()
+        self.config_fixture.config(group='ldap', pool_prewarm_size=3)
+        ldap_identity.Identity(CONF)
+        with mock.patch.object(common_ldap.ConnectionManager, 'prewarm',
+                               side_effect=ldap.SERVER_DOWN):
+            common_ldap.prewarm_connection_pools()
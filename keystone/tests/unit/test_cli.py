@@ -1706,6 +1706,9 @@ class TestMappingEngineTester(unit.BaseTestCase):
             self.input = parent.command_input
             self.prefix = parent.command_prefix
             self.engine_debug = parent.command_engine_debug
+            self.batch = getattr(parent, 'command_batch', None)
+            self.summary_only = getattr(parent, 'command_summary_only',
+                                        False)
 
     def setUp(self):
         # Set up preset cli options and a parser
@@ -1831,3 +1834,113 @@ class TestMappingEngineTester(unit.BaseTestCase):
         mapping_engine = cli.MappingEngineTester()
         self.assertRaises(exception.ValidationError,
                           mapping_engine.main)
+
+    def _write_mapping_rules(self):
+        tempfilejson = self.useFixture(temporaryfile.SecureTempFile())
+        tmpfilejsonname = tempfilejson.file_name
+        updated_mapping = copy.deepcopy(mapping_fixtures.MAPPING_SMALL)
+        with open(tmpfilejsonname, 'w') as f:
+            f.write(jsonutils.dumps(updated_mapping))
+        return tmpfilejsonname
+
+    def test_mapping_engine_tester_batch_json_lines(self):
+        self.command_rules = self._write_mapping_rules()
+        tempfile = self.useFixture(temporaryfile.SecureTempFile())
+        tmpfilename = tempfile.file_name
+        with open(tmpfilename, 'w') as f:
+            f.write(jsonutils.dumps({'UserName': 'me',
+                                     'orgPersonType': ['NoContractor'],
+                                     'LastName': 'Bo'}) + '\n')
+            f.write('\n')
+            f.write(jsonutils.dumps({'UserName': 'me',
+                                     'Email': 'No@example.com'}) + '\n')
+        self.command_input = None
+        self.command_batch = tmpfilename
+        self.command_prefix = None
+        self.command_engine_debug = False
+        self.useFixture(fixtures.MockPatchObject(
+            CONF, 'command', self.FakeConfCommand(self)))
+        mapping_engine = cli.MappingEngineTester()
+        with mock.patch('six.moves.builtins.print') as mock_print:
+            mapping_engine.main()
+        # One line per assertion followed by four summary lines.
+        self.assertEqual(6, mock_print.call_count)
+        first = jsonutils.loads(mock_print.call_args_list[0][0][0])
+        self.assertEqual(os.path.basename(tmpfilename) + ':1',
+                         first['assertion'])
+        self.assertEqual(['0cd5e9'], first['mapped']['group_ids'])
+        self.assertIn('time_ms', first)
+        second = jsonutils.loads(mock_print.call_args_list[1][0][0])
+        self.assertEqual(os.path.basename(tmpfilename) + ':3',
+                         second['assertion'])
+        self.assertIn('error', second)
+        self.assertNotIn('mapped', second)
+        summary = mock_print.call_args_list[2][0][0]
+        self.assertEqual('Assertions: 2 (1 failed)', summary)
+
+    def test_mapping_engine_tester_batch_directory(self):
+        self.command_rules = self._write_mapping_rules()
+        batch_dir = self.useFixture(fixtures.TempDir()).path
+        for name in ('b', 'a'):
+            with open(os.path.join(batch_dir, name), 'w') as f:
+                f.write("UserName: %s\n" % name)
+                f.write("orgPersonType: NoContractor\n")
+                f.write("LastName: Bo\n")
+        os.mkdir(os.path.join(batch_dir, 'subdir'))
+        self.command_input = None
+        self.command_batch = batch_dir
+        self.command_prefix = None
+        self.command_engine_debug = False
+        self.useFixture(fixtures.MockPatchObject(
+            CONF, 'command', self.FakeConfCommand(self)))
+        mapping_engine = cli.MappingEngineTester()
+        with mock.patch('six.moves.builtins.print') as mock_print:
+            mapping_engine.main()
+        results = [jsonutils.loads(c[0][0])
+                   for c in mock_print.call_args_list[:2]]
+        self.assertEqual(['a', 'b'], [r['assertion'] for r in results])
+        self.assertEqual(['a', 'b'],
+                         [r['mapped']['user']['name'] for r in results])
+        self.assertEqual('Assertions: 2 (0 failed)',
+                         mock_print.call_args_list[2][0][0])
+
+    def test_mapping_engine_tester_batch_summary_only(self):
+        self.command_rules = self._write_mapping_rules()
+        tempfile = self.useFixture(temporaryfile.SecureTempFile())
+        tmpfilename = tempfile.file_name
+        with open(tmpfilename, 'w') as f:
+            for i in range(3):
+                f.write(jsonutils.dumps({'UserName': 'me',
+                                         'orgPersonType': 'NoContractor',
+                                         'LastName': 'Bo'}))
+                f.write('\n')
+        self.command_input = None
+        self.command_batch = tmpfilename
+        self.command_summary_only = True
+        self.command_prefix = None
+        self.command_engine_debug = False
+        self.useFixture(fixtures.MockPatchObject(
+            CONF, 'command', self.FakeConfCommand(self)))
+        mapping_engine = cli.MappingEngineTester()
+        with mock.patch('six.moves.builtins.print') as mock_print:
+            mapping_engine.main()
+        self.assertEqual(4, mock_print.call_count)
+        self.assertEqual('Assertions: 3 (0 failed)',
+                         mock_print.call_args_list[0][0][0])
+        self.assertTrue(
+            mock_print.call_args_list[3][0][0].startswith('Latency (ms):'))
+
+    def test_mapping_engine_tester_batch_with_invalid_json(self):
+        self.command_rules = self._write_mapping_rules()
+        tempfile = self.useFixture(temporaryfile.SecureTempFile())
+        tmpfilename = tempfile.file_name
+        with open(tmpfilename, 'w') as f:
+            f.write("UserName: me\n")
+        self.command_input = None
+        self.command_batch = tmpfilename
+        self.command_prefix = None
+        self.command_engine_debug = False
+        self.useFixture(fixtures.MockPatchObject(
+            CONF, 'command', self.FakeConfCommand(self)))
+        mapping_engine = cli.MappingEngineTester()
+        self.assertRaises(SystemExit, mapping_engine.main)
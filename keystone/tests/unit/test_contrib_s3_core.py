@@ -17,6 +17,8 @@ import hashlib
 import hmac
 import uuid
 
+import fixtures
+import mock
 from six.moves import http_client
 
 from keystone.api import s3tokens
@@ -153,3 +155,39 @@ class S3ContribCore(test_v3.RestfulTestCase):
         self.assertRaises(exception.Unauthorized,
                           s3tokens.S3Resource._check_signature,
                           creds_ref, credentials)
+
+    def test_signing_key_v4_is_cached(self):
+        creds_ref = {'secret':
+                     u'e7a7a2240136494986991a6598d9fb9f'}
+        credentials = {'token':
+                       'QVdTNC1ITUFDLVNIQTI1NgoyMDE1MDgyNFQxMTIwNDFaCjIw'
+                       'MTUwODI0L1JlZ2lvbk9uZS9zMy9hd3M0X3JlcXVlc3QKZjIy'
+                       'MTU1ODBlZWI5YTE2NzM1MWJkOTNlODZjM2I2ZjA0YTkyOGY1'
+                       'YzU1MjBhMzkzNWE0NTM1NDBhMDk1NjRiNQ==',
+                       'signature':
+                       '730ba8f58df6ffeadd78f402e990b2910d60'
+                       'bc5c2aec63619734f096a4dd77be'}
+        cache = s3tokens._SigningKeyCache(size=1)
+        self.useFixture(fixtures.MockPatchObject(
+            s3tokens, '_SIGNING_KEY_CACHE', cache))
+
+        with mock.patch.object(s3tokens.hmac, 'new',
+                               wraps=s3tokens.hmac.new) as hmac_new:
+            s3tokens.S3Resource._check_signature(creds_ref, credentials)
+            # Four HMACs derive the signing key, one signs the request.
+            self.assertEqual(5, hmac_new.call_count)
+            s3tokens.S3Resource._check_signature(creds_ref, credentials)
+            self.assertEqual(6, hmac_new.call_count)
+
+            # Only the most recently used key is kept.
+            cache.get_key(uuid.uuid4().hex, b'20150824', b'RegionOne', b's3')
+            s3tokens.S3Resource._check_signature(creds_ref, credentials)
+            self.assertEqual(15, hmac_new.call_count)
+
+    def test_signing_key_cache_does_not_keep_secrets(self):
+        secret = uuid.uuid4().hex
+        cache = s3tokens._SigningKeyCache()
+        cache.get_key(secret, b'20150824', b'RegionOne', b's3')
+        for cache_key in cache._keys:
+            self.assertNotIn(secret, cache_key)
+            self.assertNotIn(secret.encode('utf-8'), cache_key)
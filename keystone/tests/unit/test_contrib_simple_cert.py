@@ -12,8 +12,11 @@
 
 import uuid
 
+from oslo_serialization import jsonutils
 from six.moves import http_client
 
+from keystone.common import json_home
+from keystone.common import provider_api
 from keystone.tests.unit import test_v3
 
 
@@ -61,3 +64,29 @@ class TestSimpleCert(BaseTestCase):
                          method='GET',
                          path=path,
                          expected_status=http_client.INTERNAL_SERVER_ERROR)
+
+
+class TestSimpleCertLazyLoad(TestSimpleCert):
+
+    def config_overrides(self):
+        super(TestSimpleCertLazyLoad, self).config_overrides()
+        self.config_fixture.config(group='wsgi', lazy_load=True)
+
+    def test_oauth1_manager_is_deferred(self):
+        self.assertIsInstance(
+            provider_api.ProviderAPIs._ProviderAPIRegistry__registry[
+                'oauth_api'],
+            provider_api._DeferredProviderAPI)
+        self.assertEqual(
+            [], provider_api.ProviderAPIs.oauth_api.list_consumers())
+        self.assertNotIsInstance(
+            provider_api.ProviderAPIs._ProviderAPIRegistry__registry[
+                'oauth_api'],
+            provider_api._DeferredProviderAPI)
+
+    def test_json_home_lists_lazy_apis(self):
+        resp = self.get('/', convert=False,
+                        headers={'Accept': 'application/json-home'})
+        self.assertIn(json_home.build_v3_extension_resource_relation(
+            'OS-SIMPLE-CERT', '1.0', 'ca_certificate'),
+            jsonutils.loads(resp.body)['resources'])
@@ -0,0 +1,71 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import fixtures
+import six
+
+import keystone.conf
+from keystone.identity.backends.ldap import common as common_ldap
+from keystone.tests.benchmark import ldap_backend
+from keystone.tests import unit
+from keystone.tests.unit.ksfixtures import ldapdb
+
+
+CONF = keystone.conf.CONF
+
+
+class LDAPBenchmarkTest(unit.TestCase):
+    """Run the LDAP benchmark with a tiny directory."""
+
+    def setUp(self):
+        super(LDAPBenchmarkTest, self).setUp()
+        self.useFixture(ldapdb.LDAPDatabase())
+        self.useFixture(fixtures.MockPatchObject(
+            common_ldap.PooledLDAPHandler, 'Connector',
+            common_ldap.PooledLDAPHandler.Connector))
+        self.addCleanup(common_ldap.PooledLDAPHandler.connection_pools.clear)
+        for option in ('url', 'suffix', 'page_size'):
+            self.addCleanup(CONF.clear_override, option, group='ldap')
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout', six.StringIO()))
+
+    def run_benchmark(self):
+        args = ldap_backend.get_parser().parse_args([
+            '--users', '4', '--groups', '2', '--memberships', '1',
+            '--page-size', '3', '--iterations', '2', '--warmup', '1'])
+        return dict(ldap_backend.run(args))
+
+    def test_calls_are_reported(self):
+        results = self.run_benchmark()
+
+        self.assertEqual(
+            ['authenticate', 'list_groups', 'list_groups_for_user',
+             'list_users', 'list_users[page_size=3]'],
+            sorted(results))
+        # Without a pool, every listing binds a new connection.
+        self.assertEqual(1, results['list_users']['search'])
+        self.assertEqual(0, results['list_users']['page'])
+        self.assertEqual(1, results['list_users']['bind'])
+        # The 4 users are listed in 2 pages of 3.
+        self.assertEqual(2, results['list_users[page_size=3]']['search'])
+        self.assertEqual(2, results['list_users[page_size=3]']['page'])
+        self.assertEqual(1, results['list_users[page_size=3]']['bind'])
+
+    def test_configured_pool_is_used(self):
+        self.config_fixture.config(group='ldap', use_pool=True)
+
+        results = self.run_benchmark()
+
+        self.assertIs(ldap_backend.CountingFakeLdapPool,
+                      common_ldap.PooledLDAPHandler.Connector)
+        # The pooled connection is bound once, during the warm up.
+        self.assertEqual(1, results['list_users']['search'])
+        self.assertEqual(0, results['list_users']['bind'])
@@ -0,0 +1,88 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from six.moves import http_client
+
+from keystone.common import metrics
+from keystone.server.flask import application
+from keystone.server.flask.request_processing import req_metrics
+from keystone.tests import unit
+from keystone.tests.unit import test_v3
+
+
+class MetricsEndpointTestCase(test_v3.RestfulTestCase):
+
+    def config_overrides(self):
+        super(MetricsEndpointTestCase, self).config_overrides()
+        self.config_fixture.config(group='wsgi', expose_metrics=True)
+
+    def _get_metrics(self):
+        with self.test_client() as c:
+            resp = c.get('/metrics', expected_status_code=http_client.OK)
+        self.assertEqual(metrics.CONTENT_TYPE, resp.headers['Content-Type'])
+        return resp.get_data(as_text=True)
+
+    def test_get_metrics(self):
+        self.get('/users/%s' % self.user_id)
+        body = self._get_metrics()
+        self.assertIn('# TYPE keystone_http_request_duration_seconds '
+                      'histogram', body)
+        self.assertIn('route="/v3/users/<string:user_id>"', body)
+        self.assertIn('keystone_http_request_sql_queries_count', body)
+        self.assertIn('keystone_manager_call_duration_seconds_count{'
+                      'manager="identity_api",method="get_user"}', body)
+
+    def test_unmatched_requests_share_a_route(self):
+        self.get('/%s' % self.getUniqueString(),
+                 expected_status=http_client.NOT_FOUND)
+        body = self._get_metrics()
+        self.assertIn('route="unmatched"', body)
+
+
+class MetricsEndpointDisabledTestCase(test_v3.RestfulTestCase):
+
+    def test_metrics_not_exposed_by_default(self):
+        with self.test_client() as c:
+            c.get('/metrics', expected_status_code=http_client.NOT_FOUND)
+
+
+class RequestMetricsTestCase(unit.TestCase):
+
+    def setUp(self):
+        super(RequestMetricsTestCase, self).setUp()
+        self.app = application._create_app(__name__)
+
+        @self.app.route('/ok')
+        def ok():
+            return 'ok'
+
+        @self.app.route('/fail')
+        def fail():
+            raise RuntimeError()
+
+    def _count(self, route, status):
+        return req_metrics.REQUEST_SECONDS.count(method='GET', route=route,
+                                                 status=status)
+
+    def test_response_status_is_observed(self):
+        count = self._count('/ok', http_client.OK)
+        with self.app.test_client() as client:
+            client.get('/ok')
+        self.assertEqual(count + 1, self._count('/ok', http_client.OK))
+
+    def test_unhandled_error_is_observed_as_server_error(self):
+        count = self._count('/fail', http_client.INTERNAL_SERVER_ERROR)
+        with self.app.test_client() as client:
+            self.assertRaises(RuntimeError, client.get, '/fail')
+        # The request is torn down once the test client is closed.
+        self.assertEqual(
+            count + 1, self._count('/fail', http_client.INTERNAL_SERVER_ERROR))
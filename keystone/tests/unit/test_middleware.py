@@ -25,6 +25,7 @@ from keystone.auth import core as auth_core
 from keystone.common import authorization
 from keystone.common import context as keystone_context
 from keystone.common import provider_api
+from keystone.common import render_token
 from keystone.common import tokenless_auth
 import keystone.conf
 from keystone import exception
@@ -753,3 +754,35 @@ class AuthContextMiddlewareTest(test_backend_sql.SqlTests,
                 path='/v3/projects', method='get', headers=headers
             )
             token_mock.assert_called_once()
+
+    def test_token_reference_is_lazy(self):
+        context = auth_core.AuthContext(
+            user_id=self.user['id'], methods=['password']
+        )
+        token = PROVIDERS.token_provider_api.issue_token(
+            context['user_id'], context['methods'], project_id=self.project_id,
+            auth_context=context
+        )
+        headers = {
+            authorization.AUTH_TOKEN_HEADER: token.id.encode('utf-8')
+        }
+        self.useFixture(fixtures.MockPatchObject(
+            PROVIDERS.token_provider_api, 'validate_token',
+            return_value=token))
+        with mock.patch.object(PROVIDERS.catalog_api,
+                               'get_v3_catalog') as catalog_mock:
+            req = self._do_middleware_request(
+                path='/v3/projects', method='get', headers=headers
+            )
+            self.assertFalse(catalog_mock.called)
+
+        request_context = req.environ.get(keystone_context.REQUEST_CONTEXT_ENV)
+        token_reference = request_context.token_reference['token']
+        self.assertIsInstance(token_reference, render_token.TokenView)
+        self.assertNotIn('catalog', token_reference.materialized)
+        # The view built when the token was fetched is reused, so the roles
+        # needed for the request headers are only computed once.
+        self.assertEqual(1, token_reference.materialized.count('roles'))
+        self.assertEqual([self.role_id],
+                         [r['id'] for r in token_reference['roles']])
+        self.assertEqual(1, token_reference.materialized.count('roles'))
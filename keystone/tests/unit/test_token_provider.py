@@ -13,7 +13,9 @@
 # under the License.
 
 import datetime
+import uuid
 
+import mock
 from oslo_utils import timeutils
 from six.moves import urllib
 
@@ -23,6 +25,7 @@ import keystone.conf
 from keystone import exception
 from keystone.models import token_model
 from keystone.tests import unit
+from keystone.tests.unit import default_fixtures
 from keystone.tests.unit import ksfixtures
 from keystone.tests.unit.ksfixtures import database
 from keystone import token
@@ -78,3 +81,71 @@ class TestTokenProvider(unit.TestCase):
             exception.TokenNotFound,
             PROVIDERS.token_provider_api.validate_token,
             None)
+
+
+class TestApplicationCredentialRoles(unit.TestCase):
+    def setUp(self):
+        super(TestApplicationCredentialRoles, self).setUp()
+        self.useFixture(database.Database())
+        self.load_backends()
+        self.load_fixtures(default_fixtures)
+
+        domain_id = CONF.identity.default_domain_id
+        project = unit.new_project_ref(domain_id=domain_id)
+        self.project = PROVIDERS.resource_api.create_project(project['id'],
+                                                             project)
+        self.user = PROVIDERS.identity_api.create_user(
+            unit.new_user_ref(domain_id=domain_id))
+        self.group = PROVIDERS.identity_api.create_group(
+            unit.new_group_ref(domain_id=domain_id))
+        PROVIDERS.identity_api.add_user_to_group(self.user['id'],
+                                                 self.group['id'])
+        self.user_role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(self.user_role['id'], self.user_role)
+        self.group_role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(self.group_role['id'], self.group_role)
+        PROVIDERS.assignment_api.create_grant(
+            self.user_role['id'], user_id=self.user['id'],
+            project_id=self.project['id'])
+        PROVIDERS.assignment_api.create_grant(
+            self.group_role['id'], group_id=self.group['id'],
+            project_id=self.project['id'])
+
+        app_cred = {
+            'id': uuid.uuid4().hex,
+            'name': uuid.uuid4().hex,
+            'secret': uuid.uuid4().hex,
+            'user_id': self.user['id'],
+            'project_id': self.project['id'],
+            'roles': [{'id': self.user_role['id']},
+                      {'id': self.group_role['id']}],
+        }
+        PROVIDERS.application_credential_api.create_application_credential(
+            app_cred)
+
+        self.token = token_model.TokenModel()
+        self.token.user_id = self.user['id']
+        self.token.project_id = self.project['id']
+        self.token.application_credential_id = app_cred['id']
+
+    def test_roles_are_checked_at_once(self):
+        assignment_api = PROVIDERS.assignment_api
+        with mock.patch.object(
+                assignment_api, 'get_roles_for_user_and_project',
+                wraps=assignment_api.get_roles_for_user_and_project
+        ) as get_roles, mock.patch.object(
+                assignment_api, 'get_grant') as get_grant:
+            roles = self.token.roles
+            self.assertEqual(1, get_roles.call_count)
+            self.assertFalse(get_grant.called)
+
+        self.assertEqual(
+            sorted([self.user_role['id'], self.group_role['id']]),
+            sorted(role['id'] for role in roles))
+
+    def test_roles_no_longer_assigned_are_excluded(self):
+        PROVIDERS.identity_api.remove_user_from_group(self.user['id'],
+                                                      self.group['id'])
+        self.assertEqual(
+            [{'id': self.user_role['id'], 'name': self.user_role['name']}],
+            self.token.roles)
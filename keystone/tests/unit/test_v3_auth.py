@@ -5456,6 +5456,58 @@ class TestAuthTOTP(test_v3.RestfulTestCase):
         reg = re.compile(r'^-?[0-9]+$')
         self.assertTrue(reg.match(passcode))
 
+    def test_with_a_passcode_from_a_previous_window(self):
+        self.config_fixture.config(group='totp', included_previous_windows=1)
+        creds = self._make_credentials('totp')
+        secret = creds[-1]['blob']
+
+        time_fixture = self.useFixture(fixture.TimeFixture())
+        auth_data = self._make_auth_data_by_id(
+            totp._generate_totp_passcode(secret))
+        time_fixture.advance_time_seconds(totp.TIME_STEP)
+
+        self.v3_create_token(auth_data, expected_status=http_client.CREATED)
+
+    def test_with_a_passcode_from_an_excluded_previous_window(self):
+        creds = self._make_credentials('totp')
+        secret = creds[-1]['blob']
+
+        time_fixture = self.useFixture(fixture.TimeFixture())
+        auth_data = self._make_auth_data_by_id(
+            totp._generate_totp_passcode(secret))
+        time_fixture.advance_time_seconds(totp.TIME_STEP)
+
+        self.v3_create_token(auth_data,
+                             expected_status=http_client.UNAUTHORIZED)
+
+    def test_with_a_reused_passcode(self):
+        self.config_fixture.config(group='totp', prevent_passcode_reuse=True)
+        creds = self._make_credentials('totp')
+        secret = creds[-1]['blob']
+
+        self.useFixture(fixture.TimeFixture())
+        auth_data = self._make_auth_data_by_id(
+            totp._generate_totp_passcode(secret))
+
+        self.v3_create_token(auth_data, expected_status=http_client.CREATED)
+        self.v3_create_token(auth_data,
+                             expected_status=http_client.UNAUTHORIZED)
+
+    def test_with_a_deleted_credential(self):
+        creds = self._make_credentials('totp')
+        secret = creds[-1]['blob']
+
+        self.useFixture(fixture.TimeFixture())
+        auth_data = self._make_auth_data_by_id(
+            totp._generate_totp_passcode(secret))
+        self.v3_create_token(auth_data, expected_status=http_client.CREATED)
+
+        # The secret was cached by the successful authentication above.
+        self.delete('/credentials/%s' % creds[-1]['id'],
+                    expected_status=http_client.NO_CONTENT)
+        self.v3_create_token(auth_data,
+                             expected_status=http_client.UNAUTHORIZED)
+
 
 class TestFetchRevocationList(object):
     """Test fetch token revocation list on the v3 Identity API."""
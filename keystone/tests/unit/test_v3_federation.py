@@ -3981,6 +3981,7 @@ class SAMLGenerationTests(test_v3.RestfulTestCase):
         if not _is_xmlsec1_installed():
             self.skipTest('xmlsec1 is not installed')
 
+        self.config_fixture.config(group='saml', signing_backend='xmlsec1')
         generator = keystone_idp.SAMLGenerator()
         response = generator.samlize_token(self.ISSUER, self.RECIPIENT,
                                            self.SUBJECT, self.SUBJECT_DOMAIN,
@@ -3999,6 +4000,95 @@ class SAMLGenerationTests(test_v3.RestfulTestCase):
         cert_text = cert_text.replace(os.linesep, '')
         self.assertEqual(idp_public_key, cert_text)
 
+    def _create_unsigned_assertion(self):
+        generator = keystone_idp.SAMLGenerator()
+        with mock.patch.object(keystone_idp, '_sign_assertion',
+                               side_effect=lambda assertion: assertion):
+            response = generator.samlize_token(self.ISSUER, self.RECIPIENT,
+                                               self.SUBJECT,
+                                               self.SUBJECT_DOMAIN,
+                                               self.ROLES, self.PROJECT,
+                                               self.PROJECT_DOMAIN)
+        return response.assertion
+
+    def _verify_signature(self, signed_xml):
+        xmlsec = keystone_idp.xmlsec
+        document = etree.fromstring(signed_xml)
+        xmlsec.tree.add_ids(document, ['ID'])
+        signature_node = xmlsec.tree.find_node(
+            document, xmlsec.constants.NodeSignature)
+        context = xmlsec.SignatureContext()
+        context.key = xmlsec.Key.from_file(
+            CONF.saml.certfile, xmlsec.constants.KeyDataFormatCertPem)
+        context.verify(signature_node)
+
+    def test_saml_signing_in_process(self):
+        """Test that assertions can be signed without the xmlsec1 binary."""
+        if not keystone_idp.xmlsec:
+            self.skipTest('xmlsec Python package is not installed')
+
+        self.config_fixture.config(group='saml', signing_backend='inprocess')
+        assertion = self._create_unsigned_assertion()
+        with mock.patch.object(
+                keystone_idp.saml2, 'create_class_from_xml_string',
+                wraps=saml2.create_class_from_xml_string) as create_class:
+            signed = keystone_idp._sign_assertion(assertion)
+        signed_xml = create_class.call_args[0][1]
+
+        # The signature is valid for the certificate, and only for the
+        # assertion that was signed.
+        self._verify_signature(signed_xml)
+        self.assertRaises(keystone_idp.xmlsec.Error, self._verify_signature,
+                          signed_xml.replace(self.SUBJECT.encode('utf-8'),
+                                             b'another_user'))
+
+        idp_public_key = sigver.read_cert_from_file(CONF.saml.certfile, 'pem')
+        signature = signed.signature
+        cert_text = signature.key_info.x509_data[0].x509_certificate.text
+        cert_text = cert_text.replace(os.linesep, '')
+        self.assertEqual(idp_public_key, cert_text)
+
+    def test_saml_signing_in_process_matches_xmlsec1(self):
+        if not keystone_idp.xmlsec:
+            self.skipTest('xmlsec Python package is not installed')
+        if not _is_xmlsec1_installed():
+            self.skipTest('xmlsec1 is not installed')
+
+        assertion = self._create_unsigned_assertion()
+        in_process = keystone_idp._sign_assertion_in_process(assertion)
+        with_binary = keystone_idp._sign_assertion_with_xmlsec1(assertion)
+
+        def _signature_values(signed):
+            signature = signed.signature
+            return [''.join(value.split()) for value in (
+                signature.signed_info.reference[0].digest_value.text,
+                signature.signature_value.text)]
+        self.assertEqual(_signature_values(with_binary),
+                         _signature_values(in_process))
+
+    def test_saml_signing_key_is_loaded_once(self):
+        if not keystone_idp.xmlsec:
+            self.skipTest('xmlsec Python package is not installed')
+
+        key_cache = keystone_idp._SigningKeyCache()
+        key = key_cache.get_key(CONF.saml.keyfile, CONF.saml.certfile)
+        self.assertIs(
+            key, key_cache.get_key(CONF.saml.keyfile, CONF.saml.certfile))
+
+    def test_saml_signing_backend_defaults_to_xmlsec1(self):
+        # The in-process signer is opt-in, even where xmlsec is installed.
+        self.useFixture(fixtures.MockPatchObject(keystone_idp, 'xmlsec',
+                                                 mock.Mock()))
+        self.assertEqual('xmlsec1', keystone_idp._get_signing_backend())
+
+    def test_saml_signing_in_process_without_xmlsec_fails(self):
+        self.config_fixture.config(group='saml', signing_backend='inprocess')
+        self.useFixture(fixtures.MockPatchObject(keystone_idp, 'xmlsec',
+                                                 None))
+        self.assertRaises(exception.SAMLSigningError,
+                          keystone_idp._sign_assertion,
+                          self.signed_assertion)
+
     def _create_generate_saml_request(self, token_id, sp_id):
         return {
             "auth": {
@@ -4220,6 +4310,7 @@ class SAMLGenerationTests(test_v3.RestfulTestCase):
     @mock.patch.object(subprocess, 'check_output')
     def test_sign_assertion(self, check_output_mock,
                             write_to_tempfile_mock, create_class_mock):
+        self.config_fixture.config(group='saml', signing_backend='xmlsec1')
         write_to_tempfile_mock.return_value = 'tmp_path'
         check_output_mock.return_value = 'fakeoutput'
 
@@ -4229,6 +4320,7 @@ class SAMLGenerationTests(test_v3.RestfulTestCase):
 
     @mock.patch('oslo_utils.fileutils.write_to_tempfile')
     def test_sign_assertion_exc(self, write_to_tempfile_mock):
+        self.config_fixture.config(group='saml', signing_backend='xmlsec1')
         # If the command fails the command output is logged.
         sample_returncode = 1
         sample_output = self.getUniqueString()
@@ -4265,6 +4357,7 @@ class SAMLGenerationTests(test_v3.RestfulTestCase):
     @mock.patch.object(subprocess, 'check_output')
     def test_sign_assertion_fileutils_exc(self, check_output_mock,
                                           write_to_tempfile_mock):
+        self.config_fixture.config(group='saml', signing_backend='xmlsec1')
         exception_msg = 'fake'
         write_to_tempfile_mock.side_effect = Exception(exception_msg)
         check_output_mock.return_value = '/usr/bin/xmlsec1'
@@ -4278,6 +4371,7 @@ class SAMLGenerationTests(test_v3.RestfulTestCase):
         self.assertEqual(expected_log, logger_fixture.output)
 
     def test_sign_assertion_logs_message_if_xmlsec1_is_not_installed(self):
+        self.config_fixture.config(group='saml', signing_backend='xmlsec1')
         with mock.patch.object(subprocess, 'check_output') as co_mock:
             co_mock.side_effect = subprocess.CalledProcessError(
                 returncode=1, cmd=CONF.saml.xmlsec1_binary,
@@ -14,6 +14,8 @@
 import copy
 import uuid
 
+import jsonschema
+
 from keystone.application_credential import schema as app_cred_schema
 from keystone.assignment import schema as assignment_schema
 from keystone.catalog import schema as catalog_schema
@@ -2509,6 +2511,39 @@ class OAuth1ValidationTestCase(unit.BaseTestCase):
                           request_to_validate)
 
 
+class SchemaValidatorCacheTestCase(unit.BaseTestCase):
+
+    def test_get_validator_is_cached_per_schema(self):
+        schema = {'type': 'object', 'properties': {'name': {'type': 'string'}}}
+        validator = validators.get_validator(schema)
+        self.assertIs(validator, validators.get_validator(schema))
+        self.assertIsNot(validator,
+                         validators.get_validator(copy.deepcopy(schema)))
+
+    def test_get_validator_checks_schema(self):
+        self.assertRaises(jsonschema.SchemaError, validators.get_validator,
+                          {'type': 'not-a-type'})
+
+    def test_lazy_validate_uses_cached_validator(self):
+        schema = {'type': 'object', 'properties': {'name': {'type': 'string'}},
+                  'required': ['name']}
+        validation.lazy_validate(schema, {'name': uuid.uuid4().hex})
+        self.assertIs(schema, validators._VALIDATORS[id(schema)][0])
+        self.assertRaises(exception.SchemaValidationError,
+                          validation.lazy_validate, schema, {'name': 1})
+
+    def test_every_schema_is_a_valid_schema(self):
+        modules = [app_cred_schema, assignment_schema, catalog_schema,
+                   credential_schema, federation_schema, identity_schema,
+                   limit_schema, oauth1_schema, policy_schema,
+                   resource_schema, trust_schema]
+        for module in modules:
+            for name, schema in vars(module).items():
+                if (not name.startswith('_') and isinstance(schema, dict) and
+                        schema.get('type') == 'object'):
+                    validators.get_validator(schema)
+
+
 class PasswordValidationTestCase(unit.TestCase):
     def setUp(self):
         super(PasswordValidationTestCase, self).setUp()
@@ -2538,6 +2573,15 @@ class PasswordValidationTestCase(unit.TestCase):
                           validators.validate_password,
                           password)
 
+    def test_password_regex_is_compiled_once(self):
+        pattern = '^[a-zA-Z0-9]{7,}$'
+        self.config_fixture.config(group='security_compliance',
+                                   password_regex=pattern)
+        validators.validate_password('Password1')
+        compiled = validators._PASSWORD_PATTERNS[pattern]
+        validators.validate_password('Password2')
+        self.assertIs(compiled, validators._PASSWORD_PATTERNS[pattern])
+
     def test_password_validate_with_invalid_password_regex(self):
         # invalid regular expression, missing beginning '['
         self.config_fixture.config(group='security_compliance',
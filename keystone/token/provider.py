@@ -118,7 +118,8 @@ class Manager(manager.Manager):
                 notifications.register_event_callback(event, resource_type,
                                                       callback_fns)
 
-    def _drop_token_cache(self, service, resource_type, operation, payload):
+    @notifications.coalesced_callback
+    def _drop_token_cache(self, service, resource_type, operation, payloads):
         """Invalidate the entire token cache.
 
         This is a handy private utility method that should be used when